@@ -48,6 +48,7 @@ class Build:
                 conf_output.writeDashboards(input_dto.director_output_dto.dashboards)
             )
             updated_conf_files.update(conf_output.writeMiscellaneousAppFiles())
+            conf_output.saveStanzaCache()
 
             # Ensure that the conf file we just generated/update is syntactically valid
             for conf_file in updated_conf_files:
@@ -16,7 +16,6 @@ from contentctl.objects.data_source import DataSource
 from contentctl.objects.detection import Detection
 from contentctl.objects.lookup import CSVLookup, Lookup, RuntimeCSV
 from contentctl.objects.macro import Macro
-from contentctl.objects.security_content_object import SecurityContentObject
 
 # Logger
 logging.basicConfig(level=os.environ.get("LOGLEVEL", "INFO"))
@@ -66,10 +65,7 @@ class GitService(BaseModel):
         # Combine the uncommitted changes with the committed changes
         all_diffs = list(diffs) + list(diffs2)
 
-        # Make a filename to content map
-        filepath_to_content_map = {
-            obj.file_path: obj for (_, obj) in self.director.name_to_content_map.items()
-        }
+        filepath_to_content_map = self.director.file_path_to_content_map
 
         updated_detections: set[Detection] = set()
         updated_macros: set[Macro] = set()
@@ -220,11 +216,7 @@ class GitService(BaseModel):
         return sorted(list(updated_detections))
 
     def getSelected(self, detectionFilenames: List[FilePath]) -> List[Detection]:
-        filepath_to_content_map: dict[FilePath, SecurityContentObject] = {
-            obj.file_path: obj
-            for (_, obj) in self.director.name_to_content_map.items()
-            if obj.file_path is not None
-        }
+        filepath_to_content_map = self.director.file_path_to_content_map
         errors = []
         detections: List[Detection] = []
         for name in detectionFilenames:
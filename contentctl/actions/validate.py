@@ -2,9 +2,10 @@ import pathlib
 
 from contentctl.enrichments.attack_enrichment import AttackEnrichment
 from contentctl.enrichments.cve_enrichment import CveEnrichment
-from contentctl.helper.splunk_app import SplunkApp
-from contentctl.helper.utils import Utils
+from contentctl.helper.memory_report import MemoryReport
+from contentctl.input.content_snapshot import ContentSnapshot
 from contentctl.input.director import Director, DirectorOutputDto, ValidationFailedError
+from contentctl.input.repo_file_index import RepoFileIndex
 from contentctl.objects.atomic import AtomicEnrichment
 from contentctl.objects.config import validate
 from contentctl.objects.data_source import DataSource
@@ -13,27 +14,58 @@ from contentctl.objects.lookup import FileBackedLookup, RuntimeCSV
 
 class Validate:
     def execute(self, input_dto: validate) -> DirectorOutputDto:
+        memory_report = MemoryReport() if input_dto.memory_report else None
         try:
             director_output_dto = DirectorOutputDto(
                 AtomicEnrichment.getAtomicEnrichment(input_dto),
                 AttackEnrichment.getAttackEnrichment(input_dto),
                 CveEnrichment.getCveEnrichment(input_dto),
             )
-
-            director = Director(director_output_dto)
-            director.execute(input_dto)
-            self.ensure_no_orphaned_files_in_lookups(
-                input_dto.path, director_output_dto
-            )
-            if input_dto.data_source_TA_validation:
-                self.validate_latest_TA_information(director_output_dto.data_sources)
-
+            self.validate_content(input_dto, director_output_dto)
+            if input_dto.compact:
+                director_output_dto.compact()
+            if memory_report is not None:
+                memory_report.print_report(director_output_dto, "validated content")
             return director_output_dto
 
         except ValidationFailedError:
             # Just re-raise without additional output since we already formatted everything
             raise SystemExit(1)
 
+    def validate_content(
+        self,
+        input_dto: validate,
+        director_output_dto: DirectorOutputDto,
+        snapshot: ContentSnapshot | None = None,
+        file_index: RepoFileIndex | None = None,
+    ) -> DirectorOutputDto:
+        """
+        Construct and validate all of the content into director_output_dto, which must
+        not contain any content yet.
+
+        Args:
+            input_dto (validate): The configuration.
+            director_output_dto (DirectorOutputDto): Holds the enrichments used to construct content.
+            snapshot (ContentSnapshot | None, optional): Restore unchanged content from this snapshot
+                instead of validating it. Defaults to None.
+            file_index (RepoFileIndex | None, optional): An index of the content folders of the
+                repo, if one has just been built. Defaults to None, which builds a new index.
+
+        Raises:
+            ValidationFailedError: One or more pieces of content failed validation.
+        """
+        director = Director(director_output_dto, snapshot, file_index)
+        director.execute(input_dto)
+        self.ensure_no_orphaned_files_in_lookups(input_dto.path, director_output_dto)
+        if input_dto.data_source_TA_validation:
+            self.validate_latest_TA_information(
+                input_dto, director_output_dto.data_sources
+            )
+        if input_dto.check_references:
+            self.validate_references(input_dto, director_output_dto)
+
+        return director_output_dto
+
     def ensure_no_orphaned_files_in_lookups(
         self, repo_path: pathlib.Path, director_output_dto: DirectorOutputDto
     ):
@@ -62,21 +94,26 @@ class Validate:
         lookupsDirectory = repo_path / "lookups"
 
         # Get all of the files referenced by Lookups
-        usedLookupFiles: list[pathlib.Path] = [
+        usedLookupFiles: set[pathlib.Path] = {
             lookup.filename
             for lookup in director_output_dto.lookups
             # Of course Runtime CSVs do not have underlying CSV files, so make
             # sure that we do not check for that existence.
             if isinstance(lookup, FileBackedLookup)
             and not isinstance(lookup, RuntimeCSV)
-        ] + [
+        } | {
             lookup.file_path
             for lookup in director_output_dto.lookups
             if lookup.file_path is not None
-        ]
+        }
+
+        if director_output_dto.file_index is None:
+            raise Exception(
+                "Cannot check for orphaned files in lookups, the content has not been constructed"
+            )
 
         # Get all of the mlmodel and csv files in the lookups directory
-        csvAndMlmodelFiles = Utils.get_security_content_files_from_directory(
+        csvAndMlmodelFiles = director_output_dto.file_index.get_security_content_files(
             lookupsDirectory,
             allowedFileExtensions=[".yml", ".csv", ".mlmodel"],
             fileExtensionsToReturn=[".csv", ".mlmodel"],
@@ -94,32 +131,69 @@ class Validate:
             )
         return
 
-    def validate_latest_TA_information(self, data_sources: list[DataSource]) -> None:
-        validated_TAs: list[tuple[str, str]] = []
+    def validate_references(
+        self, input_dto: validate, director_output_dto: DirectorOutputDto
+    ) -> None:
+        # requests is only imported when links are checked
+        from contentctl.helper.link_validator import LinkValidator
+
+        references = LinkValidator.collect_references(director_output_dto)
+        link_validator = LinkValidator(
+            cache_file=input_dto.cache_path / "references.pickle"
+            if input_dto.cache
+            else None,
+            success_ttl_seconds=input_dto.reference_success_ttl_hours * 60 * 60,
+            failure_ttl_seconds=input_dto.reference_failure_ttl_hours * 60 * 60,
+            max_workers=input_dto.reference_check_workers,
+        )
+        print(f"Checking [{len(references)}] reference links...", end="", flush=True)
+        failures = link_validator.validate_references(references)
+        print(
+            f"Done! [{link_validator.uncached_checks}] were checked, "
+            f"[{len(references) - link_validator.uncached_checks}] were cached."
+        )
+        if len(failures) > 0:
+            LinkValidator.print_link_validation_errors(failures)
+            raise Exception(f"[{len(failures)}] reference links could not be resolved.")
+
+    def validate_latest_TA_information(
+        self, input_dto: validate, data_sources: list[DataSource]
+    ) -> None:
+        from contentctl.helper.splunk_app import SplunkApp
+
         errors: list[str] = []
         print("----------------------")
         print("Validating latest TA:")
         print("----------------------")
+        # Every TA is only checked once, however many data sources support it
+        supported_TAs: dict[tuple[str, str], tuple[DataSource, int]] = {}
         for data_source in data_sources:
             for supported_TA in data_source.supported_TA:
                 ta_identifier = (supported_TA.name, supported_TA.version)
-                if ta_identifier in validated_TAs:
+                if ta_identifier in supported_TAs or supported_TA.url is None:
                     continue
-                if supported_TA.url is not None:
-                    validated_TAs.append(ta_identifier)
-                    uid = int(str(supported_TA.url).rstrip("/").split("/")[-1])
-                    try:
-                        splunk_app = SplunkApp(app_uid=uid)
-                        if splunk_app.latest_version != supported_TA.version:
-                            errors.append(
-                                f"Version mismatch in '{data_source.file_path}' supported TA '{supported_TA.name}'"
-                                f"\n  Latest version on Splunkbase    : {splunk_app.latest_version}"
-                                f"\n  Version specified in data source: {supported_TA.version}"
-                            )
-                    except Exception as e:
-                        errors.append(
-                            f"Error processing checking version of TA {supported_TA.name}: {str(e)}"
-                        )
+                uid = int(str(supported_TA.url).rstrip("/").split("/")[-1])
+                supported_TAs[ta_identifier] = (data_source, uid)
+
+        latest_versions = SplunkApp.get_latest_versions(
+            {uid for _, uid in supported_TAs.values()},
+            cache_file=input_dto.cache_path / "splunkbase.pickle"
+            if input_dto.cache
+            else None,
+            ttl_seconds=input_dto.splunkbase_ttl_hours * 60 * 60,
+        )
+        for (name, version), (data_source, uid) in supported_TAs.items():
+            latest_version = latest_versions[uid]
+            if isinstance(latest_version, Exception):
+                errors.append(
+                    f"Error processing checking version of TA {name}: {str(latest_version)}"
+                )
+            elif latest_version != version:
+                errors.append(
+                    f"Version mismatch in '{data_source.file_path}' supported TA '{name}'"
+                    f"\n  Latest version on Splunkbase    : {latest_version}"
+                    f"\n  Version specified in data source: {version}"
+                )
 
         if len(errors) > 0:
             errorString = "\n\n".join(errors)
@@ -0,0 +1,313 @@
+import hashlib
+import io
+import os
+import pathlib
+import queue
+import secrets
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import (
+    Client,
+    Connection,
+    Listener,
+    answer_challenge,
+    deliver_challenge,
+)
+from typing import Any, TextIO
+
+from contentctl.actions.validate import Validate
+from contentctl.enrichments.attack_enrichment import AttackEnrichment
+from contentctl.enrichments.cve_enrichment import CveEnrichment
+from contentctl.input.content_snapshot import ContentSnapshot
+from contentctl.input.director import Director, DirectorOutputDto
+from contentctl.input.repo_file_index import RepoFileIndex
+from contentctl.objects.atomic import AtomicEnrichment
+from contentctl.objects.config import watch
+
+# How long, in seconds, to wait for a client to authenticate and send its request
+CONNECTION_TIMEOUT = 10
+
+# How long, in seconds, to wait before accepting connections again after failing to
+ACCEPT_RETRY_INTERVAL = 1
+
+ACCEPT_THREAD_NAME = "contentctl-watch-accept"
+
+# Signature of the content directories: the size and modification time of every file
+ContentSignature = dict[str, tuple[int, int]]
+
+
+class Watch:
+    """
+    Keep the enrichments, and the most recently validated content, in memory
+    and validate the content again every time that it changes.  Only the content which
+    changed, and the content which depends on it, is validated again.  Each validation is
+    also available to 'contentctl watch --query', so that editors and pre-commit hooks
+    can get the result without loading the enrichments and all content themselves.
+    """
+
+    def __init__(self) -> None:
+        self.stopped = threading.Event()
+
+    def execute(self, config: watch) -> None:
+        if config.query:
+            sys.exit(0 if self.query(config) else 1)
+
+        print("Loading enrichments...")
+        enrichments = (
+            AtomicEnrichment.getAtomicEnrichment(config),
+            AttackEnrichment.getAttackEnrichment(config),
+            CveEnrichment.getCveEnrichment(config),
+        )
+
+        snapshot: ContentSnapshot | None = None
+        if config.incremental and not config.rebuild:
+            # Start from the snapshot written by the last incremental run, if there is one
+            snapshot = ContentSnapshot.load(config)
+
+        requests: queue.Queue[Connection] = queue.Queue()
+        listener = self.listen(config, requests)
+        signature: ContentSignature | None = None
+        result: dict[str, Any] = {}
+        print(f"Watching '{config.path}' for changes. Press Ctrl+C to exit.")
+        try:
+            while True:
+                try:
+                    connection = requests.get(timeout=config.poll_interval)
+                except queue.Empty:
+                    connection = None
+
+                file_index = RepoFileIndex.build(config.path, Director.content_types)
+                current_signature = file_index.signature()
+                if current_signature != signature:
+                    signature = current_signature
+                    result, new_snapshot = self.validate(
+                        config, enrichments, snapshot, file_index
+                    )
+                    if new_snapshot is not None:
+                        snapshot = new_snapshot
+
+                if connection is not None:
+                    try:
+                        connection.send(result)
+                    except OSError:
+                        # The client went away before it received the result
+                        pass
+                    finally:
+                        connection.close()
+        except KeyboardInterrupt:
+            print("\nNo longer watching for changes.")
+        finally:
+            self.stopped.set()
+            listener.close()
+            self.key_path(config).unlink(missing_ok=True)
+
+    def validate(
+        self,
+        config: watch,
+        enrichments: tuple[AtomicEnrichment, AttackEnrichment, CveEnrichment],
+        snapshot: ContentSnapshot | None,
+        file_index: RepoFileIndex,
+    ) -> tuple[dict[str, Any], ContentSnapshot | None]:
+        """
+        Validate all content, restoring unchanged content from snapshot if possible. The
+        content of the snapshot is restored as it is, rather than copied, and it is reset
+        before every run, since the last run may have failed after restoring some of it.
+
+        Returns:
+            tuple[dict[str, Any], ContentSnapshot | None]: The result to send to clients and,
+            if validation succeeded, a snapshot of the validated content.
+        """
+        start_time = time.time()
+        output = TeeOutput(sys.stdout)
+        director_output_dto = DirectorOutputDto(*enrichments)
+        if snapshot is not None:
+            snapshot.reset()
+
+        success = False
+        sys.stdout = output
+        try:
+            try:
+                Validate().validate_content(
+                    config, director_output_dto, snapshot, file_index
+                )
+                success = True
+            except SystemExit:
+                # Unrecoverable errors, such as a YML file which cannot be parsed, have
+                # already been printed by the time that they exit
+                pass
+            except Exception as e:
+                if config.verbose:
+                    traceback.print_exc(file=sys.stdout)
+                print(e)
+
+            elapsed = time.time() - start_time
+            if success:
+                print(
+                    f"Validated [{len(director_output_dto.name_to_content_map)}] pieces of "
+                    f"content successfully in [{elapsed:.2f}] seconds."
+                )
+            else:
+                print(f"Validation FAILED in [{elapsed:.2f}] seconds.")
+        finally:
+            sys.stdout = output.stream
+
+        result = {"success": success, "output": output.getvalue()}
+        if not success:
+            return result, None
+        return result, ContentSnapshot.capture(config, director_output_dto, snapshot)
+
+    def query(self, config: watch) -> bool:
+        """
+        Ask the 'contentctl watch' running for this app to validate any changes, and print
+        the result. If it is not running, validate the content directly instead.
+
+        Returns:
+            bool: True if validation succeeded.
+        """
+        try:
+            authkey = self.key_path(config).read_bytes()
+            with Client(self.address(config), authkey=authkey) as connection:
+                # Wake up the watcher, then wait for the result
+                connection.send(None)
+                result: dict[str, Any] = connection.recv()
+        except (OSError, EOFError, AuthenticationError):
+            print(
+                f"'contentctl watch' is not running for '{config.path}'. "
+                "Validating the content directly instead."
+            )
+            try:
+                Validate().execute(config)
+            except SystemExit:
+                return False
+            return True
+
+        print(result["output"], end="")
+        return result["success"]
+
+    def listen(self, config: watch, requests: queue.Queue[Connection]) -> Listener:
+        """
+        Accept connections from clients in a background thread, placing them in requests.
+        """
+        address = self.address(config)
+        if sys.platform != "win32":
+            # Remove the socket left behind by a watcher which did not exit cleanly
+            pathlib.Path(address).unlink(missing_ok=True)
+
+        authkey = secrets.token_bytes(32)
+        key_path = self.key_path(config)
+        key_path.parent.mkdir(parents=True, exist_ok=True)
+        key_path.unlink(missing_ok=True)
+        with open(
+            os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "wb"
+        ) as key_file:
+            key_file.write(authkey)
+
+        # Clients are authenticated in handle_connection rather than by the listener, which
+        # would wait for each client to authenticate before accepting the next one
+        listener = Listener(address)
+
+        def handle_connection(connection: Connection) -> None:
+            try:
+                # Give up on a client which stops responding, rather than waiting forever
+                timed_connection = TimeoutConnection(connection, CONNECTION_TIMEOUT)
+                deliver_challenge(timed_connection, authkey)  # type: ignore
+                answer_challenge(timed_connection, authkey)  # type: ignore
+                # Wait for the client to ask for the result
+                timed_connection.recv_bytes()
+            except (OSError, EOFError, AuthenticationError):
+                # Either the client went away, stopped responding, or failed to authenticate
+                connection.close()
+                return
+            requests.put(connection)
+
+        def accept_connections() -> None:
+            while not self.stopped.is_set():
+                try:
+                    connection = listener.accept()
+                except OSError as e:
+                    if self.stopped.is_set():
+                        # The listener is only closed once the watcher has stopped
+                        break
+                    # For example, the process has run out of file descriptors. Rather than
+                    # failing again straight away, give whatever caused it time to clear.
+                    print(
+                        f"Failed to accept a connection from a client: {e}",
+                        file=sys.stderr,
+                    )
+                    self.stopped.wait(ACCEPT_RETRY_INTERVAL)
+                    continue
+                # Each client is handled in its own thread, so that a client which connects
+                # but never sends anything does not stop any other client from connecting
+                threading.Thread(
+                    target=handle_connection, args=(connection,), daemon=True
+                ).start()
+
+        threading.Thread(
+            target=accept_connections, name=ACCEPT_THREAD_NAME, daemon=True
+        ).start()
+        return listener
+
+    @staticmethod
+    def address(config: watch) -> str:
+        # Unix socket paths are limited to about 100 characters, so the
+        # socket is not created in the (possibly deeply nested) app directory
+        app_hash = hashlib.sha256(
+            str(config.path.absolute()).encode("utf-8")
+        ).hexdigest()[:16]
+        if sys.platform == "win32":
+            return rf"\\.\pipe\contentctl-watch-{app_hash}"
+        return str(
+            pathlib.Path(tempfile.gettempdir()) / f"contentctl-watch-{app_hash}.sock"
+        )
+
+    @staticmethod
+    def key_path(config: watch) -> pathlib.Path:
+        return config.cache_path / "watch.key"
+
+
+class TimeoutConnection:
+    """
+    Wrap a Connection so that receiving fails with a TimeoutError if nothing is received
+    within the timeout.
+    """
+
+    def __init__(self, connection: Connection, timeout: float):
+        self.connection = connection
+        self.timeout = timeout
+
+    def send_bytes(self, buf: bytes) -> None:
+        self.connection.send_bytes(buf)
+
+    def recv_bytes(self, maxlength: int | None = None) -> bytes:
+        if not self.connection.poll(self.timeout):
+            raise TimeoutError("Timed out waiting for the client")
+        return self.connection.recv_bytes(maxlength)
+
+
+class TeeOutput(io.StringIO):
+    """
+    Write to a stream while also keeping a copy of everything that was written.
+    """
+
+    def __init__(self, stream: TextIO):
+        super().__init__()
+        self.stream = stream
+
+    def write(self, s: str) -> int:
+        self.stream.write(s)
+        return super().write(s)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+    def isatty(self) -> bool:
+        # Progress is only printed for every file when writing to a terminal. There is
+        # no reason to keep all of that progress output, so pretend that this is not one.
+        return False
+
+    def reconfigure(self, *args: Any, **kwargs: Any) -> None:
+        self.stream.reconfigure(*args, **kwargs)  # type: ignore
@@ -1,22 +1,15 @@
+from __future__ import annotations
+
 import pathlib
 import random
 import sys
 import traceback
 import warnings
 from dataclasses import dataclass
+from typing import TYPE_CHECKING
 
 import tyro
 
-from contentctl.actions.build import Build, BuildInputDto, DirectorOutputDto
-from contentctl.actions.deploy_acs import Deploy
-from contentctl.actions.detection_testing.GitService import GitService
-from contentctl.actions.initialize import Initialize
-from contentctl.actions.inspect import Inspect
-from contentctl.actions.new_content import NewContent
-from contentctl.actions.release_notes import ReleaseNotes
-from contentctl.actions.reporting import Reporting, ReportingInputDto
-from contentctl.actions.test import Test, TestInputDto
-from contentctl.actions.validate import Validate
 from contentctl.input.yml_reader import YmlReader
 from contentctl.objects.config import (
     build,
@@ -30,8 +23,16 @@ from contentctl.objects.config import (
     test_common,
     test_servers,
     validate,
+    watch,
 )
 
+if TYPE_CHECKING:
+    from contentctl.input.director import DirectorOutputDto
+
+# Each action is imported by the function which runs it, rather than here, so that
+# starting the CLI (for example, for --help or new) does not import the dependencies of
+# every other action, such as docker, splunklib, git, jinja2 and questionary.
+
 # def print_ascii_art():
 #     print(
 #         """
@@ -64,16 +65,29 @@ from contentctl.objects.config import (
 
 
 def init_func(config: test):
+    from contentctl.actions.initialize import Initialize
+
     Initialize().execute(config)
 
 
 def validate_func(config: validate) -> DirectorOutputDto:
+    from contentctl.actions.validate import Validate
+
     config.check_test_data_caches()
     validate = Validate()
     return validate.execute(config)
 
 
+def watch_func(config: watch) -> None:
+    from contentctl.actions.watch import Watch
+
+    config.check_test_data_caches()
+    Watch().execute(config)
+
+
 def report_func(config: report) -> None:
+    from contentctl.actions.reporting import Reporting, ReportingInputDto
+
     # First, perform validation. Remember that the validate
     # configuration is actually a subset of the build configuration
     director_output_dto = validate_func(config)
@@ -85,14 +99,22 @@ def report_func(config: report) -> None:
 
 
 def build_func(config: build) -> DirectorOutputDto:
+    from contentctl.actions.build import Build, BuildInputDto
+    from contentctl.helper.memory_report import MemoryReport
+
     # First, perform validation. Remember that the validate
     # configuration is actually a subset of the build configuration
     director_output_dto = validate_func(config)
     builder = Build()
-    return builder.execute(BuildInputDto(director_output_dto, config))
+    director_output_dto = builder.execute(BuildInputDto(director_output_dto, config))
+    if config.memory_report:
+        MemoryReport().print_report(director_output_dto, "built content")
+    return director_output_dto
 
 
 def inspect_func(config: inspect) -> str:
+    from contentctl.actions.inspect import Inspect
+
     # Make sure that we have built the most recent version of the app
     _ = build_func(config)
     inspect_token = Inspect().execute(config)
@@ -100,14 +122,20 @@ def inspect_func(config: inspect) -> str:
 
 
 def release_notes_func(config: release_notes) -> None:
+    from contentctl.actions.release_notes import ReleaseNotes
+
     ReleaseNotes().release_notes(config)
 
 
 def new_func(config: new):
+    from contentctl.actions.new_content import NewContent
+
     NewContent().execute(config)
 
 
 def deploy_acs_func(config: deploy_acs):
+    from contentctl.actions.deploy_acs import Deploy
+
     print("Building and inspecting app...")
     token = inspect_func(config)
     print("App successfully built and inspected.")
@@ -116,6 +144,9 @@ def deploy_acs_func(config: deploy_acs):
 
 
 def test_common_func(config: test_common):
+    from contentctl.actions.detection_testing.GitService import GitService
+    from contentctl.actions.test import Test, TestInputDto
+
     if type(config) is test:
         # construct the container Infrastructure objects
         config.getContainerInfrastructureObjects()
@@ -219,6 +250,7 @@ def main():
         {
             "init": init.model_validate(config_obj),
             "validate": validate.model_validate(config_obj),
+            "watch": watch.model_validate(config_obj),
             "report": report.model_validate(config_obj),
             "build": build.model_validate(config_obj),
             "inspect": inspect.model_construct(**t.__dict__),
@@ -243,6 +275,8 @@ def main():
             init_func(t)
         elif type(config) is validate:
             validate_func(config)
+        elif type(config) is watch:
+            watch_func(config)
         elif type(config) is report:
             report_func(config)
         elif type(config) is build:
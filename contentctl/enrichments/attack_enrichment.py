@@ -1,17 +1,22 @@
 from __future__ import annotations
 
+import hashlib
 import logging
+import os
+from collections import defaultdict
 from dataclasses import field
 from pathlib import Path
-from typing import Any, TypedDict, cast
+from typing import Any, TypedDict, Union, cast
 
-from attackcti import attack_client  # type: ignore[reportMissingTypeStubs]
 from pydantic import BaseModel
 
+import contentctl
+from contentctl.helper.utils import Utils
 from contentctl.objects.annotated_types import MITRE_ATTACK_ID_TYPE
 from contentctl.objects.config import validate
 from contentctl.objects.mitre_attack_enrichment import (
     MitreAttackEnrichment,
+    MitreAttackGroup,
     MitreTactics,
 )
 
@@ -19,6 +24,14 @@ from contentctl.objects.mitre_attack_enrichment import (
 logging.getLogger("taxii2client").setLevel(logging.CRITICAL)
 logging.getLogger("stix2").setLevel(logging.CRITICAL)
 
+# Bump this whenever the format of the cache, or the way that
+# enrichments are built, changes. A cache with a different
+# version is ignored.
+ATTACK_CACHE_VERSION = 2
+
+# The folders of the mitre/cti repo which are loaded
+MITRE_CTI_DOMAINS = ("enterprise-attack", "mobile-attack", "ics-attack")
+
 
 class AttackPattern(TypedDict):
     id: str
@@ -44,7 +57,11 @@ class AttackEnrichment(BaseModel):
     @staticmethod
     def getAttackEnrichment(config: validate) -> AttackEnrichment:
         enrichment = AttackEnrichment(use_enrichment=config.enrichments)
-        _ = enrichment.get_attack_lookup(config.mitre_cti_repo_path, config.enrichments)
+        _ = enrichment.get_attack_lookup(
+            config.mitre_cti_repo_path,
+            config.enrichments,
+            config.cache_path if config.cache else None,
+        )
         return enrichment
 
     def getEnrichmentByMitreID(
@@ -63,6 +80,18 @@ class AttackEnrichment(BaseModel):
                 f"Error, Unable to find Mitre Enrichment for MitreID {mitre_id}"
             )
 
+    def shareEnrichments(
+        self, enrichments: list[MitreAttackEnrichment]
+    ) -> list[MitreAttackEnrichment]:
+        """
+        Replace each enrichment with the single, shared enrichment of the same technique,
+        for enrichments which were created elsewhere (such as in a snapshot of content).
+        """
+        return [
+            self.data.get(enrichment.mitre_attack_id, enrichment)
+            for enrichment in enrichments
+        ]
+
     def addMitreIDViaGroupNames(
         self, technique: dict[str, Any], tactics: list[str], groupNames: list[str]
     ) -> None:
@@ -86,13 +115,13 @@ class AttackEnrichment(BaseModel):
         self,
         technique: dict[str, Any],
         tactics: list[MitreTactics],
-        groupDicts: list[dict[str, Any]],
+        groups: list[MitreAttackGroup],
     ) -> None:
         technique_id = technique["technique_id"]
         technique_obj = technique["technique"]
         tactics.sort()
 
-        groupNames: list[str] = sorted([group["group"] for group in groupDicts])
+        groupNames: list[str] = sorted([group.group for group in groups])
 
         if technique_id in self.data:
             raise Exception(f"Error, trying to redefine MITRE ID '{technique_id}'")
@@ -103,16 +132,80 @@ class AttackEnrichment(BaseModel):
                 "mitre_attack_technique": technique_obj,
                 "mitre_attack_tactics": tactics,
                 "mitre_attack_groups": groupNames,
-                "mitre_attack_group_objects": groupDicts,
+                "mitre_attack_group_objects": groups,
             }
         )
 
+    def addEnterpriseTechniques(
+        self,
+        all_enterprise_techniques: list[AttackPattern],
+        enterprise_relationships: list[Relationship],
+        enterprise_groups: list[IntrusionSet],
+    ) -> None:
+        """
+        Add an enrichment for every enterprise technique, along with every group (intrusion set)
+        which uses it. The relationships and groups are each indexed once, so this is linear
+        in the size of its input. Each group is validated once and shared by every enrichment
+        of a technique that the group uses.
+        """
+        # intrusion set id -> the groups with that id
+        groups_by_id: dict[str, list[IntrusionSet]] = defaultdict(list)
+        for group in enterprise_groups:
+            groups_by_id[group["id"]].append(group)
+
+        # technique (attack pattern) id -> the groups which use it, in relationship order
+        groups_by_technique: dict[str, list[IntrusionSet]] = defaultdict(list)
+        for relationship in enterprise_relationships:
+            if relationship["source_object"].startswith("intrusion-set"):
+                groups_by_technique[relationship["target_object"]].extend(
+                    groups_by_id.get(relationship["source_object"], [])
+                )
+
+        # id() of a group -> the group, validated
+        group_objects: dict[int, MitreAttackGroup] = {}
+        for technique in all_enterprise_techniques:
+            apt_groups: list[MitreAttackGroup] = []
+            for group in groups_by_technique.get(technique["id"], []):
+                group_object = group_objects.get(id(group))
+                if group_object is None:
+                    group_object = MitreAttackGroup.model_validate(dict(group))
+                    group_objects[id(group)] = group_object
+                apt_groups.append(group_object)
+
+            tactics: list[MitreTactics] = []
+            if "tactic" in technique:
+                for tactic in technique["tactic"]:
+                    tactics.append(cast(MitreTactics, tactic.replace("-", " ").title()))
+
+            self.addMitreIDViaGroupObjects(dict(technique), tactics, apt_groups)
+
     def get_attack_lookup(
-        self, input_path: Path, enrichments: bool = False
+        self,
+        input_path: Path,
+        enrichments: bool = False,
+        cache_path: Union[Path, None] = None,
     ) -> dict[str, MitreAttackEnrichment]:
-        attack_lookup: dict[str, MitreAttackEnrichment] = {}
+        """
+        Build the enrichment of every enterprise technique from a clone of the mitre/cti repo.
+
+        Args:
+            input_path (Path): The root of the mitre/cti repo.
+            enrichments (bool, optional): If False, do nothing. Defaults to False.
+            cache_path (Union[Path, None], optional): If set, the enrichments are cached in this
+                directory, and loaded from the cache (without loading the repo at all) as long as
+                the repo has not changed. Defaults to None.
+        """
         if not enrichments:
-            return attack_lookup
+            return {}
+
+        cache_file = None if cache_path is None else cache_path / "attack.pickle"
+        fingerprint = None if cache_file is None else self.fingerprint_repo(input_path)
+        if cache_file is not None and fingerprint is not None:
+            if self.load_cache(cache_file, fingerprint):
+                print(
+                    f"Loaded MITRE Enrichment for the repository at {input_path} from the cache"
+                )
+                return self.data
 
         try:
             print(
@@ -120,6 +213,10 @@ class AttackEnrichment(BaseModel):
                 end="",
                 flush=True,
             )
+            # attackcti, and the stix2 library that it uses, are slow to import and
+            # are only needed when the enrichments are not loaded from the cache
+            from attackcti import attack_client  # type: ignore[reportMissingTypeStubs]
+
             enterprise_path = input_path / "enterprise-attack"
             mobile_path = input_path / "ics-attack"
             ics_path = input_path / "mobile-attack"
@@ -150,40 +247,125 @@ class AttackEnrichment(BaseModel):
                 list[IntrusionSet], lift.get_enterprise_groups(stix_format=False)
             )
 
-            for technique in all_enterprise_techniques:
-                apt_groups: list[dict[str, Any]] = []
-                for relationship in enterprise_relationships:
-                    if relationship["target_object"] == technique[
-                        "id"
-                    ] and relationship["source_object"].startswith("intrusion-set"):
-                        for group in enterprise_groups:
-                            if relationship["source_object"] == group["id"]:
-                                apt_groups.append(dict(group))
-
-                tactics: list[MitreTactics] = []
-                if "tactic" in technique:
-                    for tactic in technique["tactic"]:
-                        tactics.append(
-                            cast(MitreTactics, tactic.replace("-", " ").title())
+            self.addEnterpriseTechniques(
+                all_enterprise_techniques, enterprise_relationships, enterprise_groups
+            )
+
+        except Exception as err:
+            raise Exception(f"Error getting MITRE Enrichment: {str(err)}")
+
+        print("Done!")
+        if cache_file is not None and fingerprint is not None:
+            self.save_cache(cache_file, fingerprint)
+        return self.data
+
+    @staticmethod
+    def fingerprint_repo(input_path: Path) -> Union[str, None]:
+        """
+        Identify the contents of a clone of the mitre/cti repo. If it is a git repo, this is
+        the commit that is checked out, which does not change when the repo is cloned again.
+        Like the snapshots used for incremental validation, uncommitted changes to the repo
+        are not noticed. Otherwise, it is a hash of the path, size, and modification time
+        of every file that is loaded from the repo.
+
+        Returns:
+            Union[str, None]: The fingerprint, or None if the repo could not be read.
+        """
+        import pygit2
+        from pygit2.enums import RepositoryOpenFlag
+
+        try:
+            # Only use the commit if input_path is itself the root of a git repo. Otherwise,
+            # pygit2 would find the repo that it is inside of (such as the content repo),
+            # whose commit says nothing about its contents.
+            repo = pygit2.Repository(str(input_path), RepositoryOpenFlag.NO_SEARCH)
+            return f"commit:{repo.head.target}"
+        except Exception:
+            pass
+
+        file_hash = hashlib.sha256()
+        to_scan = [str(input_path / domain) for domain in MITRE_CTI_DOMAINS]
+        try:
+            while len(to_scan) > 0:
+                for entry in sorted(os.scandir(to_scan.pop()), key=lambda e: e.name):
+                    if entry.is_dir():
+                        to_scan.append(entry.path)
+                        continue
+                    stat = entry.stat()
+                    file_hash.update(
+                        f"{entry.path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode(
+                            "utf-8"
                         )
+                    )
+        except OSError:
+            return None
+        return f"files:{file_hash.hexdigest()}"
 
-                self.addMitreIDViaGroupObjects(dict(technique), tactics, apt_groups)
-                attack_lookup[technique["technique_id"]] = (
+    def load_cache(self, cache_file: Path, fingerprint: str) -> bool:
+        """
+        Load the enrichments from the cache, if they were cached for this repo fingerprint.
+
+        Returns:
+            bool: True if the enrichments were loaded.
+        """
+        cache = Utils.load_versioned_cache(cache_file, ATTACK_CACHE_VERSION)
+        try:
+            if (
+                cache["contentctl_version"] != contentctl.__version__
+                or cache["fingerprint"] != fingerprint
+            ):
+                return False
+
+            # Every group is stored once, and referred to by its position
+            groups = [
+                MitreAttackGroup.model_validate(group) for group in cache["groups"]
+            ]
+            data: dict[str, MitreAttackEnrichment] = {}
+            for technique in cache["techniques"]:
+                data[technique["mitre_attack_id"]] = (
                     MitreAttackEnrichment.model_validate(
-                        {
-                            "mitre_attack_id": technique["technique_id"],
-                            "mitre_attack_technique": technique["technique"],
-                            "mitre_attack_tactics": tactics,
-                            "mitre_attack_groups": [
-                                group["group"] for group in apt_groups
-                            ],
-                            "mitre_attack_group_objects": apt_groups,
+                        technique
+                        | {
+                            "mitre_attack_group_objects": [
+                                groups[index]
+                                for index in technique["mitre_attack_group_objects"]
+                            ]
                         }
                     )
                 )
+        except Exception:
+            # A missing, corrupt, or outdated cache is just a cache miss
+            return False
 
-        except Exception as err:
-            raise Exception(f"Error getting MITRE Enrichment: {str(err)}")
+        self.data = data
+        return True
 
-        print("Done!")
-        return attack_lookup
+    def save_cache(self, cache_file: Path, fingerprint: str) -> None:
+        group_indexes: dict[int, int] = {}
+        groups: list[dict[str, Any]] = []
+        techniques: list[dict[str, Any]] = []
+        for enrichment in self.data.values():
+            for group in enrichment.mitre_attack_group_objects:
+                if id(group) not in group_indexes:
+                    group_indexes[id(group)] = len(groups)
+                    groups.append(group.model_dump(mode="json"))
+            techniques.append(
+                enrichment.model_dump(mode="json")
+                | {
+                    "mitre_attack_group_objects": [
+                        group_indexes[id(group)]
+                        for group in enrichment.mitre_attack_group_objects
+                    ]
+                }
+            )
+
+        Utils.atomic_write_cache(
+            cache_file,
+            ATTACK_CACHE_VERSION,
+            {
+                "contentctl_version": contentctl.__version__,
+                "fingerprint": fingerprint,
+                "groups": groups,
+                "techniques": techniques,
+            },
+        )
@@ -1,8 +1,8 @@
 from __future__ import annotations
-from pycvesearch import CVESearch
-from typing import Annotated, Union, TYPE_CHECKING
-from pydantic import ConfigDict, BaseModel, Field, computed_field
+from typing import Annotated, Any, Union, TYPE_CHECKING
+from pydantic import ConfigDict, BaseModel, Field, PrivateAttr, computed_field
 from decimal import Decimal
+from contentctl.enrichments.nvd_index import NvdIndex, NvdRecord
 from contentctl.objects.annotated_types import CVE_TYPE
 
 if TYPE_CHECKING:
@@ -26,9 +26,15 @@ class CveEnrichmentObj(BaseModel):
 
 class CveEnrichment(BaseModel):
     use_enrichment: bool = True
-    cve_api_obj: Union[CVESearch, None] = None
+    # A pycvesearch.CVESearch, which is only imported when it is used, since pycvesearch
+    # takes a long time to import
+    cve_api_obj: Union[Any, None] = None
+    nvd_index: Union[NvdIndex, None] = None
+    # CVEs which have already been looked up in the nvd_index, and None
+    # for each of those which were not found
+    _nvd_records: dict[str, Union[NvdRecord, None]] = PrivateAttr(default_factory=dict)
 
-    # Arbitrary_types are allowed to let us use the CVESearch Object
+    # Arbitrary_types are allowed to let us use the CVESearch and NvdIndex Objects
     model_config = ConfigDict(arbitrary_types_allowed=True, frozen=True)
 
     @staticmethod
@@ -37,10 +43,29 @@ class CveEnrichment(BaseModel):
         timeout_seconds: int = 10,
         force_disable_enrichment: bool = True,
     ) -> CveEnrichment:
+        if config.enrichments and config.nvd_feed_path.is_dir():
+            # Enrich CVEs offline, from the NVD feeds which have been downloaded
+            print(
+                f"Indexing the NVD feeds at {config.nvd_feed_path}...",
+                end="",
+                flush=True,
+            )
+            nvd_index = NvdIndex(config.nvd_feed_path, config.cache_path / "nvd.sqlite")
+            try:
+                ingested = nvd_index.refresh()
+            except Exception as e:
+                raise Exception(
+                    f"Error indexing the NVD feeds at {config.nvd_feed_path}: {str(e)}"
+                )
+            print(f"Done! [{ingested}] new or changed feeds were indexed.")
+            return CveEnrichment(use_enrichment=True, nvd_index=nvd_index)
+
         if force_disable_enrichment:
             return CveEnrichment(use_enrichment=False, cve_api_obj=None)
 
         if config.enrichments:
+            from pycvesearch import CVESearch
+
             try:
                 cve_api_obj = CVESearch(CVESSEARCH_API_URL, timeout=timeout_seconds)
                 return CveEnrichment(use_enrichment=True, cve_api_obj=cve_api_obj)
@@ -51,9 +76,44 @@ class CveEnrichment(BaseModel):
 
         return CveEnrichment(use_enrichment=False, cve_api_obj=None)
 
+    def loadCves(self, cve_ids: set[str]) -> None:
+        """
+        Look up every CVE which has not been looked up yet in the NVD index, all at once,
+        rather than one at a time as each is enriched. If there is no NVD index, do nothing.
+        """
+        if self.nvd_index is None:
+            return
+        new_ids = cve_ids - self._nvd_records.keys()
+        if len(new_ids) == 0:
+            return
+        records = self.nvd_index.lookup(new_ids)
+        for cve_id in new_ids:
+            self._nvd_records[cve_id] = records.get(cve_id)
+
     def enrich_cve(
         self, cve_id: str, raise_exception_on_failure: bool = True
     ) -> CveEnrichmentObj:
+        if self.use_enrichment and self.nvd_index is not None:
+            self.loadCves({cve_id})
+            record = self._nvd_records[cve_id]
+            if record is not None and record.cvss is not None and record.cvss > 0:
+                return CveEnrichmentObj(
+                    id=cve_id, cvss=record.cvss, summary=record.summary
+                )
+            if raise_exception_on_failure:
+                raise Exception(
+                    f"Error, unable to find a CVSS score for {cve_id} in the NVD feeds"
+                )
+            return CveEnrichmentObj(
+                id=cve_id,
+                cvss=Decimal(5.0),
+                summary=(
+                    record.summary
+                    if record is not None
+                    else "SUMMARY NOT AVAILABLE! ONLY THE LINK WILL BE USED AT THIS TIME"
+                ),
+            )
+
         if not self.use_enrichment:
             return CveEnrichmentObj(
                 id=cve_id,
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import pathlib
+import sqlite3
+import threading
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, NamedTuple, Union
+
+# Bump this whenever the schema of the index, or the way that
+# feeds are ingested, changes. An index with a different
+# version is rebuilt from scratch.
+NVD_INDEX_VERSION = 1
+
+# SQLite limits the number of parameters in a single query
+MAX_QUERY_PARAMETERS = 500
+
+# When a CVE has been scored with more than one version of CVSS, the score
+# of the first of these versions is used. The keys are those of the JSON 2.0
+# feeds (and the NVD API), followed by those of the legacy JSON 1.1 feeds.
+CVSS_METRICS = (
+    "cvssMetricV31",
+    "cvssMetricV30",
+    "cvssMetricV40",
+    "cvssMetricV2",
+)
+LEGACY_CVSS_METRICS = (("baseMetricV3", "cvssV3"), ("baseMetricV2", "cvssV2"))
+
+
+class NvdRecord(NamedTuple):
+    id: str
+    # None if the CVE has not been scored
+    cvss: Union[Decimal, None]
+    summary: str
+
+
+class NvdIndex:
+    """
+    An SQLite index of the CVEs in the NVD JSON feed files (nvdcve-*.json or
+    nvdcve-*.json.gz, in either the JSON 2.0 or the legacy JSON 1.1 format) in a
+    directory. The index is refreshed incrementally: only the feeds which were added
+    or changed since the last refresh are ingested again. When the same CVE appears in
+    more than one feed (for example, in a yearly feed and in the "modified" feed), the
+    most recently modified version of it is kept.
+    """
+
+    def __init__(self, feed_path: pathlib.Path, index_path: pathlib.Path):
+        self.feed_path = feed_path
+        self.index_path = index_path
+        # The index is queried from whichever thread is validating detections
+        self.lock = threading.Lock()
+        self.connection: Union[sqlite3.Connection, None] = None
+
+    @staticmethod
+    def feed_files(feed_path: pathlib.Path) -> list[pathlib.Path]:
+        return sorted(
+            path
+            for pattern in ("*.json", "*.json.gz")
+            for path in feed_path.glob(pattern)
+            if path.is_file()
+        )
+
+    @staticmethod
+    def fingerprint(feed_path: pathlib.Path) -> str:
+        """
+        Returns:
+            str: A hash of the name, size, and modification time of every feed file, which
+            changes whenever a feed is added, removed, or changed.
+        """
+        feed_hash = hashlib.sha256()
+        for path in NvdIndex.feed_files(feed_path):
+            stat = path.stat()
+            feed_hash.update(
+                f"{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+            )
+        return feed_hash.hexdigest()
+
+    def refresh(self) -> int:
+        """
+        Bring the index up to date with the feed files.
+
+        Returns:
+            int: The number of feed files which were ingested.
+        """
+        with self.lock:
+            connection = self.connect()
+            feeds = {path.name: path for path in self.feed_files(self.feed_path)}
+            indexed_feeds: dict[str, tuple[int, int]] = {
+                name: (size, mtime_ns)
+                for name, size, mtime_ns in connection.execute(
+                    "SELECT name, size, mtime_ns FROM feeds"
+                )
+            }
+            if not set(indexed_feeds).issubset(feeds):
+                # A CVE from a feed which was removed may have replaced the version of
+                # it from another feed, so start again from scratch
+                connection.executescript("DELETE FROM cves; DELETE FROM feeds;")
+                indexed_feeds = {}
+
+            ingested = 0
+            for name, path in feeds.items():
+                stat = path.stat()
+                if indexed_feeds.get(name) == (stat.st_size, stat.st_mtime_ns):
+                    continue
+                with connection:
+                    connection.executemany(
+                        "INSERT INTO cves (id, cvss, summary, last_modified) "
+                        "VALUES (?, ?, ?, ?) "
+                        "ON CONFLICT (id) DO UPDATE SET "
+                        "cvss = excluded.cvss, summary = excluded.summary, "
+                        "last_modified = excluded.last_modified "
+                        "WHERE excluded.last_modified >= cves.last_modified",
+                        self.read_feed(path),
+                    )
+                    connection.execute(
+                        "INSERT OR REPLACE INTO feeds (name, size, mtime_ns) VALUES (?, ?, ?)",
+                        (name, stat.st_size, stat.st_mtime_ns),
+                    )
+                ingested += 1
+            return ingested
+
+    def lookup(self, cve_ids: Iterable[str]) -> dict[str, NvdRecord]:
+        """
+        Look up many CVEs at once.
+
+        Returns:
+            dict[str, NvdRecord]: The record of each CVE which is in the index.
+        """
+        unique_ids = sorted(set(cve_ids))
+        records: dict[str, NvdRecord] = {}
+        with self.lock:
+            connection = self.connect()
+            for start in range(0, len(unique_ids), MAX_QUERY_PARAMETERS):
+                batch = unique_ids[start : start + MAX_QUERY_PARAMETERS]
+                for cve_id, cvss, summary in connection.execute(
+                    "SELECT id, cvss, summary FROM cves "
+                    f"WHERE id IN ({', '.join('?' * len(batch))})",
+                    batch,
+                ):
+                    records[cve_id] = NvdRecord(
+                        cve_id, None if cvss is None else Decimal(cvss), summary
+                    )
+        return records
+
+    def connect(self) -> sqlite3.Connection:
+        if self.connection is not None:
+            return self.connection
+
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.index_path, check_same_thread=False)
+        (version,) = connection.execute("PRAGMA user_version").fetchone()
+        if version != NVD_INDEX_VERSION:
+            connection.executescript(
+                f"""
+                DROP TABLE IF EXISTS cves;
+                DROP TABLE IF EXISTS feeds;
+                CREATE TABLE cves (
+                    id TEXT PRIMARY KEY,
+                    cvss TEXT,
+                    summary TEXT NOT NULL,
+                    last_modified TEXT NOT NULL
+                ) WITHOUT ROWID;
+                CREATE TABLE feeds (
+                    name TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime_ns INTEGER NOT NULL
+                );
+                PRAGMA user_version = {NVD_INDEX_VERSION};
+                """
+            )
+        self.connection = connection
+        return connection
+
+    @classmethod
+    def read_feed(
+        cls, path: pathlib.Path
+    ) -> Iterator[tuple[str, Union[str, None], str, str]]:
+        """
+        Yields:
+            tuple[str, Union[str, None], str, str]: The id, CVSS base score, English
+            description, and last modified time of each CVE in the feed.
+        """
+        opener = gzip.open if path.suffix == ".gz" else open
+        with opener(path, "rt", encoding="utf-8") as feed_file:
+            feed = json.load(feed_file)
+
+        for item in feed.get("vulnerabilities", []):
+            # JSON 2.0 feed
+            cve = item["cve"]
+            score = None
+            for metric in CVSS_METRICS:
+                scores = cve.get("metrics", {}).get(metric, [])
+                # Prefer the score given by NVD itself to the score given by the CNA
+                scores = sorted(scores, key=lambda s: s.get("type") != "Primary")
+                if len(scores) > 0:
+                    score = scores[0]["cvssData"]["baseScore"]
+                    break
+            yield (
+                cve["id"],
+                cls.format_score(score),
+                cls.english_description(cve.get("descriptions", [])),
+                cve.get("lastModified", ""),
+            )
+
+        for item in feed.get("CVE_Items", []):
+            # Legacy JSON 1.1 feed
+            score = None
+            for metric, cvss in LEGACY_CVSS_METRICS:
+                if metric in item.get("impact", {}):
+                    score = item["impact"][metric][cvss]["baseScore"]
+                    break
+            yield (
+                item["cve"]["CVE_data_meta"]["ID"],
+                cls.format_score(score),
+                cls.english_description(
+                    item["cve"].get("description", {}).get("description_data", [])
+                ),
+                item.get("lastModifiedDate", ""),
+            )
+
+    @staticmethod
+    def format_score(score: Any) -> Union[str, None]:
+        if score is None:
+            return None
+        # Scores are stored as text so that they are read back exactly as written
+        return str(Decimal(str(score)).quantize(Decimal("0.1")))
+
+    @staticmethod
+    def english_description(descriptions: list[dict[str, str]]) -> str:
+        for description in descriptions:
+            if description.get("lang") == "en":
+                return description.get("value", "")
+        return descriptions[0].get("value", "") if len(descriptions) > 0 else ""
@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Union
+from urllib.parse import urlparse
+
+from contentctl.helper.utils import Utils
+
+if TYPE_CHECKING:
+    import requests
+
+# Bump this whenever the layout of the cache changes.
+# A cache with a different version is emptied.
+APP_CACHE_VERSION = 2
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_TIMEOUT_SECONDS = 60
+DEFAULT_MAX_WORKERS = 4
+
+
+class AppCache:
+    """
+    A content-addressed cache of app packages, such as those installed on test instances or
+    downloaded from Splunkbase. Each package is stored once, under its sha256, and is found by
+    a key which identifies where it came from: its URL, or the uid and version of a Splunkbase
+    app. A package is verified against its sha256 whenever it is taken from the cache, and an
+    interrupted download is resumed the next time it is attempted. Once the cache grows larger
+    than max_size_bytes, the least recently used packages are evicted.
+
+    Packages are staged (for example, into the apps directory shared with test containers) by
+    hardlinking them, falling back to a copy when the destination is on another filesystem.
+    A staged package must not be modified in place, since that would modify the cached package.
+    """
+
+    def __init__(self, root: pathlib.Path, max_size_bytes: int):
+        self.root = root
+        self.max_size_bytes = max_size_bytes
+        self.index_file = root / "index.pickle"
+        self.lock = threading.Lock()
+        # The keys of the packages which have been verified during this run
+        self.verified: set[str] = set()
+        self.entries: dict[str, dict[str, Any]] = self.load_index()
+
+    @staticmethod
+    def splunkbase_key(uid: int, version: str) -> str:
+        return f"splunkbase:{uid}:{version}"
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        return f"url:{url}"
+
+    def object_path(self, sha256: str) -> pathlib.Path:
+        return self.root / "objects" / sha256[:2] / sha256
+
+    def get(self, key: str) -> Union[pathlib.Path, None]:
+        """
+        Returns:
+            Union[pathlib.Path, None]: The path of the cached package with this key, or None if
+            it is not cached, or no longer matches its sha256 (in which case it is evicted).
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            sha256 = entry["sha256"]
+            valid = key in self.verified
+
+        # Packages may be large, so they are hashed without holding the lock
+        path = self.object_path(sha256)
+        if not valid:
+            try:
+                valid = self.hash_file(path) == sha256
+            except OSError:
+                valid = False
+
+        with self.lock:
+            if self.entries.get(key) is not entry:
+                # The entry was replaced or evicted while it was being verified
+                replaced = True
+            elif valid:
+                replaced = False
+                self.verified.add(key)
+                entry["last_used"] = time.time()
+                self.save_index()
+            else:
+                replaced = False
+                self.remove_entry(key)
+                self.save_index()
+        if replaced:
+            return self.get(key)
+        return path if valid else None
+
+    def name(self, key: str) -> str:
+        """
+        Returns:
+            str: The file name of the package with this key, when it was added to the cache.
+        """
+        return self.entries[key]["name"]
+
+    def add_file(self, key: str, source: pathlib.Path) -> pathlib.Path:
+        """
+        Add a copy of a package which is already on disk to the cache.
+
+        Returns:
+            pathlib.Path: The path of the cached package.
+        """
+        sha256 = self.hash_file(source)
+        path = self.object_path(sha256)
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            shutil.copyfile(source, temp_path)
+            os.replace(temp_path, path)
+        return self.add_entry(key, sha256, source.name, path)
+
+    def download(
+        self,
+        key: str,
+        url: str,
+        session: Union[requests.Session, None] = None,
+        expected_sha256: Union[str, None] = None,
+    ) -> pathlib.Path:
+        """
+        Download a package into the cache, unless it is already cached. If an earlier download
+        of the same key was interrupted, it is resumed rather than started again, as long as
+        the server supports range requests.
+
+        Returns:
+            pathlib.Path: The path of the cached package.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        import requests
+
+        session = session or requests.Session()
+        partial_dir = self.root / "partial"
+        partial_dir.mkdir(parents=True, exist_ok=True)
+        partial = (
+            partial_dir / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.part"
+        )
+        offset = partial.stat().st_size if partial.is_file() else 0
+
+        print(f"Downloading {url} into the app cache...")
+        with session.get(
+            url,
+            stream=True,
+            timeout=DOWNLOAD_TIMEOUT_SECONDS,
+            headers={"Range": f"bytes={offset}-"} if offset > 0 else {},
+        ) as response:
+            if response.status_code == 416:
+                # The partial download is not a prefix of the package, so start again
+                partial.unlink()
+                return self.download(key, url, session, expected_sha256)
+            response.raise_for_status()
+            # A server which ignores the range sends the whole package again
+            with open(partial, "ab" if response.status_code == 206 else "wb") as output:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    output.write(chunk)
+
+        sha256 = self.hash_file(partial)
+        if expected_sha256 is not None and sha256 != expected_sha256.lower():
+            partial.unlink()
+            raise ValueError(
+                f"The package downloaded from {url} has sha256 {sha256}, "
+                f"but {expected_sha256} was expected"
+            )
+        path = self.object_path(sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(partial, path)
+        name = pathlib.PurePosixPath(urlparse(url).path).name
+        return self.add_entry(key, sha256, name, path)
+
+    def download_all(
+        self,
+        urls: dict[str, str],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ) -> dict[str, pathlib.Path]:
+        """
+        Download every package which is not already cached, at the same time.
+
+        Args:
+            urls (dict[str, str]): The URL of each package, by key.
+
+        Returns:
+            dict[str, pathlib.Path]: The path of each cached package, by key.
+        """
+        import requests
+
+        session = requests.Session()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                key: executor.submit(self.download, key, url, session)
+                for key, url in urls.items()
+            }
+            return {key: future.result() for key, future in futures.items()}
+
+    @staticmethod
+    def stage(source: pathlib.Path, destination: pathlib.Path) -> None:
+        """
+        Hardlink a package to destination, replacing whatever was there, or copy it if it
+        cannot be hardlinked.
+        """
+        if destination.is_file() and source.samefile(destination):
+            return
+        elif destination.exists() and not destination.is_file():
+            raise Exception(
+                f"[{destination}] exists, but it is not a file.  It cannot be overwritten."
+            )
+        destination.unlink(missing_ok=True)
+        try:
+            os.link(source, destination)
+        except OSError:
+            shutil.copyfile(source, destination)
+
+    def add_entry(
+        self, key: str, sha256: str, name: str, path: pathlib.Path
+    ) -> pathlib.Path:
+        with self.lock:
+            self.entries[key] = {
+                "sha256": sha256,
+                "name": name,
+                "size": path.stat().st_size,
+                "last_used": time.time(),
+            }
+            self.verified.add(key)
+            self.evict(keep=key)
+            self.save_index()
+        return path
+
+    def remove_entry(self, key: str) -> None:
+        sha256 = self.entries.pop(key)["sha256"]
+        self.verified.discard(key)
+        # Several keys (such as two URLs of the same package) may share one package
+        if all(entry["sha256"] != sha256 for entry in self.entries.values()):
+            self.object_path(sha256).unlink(missing_ok=True)
+
+    def evict(self, keep: str) -> None:
+        sizes = {entry["sha256"]: entry["size"] for entry in self.entries.values()}
+        total_size = sum(sizes.values())
+        for key in sorted(self.entries, key=lambda k: self.entries[k]["last_used"]):
+            if total_size <= self.max_size_bytes:
+                break
+            if key == keep:
+                continue
+            sha256 = self.entries[key]["sha256"]
+            self.remove_entry(key)
+            if all(entry["sha256"] != sha256 for entry in self.entries.values()):
+                total_size -= sizes[sha256]
+
+    def load_index(self) -> dict[str, dict[str, Any]]:
+        index = Utils.load_versioned_cache(self.index_file, APP_CACHE_VERSION)
+        # A missing, corrupt, or outdated index is an empty cache
+        return index if isinstance(index, dict) else {}
+
+    def save_index(self) -> None:
+        Utils.atomic_write_cache(self.index_file, APP_CACHE_VERSION, self.entries)
+
+    @staticmethod
+    def hash_file(path: pathlib.Path) -> str:
+        with open(path, "rb") as file_handle:
+            return hashlib.file_digest(file_handle, "sha256").hexdigest()
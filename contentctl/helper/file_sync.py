@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+import shutil
+import sys
+from dataclasses import dataclass
+
+if sys.platform == "linux":
+    import fcntl
+
+# The Linux ioctl which makes one file a reflink (a copy-on-write clone) of another
+FICLONE = 0x40049409
+
+# The number of characters of text encoded and written at a time by write_text
+WRITE_TEXT_CHUNK_SIZE = 2**20
+
+# Files with these suffixes are never written to by a build once they have been copied
+# from the app template, so they may be hardlinked to the template instead of copied
+STATIC_ASSET_SUFFIXES = {
+    ".gif",
+    ".ico",
+    ".jpeg",
+    ".jpg",
+    ".png",
+    ".svg",
+}
+
+
+@dataclass
+class SyncStats:
+    unchanged: int = 0
+    copied: int = 0
+    linked: int = 0
+    removed: int = 0
+
+
+def sync_directory(source: pathlib.Path, destination: pathlib.Path) -> SyncStats:
+    """
+    Make destination a copy of source, like removing it and then copying source to it, but
+    only copy the files which changed since destination was last synced. A file is unchanged
+    if it has the same size and modification time as in source (or, failing that, the same
+    contents). Files and directories which are not in source are removed. Static assets are
+    hardlinked to source, rather than copied, where possible.
+    """
+    stats = SyncStats()
+    source_files: set[pathlib.Path] = set()
+    source_directories: set[pathlib.Path] = {pathlib.Path(".")}
+    for directory, directory_names, file_names in os.walk(source, followlinks=True):
+        relative_directory = pathlib.Path(directory).relative_to(source)
+        source_directories.update(relative_directory / name for name in directory_names)
+        destination_directory = destination / relative_directory
+        if destination_directory.is_symlink() or destination_directory.is_file():
+            destination_directory.unlink()
+        destination_directory.mkdir(parents=True, exist_ok=True)
+        for file_name in file_names:
+            relative_path = relative_directory / file_name
+            source_files.add(relative_path)
+            source_path = source / relative_path
+            destination_path = destination / relative_path
+            if is_unchanged(source_path, destination_path):
+                stats.unchanged += 1
+            elif place_file(
+                source_path,
+                destination_path,
+                link=source_path.suffix.lower() in STATIC_ASSET_SUFFIXES,
+                preserve_metadata=True,
+            ):
+                stats.linked += 1
+            else:
+                stats.copied += 1
+
+    # Remove everything else, including all of the files written by the last build
+    for directory, directory_names, file_names in os.walk(destination, topdown=True):
+        relative_directory = pathlib.Path(directory).relative_to(destination)
+        for directory_name in list(directory_names):
+            if relative_directory / directory_name not in source_directories:
+                shutil.rmtree(pathlib.Path(directory) / directory_name)
+                directory_names.remove(directory_name)
+                stats.removed += 1
+        for file_name in file_names:
+            if relative_directory / file_name not in source_files:
+                (pathlib.Path(directory) / file_name).unlink()
+                stats.removed += 1
+    return stats
+
+
+def is_unchanged(source_path: pathlib.Path, destination_path: pathlib.Path) -> bool:
+    try:
+        destination_stat = destination_path.lstat()
+    except FileNotFoundError:
+        return False
+    source_stat = source_path.stat()
+    if not destination_path.is_file() or destination_path.is_symlink():
+        return False
+    if destination_stat.st_size != source_stat.st_size:
+        return False
+    if destination_stat.st_mtime_ns == source_stat.st_mtime_ns:
+        return True
+    if file_digest(source_path) != file_digest(destination_path):
+        return False
+    # Record that the contents are the same, so they are not hashed again next time
+    shutil.copystat(source_path, destination_path)
+    return True
+
+
+def place_file(
+    source_path: pathlib.Path,
+    destination_path: pathlib.Path,
+    link: bool = False,
+    preserve_metadata: bool = False,
+) -> bool:
+    """
+    Replace destination_path with the contents of source_path. If link is True, it is
+    hardlinked to source_path if they are on the same filesystem. Otherwise, it is copied
+    with copy_file.
+
+    Returns:
+        bool: True if the file was hardlinked, or False if it was copied.
+    """
+    # Never write through an existing file, which may itself be a hardlink
+    if destination_path.is_dir() and not destination_path.is_symlink():
+        shutil.rmtree(destination_path)
+    else:
+        destination_path.unlink(missing_ok=True)
+    if link:
+        try:
+            os.link(source_path, destination_path)
+            return True
+        except OSError:
+            # For example, the files are on different filesystems
+            pass
+    copy_file(source_path, destination_path)
+    if preserve_metadata:
+        shutil.copystat(source_path, destination_path)
+    return False
+
+
+def copy_file(source_path: pathlib.Path, destination_path: pathlib.Path) -> None:
+    """
+    Copy a file without reading it into Python. Where the filesystem supports it (for
+    example, btrfs and XFS), the copy is a reflink which shares the blocks of the source until
+    either file is written to. Otherwise, the kernel copies the file (on Linux, with sendfile).
+    """
+    if sys.platform == "linux":
+        with (
+            open(source_path, "rb") as source_file,
+            open(destination_path, "wb") as destination_file,
+        ):
+            try:
+                fcntl.ioctl(destination_file.fileno(), FICLONE, source_file.fileno())
+                return
+            except OSError:
+                # Most filesystems (including ext4) cannot reflink
+                pass
+    shutil.copyfile(source_path, destination_path)
+
+
+def file_digest(path: pathlib.Path) -> str:
+    with open(path, "rb") as file_handle:
+        return hashlib.file_digest(file_handle, "sha256").hexdigest()
+
+
+def write_text(text: str, destination_path: pathlib.Path) -> None:
+    """
+    Write text to a file a chunk at a time, so that it is never copied (or encoded) all at
+    once. This matters for large text, such as the contents of a RuntimeCSV.
+    """
+    with open(destination_path, "w") as destination_file:
+        for start in range(0, len(text), WRITE_TEXT_CHUNK_SIZE):
+            destination_file.write(text[start : start + WRITE_TEXT_CHUNK_SIZE])
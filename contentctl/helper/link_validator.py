@@ -1,195 +1,239 @@
-from pydantic import BaseModel, model_validator
-from typing import Union, Callable, Any
+from __future__ import annotations
+
+import pathlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Union
+from urllib.parse import urlparse
+
 import requests
+import requests.adapters
 import urllib3
 import urllib3.exceptions
-import time
-import abc
+from pydantic import BaseModel
+
+from contentctl.helper.utils import Utils
 
-import os
-import shelve
+if TYPE_CHECKING:
+    from contentctl.input.director import DirectorOutputDto
 
 DEFAULT_USER_AGENT_STRING = "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/101.0.4951.41 Safari/537.36"
 ALLOWED_HTTP_CODES = [200]
 
+# Bump this whenever the format of the cache changes.
+# A cache with a different version is ignored.
+REFERENCE_CACHE_VERSION = 2
+
+DEFAULT_MAX_WORKERS = 16
+# Limit the load put on any one server, and the chance of being rate limited by it
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 4
+DEFAULT_TIMEOUT_SECONDS = 15
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
 
 class LinkStats(BaseModel):
-    # Static Values
-    method: Callable = requests.get
-    allowed_http_codes: list[int] = ALLOWED_HTTP_CODES
-    access_count: int = 1  # when constructor is called, it has been accessed once!
-    timeout_seconds: int = 15
-    allow_redirects: bool = True
-    headers: dict = {"User-Agent": DEFAULT_USER_AGENT_STRING}
-    verify_ssl: bool = False
-    if verify_ssl is False:
-        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-
-    # Values generated at runtime.
-    # We need to assign these some default values to get the
-    # validation working since ComputedField has not yet been
-    # introduced to Pydantic
     reference: str
-    referencing_files: set[str]
+    referencing_files: set[str] = set()
     redirect: Union[str, None] = None
     status_code: int = 0
     valid: bool = False
     resolution_time: float = 0
+    # When the reference was checked, in seconds since the epoch
+    checked_at: float = 0
+
+    def is_expired(self, now: float, success_ttl: float, failure_ttl: float) -> bool:
+        ttl = success_ttl if self.valid else failure_ttl
+        return now - self.checked_at >= ttl
+
+
+class LinkValidator:
+    """
+    Check that every reference link in the content can be resolved. The links are checked
+    concurrently, with a limit on the number of connections made to each host, and each
+    connection is kept alive and reused for the other links on the same host. Each link is
+    first requested with HEAD, falling back to GET for servers that do not answer HEAD
+    requests properly. If a cache file is given, the results are cached in it, and a link is
+    only checked again once its result has expired. Failures usually expire much sooner than
+    successes, since they are often caused by a transient error.
+    """
+
+    def __init__(
+        self,
+        cache_file: Union[pathlib.Path, None] = None,
+        success_ttl_seconds: float = 7 * 24 * 60 * 60,
+        failure_ttl_seconds: float = 60 * 60,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_connections_per_host: int = DEFAULT_MAX_CONNECTIONS_PER_HOST,
+        timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+        verify_ssl: bool = False,
+    ):
+        self.cache_file = cache_file
+        self.success_ttl_seconds = success_ttl_seconds
+        self.failure_ttl_seconds = failure_ttl_seconds
+        self.max_workers = max_workers
+        self.max_connections_per_host = max_connections_per_host
+        self.timeout_seconds = timeout_seconds
+        self.verify_ssl = verify_ssl
+        self.cache: dict[str, LinkStats] = self.load_cache()
+        self.uncached_checks = 0
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = DEFAULT_USER_AGENT_STRING
+        # urllib3 keeps a separate pool of connections for each host
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=max_workers,
+            pool_maxsize=max_connections_per_host,
+            pool_block=True,
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.host_limits: dict[str, threading.BoundedSemaphore] = {}
+        self.host_limits_lock = threading.Lock()
 
-    def is_link_valid(self, referencing_file: str) -> bool:
-        self.access_count += 1
-        self.referencing_files.add(referencing_file)
-        return self.valid
-
-    @model_validator(mode="before")
-    def check_reference(cls, data: Any) -> Any:
-        start_time = time.time()
-        # Get out all the fields names to make them easier to reference
-        method = data["method"]
-        reference = data["reference"]
-        timeout_seconds = data["timeout_seconds"]
-        headers = data["headers"]
-        allow_redirects = data["allow_redirects"]
-        verify_ssl = data["verify_ssl"]
-        allowed_http_codes = data["allowed_http_codes"]
-        if not (reference.startswith("http://") or reference.startswith("https://")):
-            raise (
-                ValueError(
-                    f"Reference {reference} does not begin with http(s). Only http(s) references are supported"
-                )
+    @staticmethod
+    def collect_references(
+        director_output_dto: DirectorOutputDto,
+    ) -> dict[str, set[str]]:
+        """
+        Returns:
+            dict[str, set[str]]: Every reference link in the content, mapped to the files
+            of the content which reference it.
+        """
+        references: dict[str, set[str]] = {}
+        for content in director_output_dto.name_to_content_map.values():
+            for reference in getattr(content, "references", None) or []:
+                references.setdefault(str(reference), set()).add(str(content.file_path))
+        return references
+
+    def validate_references(self, references: dict[str, set[str]]) -> list[LinkStats]:
+        """
+        Check every reference link which is not in the cache, or whose result has expired.
+
+        Args:
+            references (dict[str, set[str]]): Each reference link, mapped to the files
+                which reference it.
+
+        Returns:
+            list[LinkStats]: The links which could not be resolved, sorted by status code.
+        """
+        now = time.time()
+        to_check = sorted(
+            reference
+            for reference in references
+            if reference not in self.cache
+            or self.cache[reference].is_expired(
+                now, self.success_ttl_seconds, self.failure_ttl_seconds
             )
+        )
+        self.uncached_checks = len(to_check)
+        if len(to_check) > 0:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                for stats in executor.map(self.check_reference, to_check):
+                    self.cache[stats.reference] = stats
+            self.save_cache()
+
+        failures: list[LinkStats] = []
+        for reference, referencing_files in references.items():
+            stats = self.cache[reference]
+            if not stats.valid:
+                failures.append(
+                    stats.model_copy(update={"referencing_files": referencing_files})
+                )
+        failures.sort(key=lambda stats: (stats.status_code, stats.reference))
+        return failures
 
-        try:
-            get = method(
-                reference,
-                timeout=timeout_seconds,
-                headers=headers,
-                allow_redirects=allow_redirects,
-                verify=verify_ssl,
+    def check_reference(self, reference: str) -> LinkStats:
+        if not (reference.startswith("http://") or reference.startswith("https://")):
+            raise ValueError(
+                f"Reference {reference} does not begin with http(s). Only http(s) references are supported"
             )
-            resolution_time = time.time() - start_time
-            data["status_code"] = get.status_code
-            data["resolution_time"] = resolution_time
-            if reference != get.url:
-                data["redirect"] = get.url
-            else:
-                data["redirect"] = None  # None is also already the default
-
-            # Returns the updated values and sets them for the object
-            if get.status_code in allowed_http_codes:
-                data["valid"] = True
-            else:
-                # print(f"Unacceptable HTTP Status Code {get.status_code} received for {reference}")
-                data["valid"] = False
-            return data
-
-        except Exception:
-            resolution_time = time.time() - start_time
-            # print(f"Reference {reference} was not reachable after {resolution_time:.2f} seconds")
-            data["status_code"] = 0
-            data["valid"] = False
-            data["redirect"] = None
-            data["resolution_time"] = resolution_time
-            return data
-
 
-class LinkValidator(abc.ABC):
-    cache: Union[dict[str, LinkStats], shelve.Shelf] = {}
-    uncached_checks: int = 0
-    total_checks: int = 0
-    # cache: dict[str,LinkStats] = {}
-
-    use_file_cache: bool = False
-    reference_cache_file: str = "lookups/REFERENCE_CACHE.db"
-
-    @staticmethod
-    def initialize_cache(use_file_cache: bool = False):
-        LinkValidator.use_file_cache = use_file_cache
-        if use_file_cache is False:
-            return
-        if not os.path.exists(LinkValidator.reference_cache_file):
-            print(
-                f"Cache at {LinkValidator.reference_cache_file} not found - Creating it."
+        start_time = time.time()
+        with self.host_limit(urlparse(reference).netloc):
+            response = None
+            try:
+                response = self.request("HEAD", reference)
+            except requests.RequestException:
+                pass
+            # Many servers reject or mishandle HEAD requests, so only a
+            # failure of a GET request means that the link is broken
+            if response is None or response.status_code not in ALLOWED_HTTP_CODES:
+                try:
+                    response = self.request("GET", reference)
+                except requests.RequestException:
+                    response = None
+
+        if response is None:
+            return LinkStats(
+                reference=reference,
+                resolution_time=time.time() - start_time,
+                checked_at=start_time,
             )
+        return LinkStats(
+            reference=reference,
+            redirect=response.url if response.url != reference else None,
+            status_code=response.status_code,
+            valid=response.status_code in ALLOWED_HTTP_CODES,
+            resolution_time=time.time() - start_time,
+            checked_at=start_time,
+        )
+
+    def request(self, method: str, reference: str) -> requests.Response:
+        # Only the status is needed. A HEAD response has no body, so it is read as usual,
+        # which returns its connection to the pool to be reused. The body of a GET response is
+        # never downloaded, so its connection is closed instead.
+        with self.session.request(
+            method,
+            reference,
+            timeout=self.timeout_seconds,
+            allow_redirects=True,
+            verify=self.verify_ssl,
+            stream=method != "HEAD",
+        ) as response:
+            return response
+
+    def host_limit(self, host: str) -> threading.BoundedSemaphore:
+        with self.host_limits_lock:
+            if host not in self.host_limits:
+                self.host_limits[host] = threading.BoundedSemaphore(
+                    self.max_connections_per_host
+                )
+            return self.host_limits[host]
 
+    def load_cache(self) -> dict[str, LinkStats]:
+        if self.cache_file is None:
+            return {}
+        cache = Utils.load_versioned_cache(self.cache_file, REFERENCE_CACHE_VERSION)
         try:
-            LinkValidator.cache = shelve.open(
-                LinkValidator.reference_cache_file, flag="c", writeback=True
-            )
+            return {
+                reference: LinkStats.model_validate(stats)
+                for reference, stats in cache["links"].items()
+            }
         except Exception:
-            print(
-                f"Failed to create the cache file {LinkValidator.reference_cache_file}.  Reference info will not be cached."
-            )
-            LinkValidator.cache = {}
-
-        # Remove all of the failures to force those resources to be resolved again
-        failed_refs = []
-        for ref in LinkValidator.cache.keys():
-            if LinkValidator.cache[ref].status_code not in ALLOWED_HTTP_CODES:
-                failed_refs.append(ref)
-                # can't remove it here because this will throw an error:
-                # cannot change size of dictionary while iterating over it
-            else:
-                # Set the reference count to 0 and referencing files to empty set
-                LinkValidator.cache[ref].access_count = 0
-                LinkValidator.cache[ref].referencing_files = set()
-
-        for ref in failed_refs:
-            del LinkValidator.cache[ref]
+            # A missing, corrupt, or outdated cache is just a cache miss
+            return {}
 
-    @staticmethod
-    def close_cache():
-        if LinkValidator.use_file_cache:
-            LinkValidator.cache.close()
-
-    @staticmethod
-    def validate_reference(
-        reference: str, referencing_file: str, raise_exception_if_failure: bool = False
-    ) -> bool:
-        LinkValidator.total_checks += 1
-        if reference not in LinkValidator.cache:
-            LinkValidator.uncached_checks += 1
-            LinkValidator.cache[reference] = LinkStats(
-                reference=reference, referencing_files=set([referencing_file])
-            )
-        result = LinkValidator.cache[reference].is_link_valid(referencing_file)
-
-        # print(f"Total Checks: {LinkValidator.total_checks}, Percent Cached: {100*(1 - LinkValidator.uncached_checks / LinkValidator.total_checks):.2f}")
-
-        if result is True:
-            return True
-        elif raise_exception_if_failure is True:
-            raise (Exception(f"Reference Link Failed: {reference}"))
-        else:
-            return False
+    def save_cache(self) -> None:
+        if self.cache_file is None:
+            return
+        Utils.atomic_write_cache(
+            self.cache_file,
+            REFERENCE_CACHE_VERSION,
+            {
+                "links": {
+                    reference: stats.model_dump(exclude={"referencing_files"})
+                    for reference, stats in self.cache.items()
+                }
+            },
+        )
 
     @staticmethod
-    def print_link_validation_errors():
-        failures = [
-            LinkValidator.cache[k]
-            for k in LinkValidator.cache
-            if LinkValidator.cache[k].valid is False
-        ]
-        failures.sort(key=lambda d: d.status_code)
+    def print_link_validation_errors(failures: list[LinkStats]) -> None:
         for failure in failures:
             print(
                 f"Link {failure.reference} invalid with HTTP Status Code [{failure.status_code}] and referenced by the following files:"
             )
-            for ref in failure.referencing_files:
+            for ref in sorted(failure.referencing_files):
                 print(f"\t* {ref}")
-
-    @staticmethod
-    def SecurityContentObject_validate_references(v: list, values: dict) -> list:
-        if "check_references" not in values:
-            raise (Exception("Member 'check_references' missing from Baseline!"))
-        elif values["check_references"] is False:
-            # Reference checking is enabled
-            pass
-        elif values["check_references"] is True:
-            for reference in v:
-                LinkValidator.validate_reference(reference, values["name"])
-                # Remove the check_references key from the values dict so that it is not
-        # output by the serialization code
-        del values["check_references"]
-
-        return v
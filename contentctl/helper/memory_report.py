@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import enum
+import sys
+import tracemalloc
+from collections import defaultdict
+from typing import TYPE_CHECKING, Any
+
+from pydantic import BaseModel
+
+from contentctl.objects.abstract_security_content_objects.security_content_object_abstract import (
+    SecurityContentObject_Abstract,
+)
+
+if TYPE_CHECKING:
+    from contentctl.input.director import DirectorOutputDto
+
+# The number of fields, and of source files, listed in the report
+REPORT_TOP_ENTRIES = 15
+
+
+def deep_size(value: Any, seen: set[int], root: Any = None) -> int:
+    """
+    The number of bytes taken by value and everything that it references, which have not
+    already been counted (that is, whose ids are not in seen). Content other than root is
+    not counted, since it is counted under its own type. Objects shared by several pieces
+    of content, such as enrichments, are counted under the first content to reference them.
+    """
+    size = 0
+    to_visit = [value]
+    while len(to_visit) > 0:
+        item = to_visit.pop()
+        if id(item) in seen or isinstance(item, (type, enum.Enum)):
+            continue
+        if isinstance(item, SecurityContentObject_Abstract) and item is not root:
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        if isinstance(item, dict):
+            to_visit.extend(item.keys())
+            to_visit.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            to_visit.extend(item)
+        elif isinstance(item, BaseModel):
+            to_visit.append(item.__dict__)
+            if item.__pydantic_private__ is not None:
+                to_visit.append(item.__pydantic_private__)
+        elif hasattr(item, "__dict__") and not callable(item):
+            to_visit.append(item.__dict__)
+    return size
+
+
+class MemoryReport:
+    """
+    Reports the memory retained by content once it has been constructed. tracemalloc must be
+    started before the content is constructed, so that the total retained memory, and the
+    source files which allocated it, can be reported. The size of each content type, and of
+    each field of each content type, is measured by walking the content itself.
+    """
+
+    def __init__(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def print_report(self, output_dto: DirectorOutputDto, title: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        statistics = tracemalloc.take_snapshot().statistics("filename")
+
+        seen: set[int] = set()
+        type_sizes: dict[str, int] = defaultdict(int)
+        type_counts: dict[str, int] = defaultdict(int)
+        field_sizes: dict[tuple[str, str], int] = defaultdict(int)
+        for content in output_dto.name_to_content_map.values():
+            type_name = type(content).__name__
+            type_counts[type_name] += 1
+            # The object itself, without its fields
+            seen.add(id(content))
+            seen.add(id(content.__dict__))
+            size = sys.getsizeof(content) + sys.getsizeof(content.__dict__)
+            for field_name, value in content.__dict__.items():
+                field_size = deep_size(value, seen, content)
+                field_sizes[(type_name, field_name)] += field_size
+                size += field_size
+            type_sizes[type_name] += size
+
+        print(f"----- Memory report: {title} -----")
+        print(
+            f"Traced memory: [{current / 2**20:.1f}] MiB, peak [{peak / 2**20:.1f}] MiB"
+        )
+        print("Retained by each content type:")
+        for type_name, size in sorted(type_sizes.items(), key=lambda t: -t[1]):
+            print(
+                f"  {type_name:<30} [{size / 2**20:8.2f}] MiB in [{type_counts[type_name]}] objects"
+            )
+        print(f"Largest {REPORT_TOP_ENTRIES} fields:")
+        for (type_name, field_name), size in sorted(
+            field_sizes.items(), key=lambda t: -t[1]
+        )[:REPORT_TOP_ENTRIES]:
+            print(f"  {f'{type_name}.{field_name}':<50} [{size / 2**20:8.2f}] MiB")
+        print(f"Largest {REPORT_TOP_ENTRIES} allocating source files:")
+        for statistic in statistics[:REPORT_TOP_ENTRIES]:
+            filename = statistic.traceback[0].filename
+            print(f"  {filename:<80} [{statistic.size / 2**20:8.2f}] MiB")
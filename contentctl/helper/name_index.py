@@ -0,0 +1,125 @@
+import heapq
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+# This many of the names sharing the most trigrams with the name being looked up are
+# scored first. The better they score, the fewer of the other names need to be scored.
+MAX_SUGGESTION_CANDIDATES = 200
+
+
+class NameIndex:
+    """
+    Trigram index of content names, used to suggest the names that a misspelled or
+    missing name was most likely meant to be. Names are indexed by the type of content
+    they belong to, so that suggestions can be limited to the expected type.
+
+    Suggestions are exactly those of difflib.get_close_matches over the names of the
+    expected type, but far fewer names are scored. The names which share the highest
+    proportion of trigrams with the name being looked up are scored first. Every other
+    name is only scored if it could still be one of the best suggestions, judging by its
+    length and then by the characters it has in common (the same upper bounds on the
+    score which get_close_matches checks before scoring a name).
+    """
+
+    def __init__(self) -> None:
+        # type of content -> trigram -> names of that type containing the trigram
+        self.postings: dict[type, defaultdict[str, set[str]]] = {}
+        # name -> number of distinct trigrams in the name
+        self.trigram_counts: dict[str, int] = {}
+        # type of content -> length -> names of that type and length
+        self.lengths: dict[type, defaultdict[int, set[str]]] = {}
+
+    @staticmethod
+    def trigrams(name: str) -> set[str]:
+        # Pad the name so that its first and last characters appear in several trigrams
+        padded = f"  {name.lower()} "
+        return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+    def add(self, name: str, content_type: type) -> None:
+        postings = self.postings.setdefault(content_type, defaultdict(set))
+        trigrams = self.trigrams(name)
+        for trigram in trigrams:
+            postings[trigram].add(name)
+        self.trigram_counts[name] = len(trigrams)
+        self.lengths.setdefault(content_type, defaultdict(set))[len(name)].add(name)
+
+    def suggest(
+        self,
+        name: str,
+        content_type: type | None = None,
+        n: int = 3,
+        cutoff: float = 0.6,
+    ) -> list[str]:
+        """
+        Return up to n of the names most similar to name, best first.
+
+        Args:
+            name (str): The name to find similar names for.
+            content_type (type | None, optional): Only suggest the names of content of this
+                type, or of a subclass of it. Defaults to None, which suggests any name.
+            n (int, optional): The maximum number of names to suggest. Defaults to 3.
+            cutoff (float, optional): Names scoring lower than this, on the same scale as
+                difflib.get_close_matches, are never suggested. Defaults to 0.6.
+        """
+        if n <= 0:
+            raise ValueError(f"n must be > 0: {n!r}")
+        content_types = [
+            indexed_type
+            for indexed_type in self.postings
+            if content_type is None or issubclass(indexed_type, content_type)
+        ]
+        shared_trigrams: Counter[str] = Counter()
+        trigrams = self.trigrams(name)
+        for indexed_type in content_types:
+            postings = self.postings[indexed_type]
+            for trigram in trigrams:
+                shared_trigrams.update(postings.get(trigram, ()))
+
+        # Rank the candidates by the proportion of their trigrams which are shared, so that
+        # long names are not favoured. Break ties by name so that the candidates do not
+        # depend on the order in which names were added.
+        candidates = heapq.nsmallest(
+            MAX_SUGGESTION_CANDIDATES,
+            shared_trigrams.items(),
+            key=lambda item: (
+                -item[1] / (len(trigrams) + self.trigram_counts[item[0]]),
+                item[0],
+            ),
+        )
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(name)
+        # The best n names so far, as a heap of (score, name) whose smallest item is the
+        # worst of them. Like get_close_matches, ties are broken by name.
+        best: list[tuple[float, str]] = []
+
+        def score(candidate: str) -> None:
+            # Once there are n suggestions, a name must do at least as well as the worst
+            minimum = best[0][0] if len(best) == n else cutoff
+            # The same checks, in the same order, as difflib.get_close_matches
+            matcher.set_seq1(candidate)
+            if (
+                matcher.real_quick_ratio() >= minimum
+                and matcher.quick_ratio() >= minimum
+                and matcher.ratio() >= cutoff
+            ):
+                heapq.heappush(best, (matcher.ratio(), candidate))
+                if len(best) > n:
+                    heapq.heappop(best)
+
+        for candidate, _ in candidates:
+            score(candidate)
+
+        # Then every other name, unless its length is too different from the length of
+        # name for it to be one of the best n (which real_quick_ratio would reject)
+        scored = {candidate for candidate, _ in candidates}
+        for indexed_type in content_types:
+            for length, names in self.lengths[indexed_type].items():
+                minimum = best[0][0] if len(best) == n else cutoff
+                total = length + len(name)
+                if total > 0 and 2.0 * min(length, len(name)) / total < minimum:
+                    continue
+                for candidate in names - scored:
+                    score(candidate)
+
+        return [candidate for _, candidate in sorted(best, reverse=True)]
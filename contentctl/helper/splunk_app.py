@@ -1,5 +1,7 @@
 import json
-from typing import Optional, Collection
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Collection, Union
 from pathlib import Path
 import xml.etree.ElementTree as ET
 from urllib.parse import urlencode
@@ -10,10 +12,16 @@ import xmltodict
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from contentctl.helper.utils import Utils
+
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 MAX_RETRY = 3
 
+# Bump this whenever the format of the latest version cache changes.
+# A cache with a different version is ignored.
+LATEST_VERSION_CACHE_VERSION = 2
+
 
 class APIEndPoint:
     """
@@ -79,6 +87,7 @@ class SplunkApp:
         app_uid: Optional[int] = None,
         app_name_id: Optional[str] = None,
         manual_setup: bool = False,
+        session: Optional[requests.Session] = None,
     ) -> None:
         if app_uid is None and app_name_id is None:
             raise SplunkApp.InitializationError(
@@ -90,6 +99,8 @@ class SplunkApp:
         self.app_uid: Optional[int] = app_uid
         self.app_name_id: Optional[str] = app_name_id
         self.manual_setup = manual_setup
+        # Reuse the connections to Splunkbase for every request made for this app
+        self.session = session or self.requests_retry_session()
         self.app_title: str
         self.latest_version: str
         self.latest_version_download_url: str
@@ -132,7 +143,7 @@ class SplunkApp:
         # NOTE: auth not required
         # Get app info by uid
         try:
-            response = self.requests_retry_session().get(
+            response = self.session.get(
                 APIEndPoint.SPLUNK_BASE_APP_INFO.format(app_uid=self.app_uid),
                 timeout=RetryConstant.RETRY_INTERVAL,
             )
@@ -181,7 +192,7 @@ class SplunkApp:
         # NOTE: auth not required
         # Get app_uid by app_name_id via a redirect
         try:
-            response = self.requests_retry_session().get(
+            response = self.session.get(
                 APIEndPoint.SPLUNK_BASE_GET_UID_REDIRECT.format(
                     app_name_id=self.app_name_id
                 ),
@@ -224,7 +235,7 @@ class SplunkApp:
         """
         # retrieve app entries using the app_name_id
         try:
-            response = self.requests_retry_session().get(
+            response = self.session.get(
                 APIEndPoint.SPLUNK_BASE_FETCH_APP_BY_ENTRY_ID.format(
                     app_name_id=self.app_name_id
                 ),
@@ -263,9 +274,7 @@ class SplunkApp:
         """
         # fetch download info
         try:
-            response = self.requests_retry_session().get(
-                info_url, timeout=RetryConstant.RETRY_INTERVAL
-            )
+            response = self.session.get(info_url, timeout=RetryConstant.RETRY_INTERVAL)
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             raise SplunkBaseError(
@@ -277,22 +286,90 @@ class SplunkApp:
         download_url = build_xml.get("feed").get("entry").get("link").get("@href")
         return download_url
 
-    def set_latest_version_info(self) -> None:
+    def set_latest_version(self) -> str:
+        """
+        Set latest_version, without fetching the download URL of the latest version
+        :return: URL for download info on the latest build
+        """
         # raise if app_name_id not set
         if self.app_name_id is None:
             raise SplunkApp.InitializationError(
                 "app_name_id must be set in order to fetch latest version info"
             )
 
-        # fetch the info URL
+        # fetch the info URL and parse out the version number
         info_url = self.__fetch_url_latest_version_info()
-
-        # parse out the version number and fetch the download URL
         self.latest_version = info_url.split("/")[-1]
+        return info_url
+
+    def set_latest_version_info(self) -> None:
+        # fetch the latest version and its download URL
+        info_url = self.set_latest_version()
         self.latest_version_download_url = self.__fetch_url_latest_version_download(
             info_url
         )
 
+    @staticmethod
+    def get_latest_versions(
+        app_uids: Collection[int],
+        max_workers: int = 8,
+        cache_file: Optional[Path] = None,
+        ttl_seconds: float = 24 * 60 * 60,
+        session: Optional[requests.Session] = None,
+    ) -> dict[int, Union[str, Exception]]:
+        """
+        Fetch the latest version of many apps from Splunkbase at once. The apps are fetched
+        concurrently, sharing one session (and so its connections to Splunkbase). If a cache
+        file is given, the latest version of each app is cached in it, and is only fetched
+        again once it is older than ttl_seconds. Errors are never cached.
+        :param app_uids: the numeric UIDs of the apps
+        :param max_workers: the number of apps which may be fetched at the same time
+        :param cache_file: the Path of the cache file, if any
+        :param ttl_seconds: how long a cached latest version is used for
+        :param session: the session to fetch the apps with, if not a new one
+        :return: the latest version of each app, or the error raised while fetching it
+        """
+        now = time.time()
+        cache: dict[int, tuple[float, str]] = {}
+        if cache_file is not None:
+            cached = Utils.load_versioned_cache(
+                cache_file, LATEST_VERSION_CACHE_VERSION
+            )
+            if isinstance(cached, dict):
+                cache = cached["apps"]
+
+        latest_versions: dict[int, Union[str, Exception]] = {}
+        to_fetch: list[int] = []
+        for app_uid in sorted(set(app_uids)):
+            if app_uid in cache and now - cache[app_uid][0] < ttl_seconds:
+                latest_versions[app_uid] = cache[app_uid][1]
+            else:
+                to_fetch.append(app_uid)
+
+        session = session or SplunkApp.requests_retry_session()
+
+        def fetch(app_uid: int) -> Union[str, Exception]:
+            try:
+                app = SplunkApp(app_uid=app_uid, manual_setup=True, session=session)
+                app.set_app_name_id()
+                app.set_latest_version()
+                return app.latest_version
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for app_uid, latest_version in zip(to_fetch, executor.map(fetch, to_fetch)):
+                latest_versions[app_uid] = latest_version
+                if isinstance(latest_version, str):
+                    cache[app_uid] = (now, latest_version)
+
+        if cache_file is not None and len(to_fetch) > 0:
+            Utils.atomic_write_cache(
+                cache_file, LATEST_VERSION_CACHE_VERSION, {"apps": cache}
+            )
+
+        return latest_versions
+
     def __get_splunk_base_session_token(self, username: str, password: str) -> str:
         """
         This method will generate Splunk base session token
@@ -1,23 +1,39 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import hmac
 import logging
+import os
 import pathlib
+import pickle
 import random
+import secrets
 import shutil
 import string
+import sys
+import threading
 from math import ceil
 from timeit import default_timer
-from typing import TYPE_CHECKING, Tuple, Union
-
-import git
-import requests
-import tqdm
+from typing import TYPE_CHECKING, Any, Tuple, Union
 
+# git, requests, and tqdm are slow to import, and are only needed by some of the
+# utilities below, so they are imported by the utilities which use them
 if TYPE_CHECKING:
+    import tqdm
+
     from contentctl.objects.security_content_object import SecurityContentObject
-from contentctl.objects.security_content_object import SecurityContentObject
 
 TOTAL_BYTES = 0
 ALWAYS_PULL = True
 
+# Every file written by Utils.atomic_write_cache starts with this, followed by an HMAC of the
+# rest of the file. Cache files are pickles, which can run arbitrary code when they are loaded,
+# so a file which was not written by contentctl for this user is never loaded.
+CACHE_FILE_MAGIC = b"contentctl-cache\n"
+CACHE_KEY_FILE_NAME = "cache.key"
+CACHE_KEY_LENGTH = 32
+
 
 class Utils:
     @staticmethod
@@ -144,6 +160,8 @@ class Utils:
     def validate_git_hash(
         repo_path: str, repo_url: str, commit_hash: str, branch_name: Union[str, None]
     ) -> bool:
+        import git
+
         # Get a list of all branches
         repo = git.Repo(repo_path)
         if commit_hash is None:
@@ -190,6 +208,7 @@ class Utils:
         # similar systems, we will consinder the default branch
         # to be the name of the branch that is the HEAD of the repo.
         # This means that it should work for ANY repo with a remote.
+        import git
 
         repo = git.Repo(repo_path)
 
@@ -206,6 +225,8 @@ class Utils:
 
     @staticmethod
     def validate_git_branch_name(repo_path: str, repo_url: str, name: str) -> bool:
+        import git
+
         # Get a list of all branches
         repo = git.Repo(repo_path)
 
@@ -233,6 +254,8 @@ class Utils:
 
     @staticmethod
     def validate_git_pull_request(repo_path: str, pr_number: int) -> str:
+        import git
+
         # Get a list of all branches
         repo = git.Repo(repo_path)
         # List of all remotes that match this format.  If the PR exists, we
@@ -277,6 +300,8 @@ class Utils:
         except Exception as e:
             print(f"Could not copy local file {file_path} the file because {str(e)}")
 
+        import requests
+
         # Try to make a head request to verify existence of the file
         try:
             req = requests.head(
@@ -339,6 +364,9 @@ class Utils:
         input_pbar: Union[tqdm.tqdm, None] = None,
         overwrite_file: bool = False,
     ):
+        import requests
+        import tqdm
+
         global TOTAL_BYTES
         sourcePath = pathlib.Path(file_path)
         destinationPath = pathlib.Path(destination_file)
@@ -485,6 +513,120 @@ class Utils:
         percent = ratio * 100
         return Utils.getFixedWidth(percent, decimal_places) + "%"
 
+    @staticmethod
+    def user_cache_directory() -> pathlib.Path:
+        """
+        The directory, outside of any app, where contentctl keeps its caches for this user.
+        This is $XDG_CACHE_HOME/contentctl if XDG_CACHE_HOME is set, and otherwise the usual
+        cache directory of the platform.
+        """
+        if os.environ.get("XDG_CACHE_HOME"):
+            cache_home = pathlib.Path(os.environ["XDG_CACHE_HOME"])
+        elif sys.platform == "win32":
+            cache_home = pathlib.Path(
+                os.environ.get("LOCALAPPDATA") or pathlib.Path.home() / "AppData/Local"
+            )
+        elif sys.platform == "darwin":
+            cache_home = pathlib.Path.home() / "Library/Caches"
+        else:
+            cache_home = pathlib.Path.home() / ".cache"
+        return cache_home / "contentctl"
+
+    @staticmethod
+    def cache_signing_key() -> Union[bytes, None]:
+        """
+        The secret used to sign and verify cache files. It is created the first time that it
+        is needed, and is only readable by this user.
+
+        Returns:
+            Union[bytes, None]: The key, or None if it could not be read or created, in which
+            case nothing is read from or written to any cache.
+        """
+        return Utils.load_cache_signing_key(
+            Utils.user_cache_directory() / CACHE_KEY_FILE_NAME
+        )
+
+    @staticmethod
+    @functools.cache
+    def load_cache_signing_key(key_path: pathlib.Path) -> Union[bytes, None]:
+        try:
+            if not key_path.is_file():
+                key_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = key_path.with_suffix(
+                    f".{os.getpid()}.{threading.get_ident()}.tmp"
+                )
+                with open(
+                    os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600),
+                    "wb",
+                ) as key_file:
+                    key_file.write(secrets.token_bytes(CACHE_KEY_LENGTH))
+                try:
+                    # Unlike a rename, this fails if another process created the key first
+                    os.link(temp_path, key_path)
+                except FileExistsError:
+                    pass
+                finally:
+                    temp_path.unlink()
+            key = key_path.read_bytes()
+        except OSError:
+            return None
+        return key if len(key) == CACHE_KEY_LENGTH else None
+
+    @staticmethod
+    def load_versioned_cache(path: pathlib.Path, version: int) -> Any:
+        """
+        Load a cache file written by atomic_write_cache.
+
+        Returns:
+            Any: The payload of the cache, or None if the file is missing, unreadable, corrupt,
+            written with a different version, or was not signed by contentctl for this user.
+            Every one of these is just a cache miss.
+        """
+        key = Utils.cache_signing_key()
+        if key is None:
+            return None
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+
+        body_start = len(CACHE_FILE_MAGIC) + hashlib.sha256().digest_size
+        body = memoryview(data)[body_start:]
+        if not data.startswith(CACHE_FILE_MAGIC) or not hmac.compare_digest(
+            data[len(CACHE_FILE_MAGIC) : body_start],
+            hmac.digest(key, body, "sha256"),
+        ):
+            return None
+        try:
+            saved_version, payload = pickle.loads(body)
+        except Exception:
+            return None
+        return payload if saved_version == version else None
+
+    @staticmethod
+    def atomic_write_cache(path: pathlib.Path, version: int, payload: Any) -> None:
+        """
+        Write a cache file which can be loaded by load_versioned_cache. The file is written to
+        a temporary file and then renamed into place, so that a partially written file is never
+        read, even by concurrent processes. Failing to write a cache never fails the command
+        which is using it, so errors writing the file are ignored.
+        """
+        key = Utils.cache_signing_key()
+        if key is None:
+            return
+        temp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            # A payload which cannot be pickled is not cached either
+            body = pickle.dumps((version, payload), protocol=pickle.HIGHEST_PROTOCOL)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(temp_path, "wb") as cache_file:
+                cache_file.write(CACHE_FILE_MAGIC)
+                cache_file.write(hmac.digest(key, body, "sha256"))
+                cache_file.write(body)
+            os.replace(temp_path, path)
+        except Exception:
+            temp_path.unlink(missing_ok=True)
+
     @staticmethod
     def get_logger(
         name: str, log_level: int, log_path: str, enable_logging: bool
@@ -0,0 +1,507 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pathlib
+from typing import TYPE_CHECKING, Any, Union
+
+from pydantic import BaseModel
+
+import contentctl
+from contentctl.enrichments.attack_enrichment import AttackEnrichment
+from contentctl.enrichments.nvd_index import NvdIndex
+from contentctl.helper.utils import Utils
+from contentctl.objects.abstract_security_content_objects.security_content_object_abstract import (
+    SecurityContentObject_Abstract,
+)
+from contentctl.objects.baseline import Baseline
+from contentctl.objects.baseline_tags import BaselineTags
+from contentctl.input.repo_file_index import RepoFileIndex
+from contentctl.objects.config import validate
+from contentctl.objects.detection import Detection
+from contentctl.objects.lookup import FileBackedLookup, RuntimeCSV
+from contentctl.objects.playbook import Playbook
+from contentctl.objects.story import Story
+
+if TYPE_CHECKING:
+    from contentctl.input.director import DirectorOutputDto
+
+# Bump this whenever the format of the snapshot, or the way that
+# content is restored from it, changes
+CONTENT_SNAPSHOT_VERSION = 2
+
+# These fields are populated on an object by OTHER content as that content is
+# validated (for example, each detection appends itself to the detections of
+# its stories).  They are not dependencies of the object and are not saved in
+# the snapshot.  Instead, they are rebuilt as content is restored.
+BACK_REFERENCE_FIELDS: dict[type[BaseModel], set[str]] = {
+    Story: {"detections", "investigations", "baselines"},
+    BaselineTags: {"detections"},
+}
+
+# A fingerprint of a file: its size, modification time, and a hash of its contents
+FileFingerprint = tuple[int, int, str]
+
+
+class ContentSnapshot:
+    """
+    A snapshot of all of the content that was constructed by the last successful run of the
+    Director, used by validate --incremental.  Along with the content itself, the snapshot
+    records a fingerprint of every file the content was loaded from and, for each piece of
+    content, the names of the other content that it references.  On the next run, only the
+    content whose files changed, and the content which transitively depends on it, is
+    validated again.  Everything else is restored from the snapshot.
+
+    The snapshot is only used if it was written by the same version of contentctl with
+    the same configuration (and, when enrichments are enabled, the same versions of the
+    enrichment repos).  Otherwise, all content is validated.
+    """
+
+    def __init__(
+        self,
+        content: list[SecurityContentObject_Abstract],
+        dependencies: dict[str, set[str]],
+        file_fingerprints: dict[str, FileFingerprint],
+    ):
+        self.content = content
+        self.dependencies = dependencies
+        self.file_fingerprints = file_fingerprints
+        # The number of detections each story had when its tags were last computed
+        self.deferred_story_tags: dict[Story, int] = {}
+
+    @staticmethod
+    def snapshot_path(config: validate) -> pathlib.Path:
+        return config.cache_path / "content_snapshot.pickle"
+
+    @classmethod
+    def load(cls, config: validate) -> Union[ContentSnapshot, None]:
+        """
+        Load the snapshot written by the last successful run.
+
+        Returns:
+            Union[ContentSnapshot, None]: The snapshot, or None if there is no snapshot or it
+            cannot be used with the current version of contentctl and configuration.
+        """
+        config_fingerprint = cls.config_fingerprint(config)
+        if config_fingerprint is None:
+            return None
+        saved = Utils.load_versioned_cache(
+            cls.snapshot_path(config), CONTENT_SNAPSHOT_VERSION
+        )
+        # A missing or corrupt snapshot just means that all content is validated
+        if (
+            not isinstance(saved, dict)
+            or saved.get("config_fingerprint") != config_fingerprint
+        ):
+            return None
+
+        return cls(saved["content"], saved["dependencies"], saved["file_fingerprints"])
+
+    @classmethod
+    def save(cls, config: validate, output_dto: DirectorOutputDto) -> None:
+        """
+        Write a snapshot of all content in the output_dto. This must only be called once
+        all content has been validated successfully.
+        """
+        config_fingerprint = cls.config_fingerprint(config)
+        snapshot = cls.capture(config, output_dto)
+        if config_fingerprint is None or snapshot is None:
+            return
+
+        saved_back_references = detach_back_references(output_dto)
+        try:
+            for obj in snapshot.content:
+                clear_cached_properties(obj)
+            Utils.atomic_write_cache(
+                cls.snapshot_path(config),
+                CONTENT_SNAPSHOT_VERSION,
+                {
+                    "config_fingerprint": config_fingerprint,
+                    "content": snapshot.content,
+                    "dependencies": snapshot.dependencies,
+                    "file_fingerprints": snapshot.file_fingerprints,
+                },
+            )
+        finally:
+            attach_back_references(saved_back_references)
+
+    @classmethod
+    def capture(
+        cls,
+        config: validate,
+        output_dto: DirectorOutputDto,
+        previous: Union[ContentSnapshot, None] = None,
+    ) -> Union[ContentSnapshot, None]:
+        """
+        Take a snapshot of all content in the output_dto, which holds the content itself
+        rather than copies of it, so that it can be kept in memory between runs (as by
+        contentctl watch). reset must be called before each run that the snapshot is used
+        by. This must only be called once all content has been validated successfully.
+
+        Args:
+            previous (Union[ContentSnapshot, None], optional): The snapshot that the content
+                was restored from, if any. The fingerprint of each file which has the same
+                size and modification time as in previous is reused, rather than hashed again.
+
+        Returns:
+            Union[ContentSnapshot, None]: The snapshot, or None if a snapshot cannot be taken.
+        """
+        if cls.config_fingerprint(config) is None:
+            return None
+
+        # RuntimeCSVs are built from the rest of the content on every run
+        content = [
+            obj
+            for obj in output_dto.name_to_content_map.values()
+            if not isinstance(obj, RuntimeCSV)
+        ]
+
+        previous_fingerprints = {} if previous is None else previous.file_fingerprints
+        dependencies: dict[str, set[str]] = {}
+        file_fingerprints: dict[str, FileFingerprint] = {}
+        for obj in content:
+            dependencies[obj.name] = content_dependencies(obj)
+            for source_file in source_files(obj):
+                key = str(source_file.absolute())
+                if key not in file_fingerprints:
+                    fingerprint = fingerprint_file(
+                        source_file, previous_fingerprints.get(key)
+                    )
+                    if fingerprint is None:
+                        return None
+                    file_fingerprints[key] = fingerprint
+
+        return cls(content, dependencies, file_fingerprints)
+
+    def reset(self) -> None:
+        """
+        Return the content of a snapshot taken by capture to the state that it is saved in,
+        undoing the changes made to it since by validating or restoring content (including
+        by a run which failed), so that it can be restored again.
+        """
+        for obj in self.content:
+            obj.unseal()
+            clear_cached_properties(obj)
+            if isinstance(obj, Story):
+                for field_name in BACK_REFERENCE_FIELDS[Story]:
+                    setattr(obj, field_name, [])
+            elif isinstance(obj, Baseline):
+                obj.tags.detections = [
+                    d if isinstance(d, str) else d.name for d in obj.tags.detections
+                ]
+        self.deferred_story_tags = {}
+
+    @staticmethod
+    def config_fingerprint(config: validate) -> Union[str, None]:
+        """
+        Everything, other than the content itself, which can affect the result of validation.
+
+        Returns:
+            Union[str, None]: The fingerprint, or None if it could not be determined, in which
+            case no snapshot may be used or written.
+        """
+        enrichment_commits: list[str] = []
+        if config.enrichments:
+            import pygit2
+            from pygit2.enums import RepositoryOpenFlag
+
+            mitre_cti_fingerprint = AttackEnrichment.fingerprint_repo(
+                config.mitre_cti_repo_path
+            )
+            if mitre_cti_fingerprint is None:
+                return None
+            enrichment_commits.append(mitre_cti_fingerprint)
+            try:
+                # Do not search parent directories, which would find the content repo if
+                # the Atomic Red Team repo is inside of it but is not a git repo itself
+                repo = pygit2.Repository(
+                    str(config.atomic_red_team_repo_path), RepositoryOpenFlag.NO_SEARCH
+                )
+                enrichment_commits.append(str(repo.head.target))
+            except Exception:
+                return None
+            if config.nvd_feed_path.is_dir():
+                enrichment_commits.append(NvdIndex.fingerprint(config.nvd_feed_path))
+
+        # Only include the fields shared by every command, so that a snapshot
+        # written by validate can be used by build, and vice versa
+        settings = config.model_dump_json(
+            include=set(validate.model_fields.keys())
+            - {
+                "incremental",
+                "rebuild",
+                "cache",
+                "cache_directory",
+                "yml_parse_workers",
+                "lazy_atomic_enrichment",
+                "check_references",
+                "reference_success_ttl_hours",
+                "reference_failure_ttl_hours",
+                "reference_check_workers",
+                "splunkbase_ttl_hours",
+                "memory_report",
+                "compact",
+            }
+        )
+        fingerprint = "\n".join(
+            [
+                contentctl.__version__,
+                str(config.path.absolute()),
+                settings,
+                *enrichment_commits,
+            ]
+        )
+        return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()
+
+    def changed_files(
+        self,
+        yml_files: list[pathlib.Path],
+        file_index: Union[RepoFileIndex, None] = None,
+    ) -> set[str]:
+        """
+        Find every file which was added, modified, or deleted since the snapshot was written.
+
+        Args:
+            yml_files (list[pathlib.Path]): All of the content YML files which currently exist.
+            file_index (Union[RepoFileIndex, None], optional): The size and modification time
+                of indexed files are taken from the index rather than stat'ed again.
+
+        Returns:
+            set[str]: The absolute paths of the changed files.
+        """
+        changed: set[str] = set()
+        for yml_file in yml_files:
+            key = str(yml_file.absolute())
+            if key not in self.file_fingerprints:
+                changed.add(key)
+
+        for key, (size, mtime_ns, content_hash) in self.file_fingerprints.items():
+            indexed_file = None if file_index is None else file_index.get(key)
+            if indexed_file is not None:
+                current_size, current_mtime_ns = (
+                    indexed_file.size,
+                    indexed_file.mtime_ns,
+                )
+            else:
+                try:
+                    stat = os.stat(key)
+                except OSError:
+                    changed.add(key)
+                    continue
+                current_size, current_mtime_ns = stat.st_size, stat.st_mtime_ns
+            if current_size == size and current_mtime_ns == mtime_ns:
+                continue
+            fingerprint = fingerprint_file(pathlib.Path(key))
+            if fingerprint is None or fingerprint[2] != content_hash:
+                changed.add(key)
+        return changed
+
+    def unchanged_content(
+        self,
+        changed_files: set[str],
+        parsed_yml_files: dict[pathlib.Path, Union[dict[str, Any], Exception]],
+    ) -> dict[pathlib.Path, SecurityContentObject_Abstract]:
+        """
+        Find the content which can be restored from the snapshot instead of being validated.
+        Content must be validated again if any of its files changed, or if it depends, directly
+        or transitively, on content which must be validated again, was deleted, or was added.
+
+        Args:
+            changed_files (set[str]): The files returned by changed_files.
+            parsed_yml_files (dict[pathlib.Path, Union[dict[str, Any], Exception]]): The parsed
+                contents of the YML files which changed.
+
+        Returns:
+            dict[pathlib.Path, SecurityContentObject_Abstract]: The content which can be restored,
+            keyed by the file it was loaded from.
+        """
+        dirty_names: set[str] = set()
+        for obj in self.content:
+            if any(str(f.absolute()) in changed_files for f in source_files(obj)):
+                dirty_names.add(obj.name)
+                if isinstance(obj, Baseline):
+                    # A Baseline adds itself to the detections it names, so those
+                    # detections must be validated again too
+                    dirty_names.update(
+                        d if isinstance(d, str) else d.name for d in obj.tags.detections
+                    )
+
+        for modelDict in parsed_yml_files.values():
+            if not isinstance(modelDict, dict):
+                continue
+            if isinstance(modelDict.get("name"), str):
+                dirty_names.add(modelDict["name"])
+            tags = modelDict.get("tags")
+            if isinstance(tags, dict) and isinstance(tags.get("detections"), list):
+                dirty_names.update(d for d in tags["detections"] if isinstance(d, str))
+
+        dependents: dict[str, list[str]] = {}
+        for name, dependency_names in self.dependencies.items():
+            for dependency_name in dependency_names:
+                dependents.setdefault(dependency_name, []).append(name)
+
+        to_visit = list(dirty_names)
+        while len(to_visit) > 0:
+            for dependent in dependents.get(to_visit.pop(), []):
+                if dependent not in dirty_names:
+                    dirty_names.add(dependent)
+                    to_visit.append(dependent)
+
+        return {
+            obj.file_path: obj
+            for obj in self.content
+            if obj.file_path is not None and obj.name not in dirty_names
+        }
+
+    def restore(
+        self, obj: SecurityContentObject_Abstract, output_dto: DirectorOutputDto
+    ) -> SecurityContentObject_Abstract:
+        """
+        Prepare a piece of content from the snapshot to be added to the output_dto.  Any changes which
+        validating the content would have made to other content are replayed, in the same
+        order, so that the result is identical to validating all content.
+        """
+        if isinstance(obj, Story):
+            # The detections of the story were removed when the snapshot was written
+            obj.setTagsFields()
+
+        elif isinstance(obj, Detection):
+            # Share the enrichments of the techniques of the detection with all other
+            # content, rather than keeping the copies which were restored with it
+            obj.tags.mitre_attack_enrichments = (
+                output_dto.attack_enrichment.shareEnrichments(
+                    obj.tags.mitre_attack_enrichments
+                )
+            )
+
+            # Validating a detection recomputes the tags of each of its stories from the
+            # detections which came before it.  Each recomputation replaces the last, so
+            # only the final one is made, in finish()
+            for story in obj.tags.analytic_story:
+                self.deferred_story_tags[story] = len(story.detections)
+
+            # Filter macros which do not exist are created when the detection is validated
+            for macro in obj.macros:
+                if (
+                    macro.file_path is None
+                    and macro.name not in output_dto.name_to_content_map
+                ):
+                    output_dto.addContentToDictMappings(macro)
+
+            for baseline in obj.baselines:
+                baseline.tags.detections = [
+                    obj if isinstance(d, str) and d == obj.name else d
+                    for d in baseline.tags.detections
+                ]
+
+            for story in obj.tags.analytic_story:
+                story.detections.append(obj)
+
+        return obj
+
+    def validated(self, obj: SecurityContentObject_Abstract) -> None:
+        """
+        Record that a piece of content was validated instead of being restored.
+        """
+        if isinstance(obj, Detection):
+            # Validation already recomputed the tags of these stories
+            for story in obj.tags.analytic_story:
+                self.deferred_story_tags.pop(story, None)
+
+    def finish(self) -> None:
+        """
+        Make any changes to restored content which were deferred by restore. This must be
+        called once all content has been restored or validated.
+        """
+        for story, num_detections in self.deferred_story_tags.items():
+            detections = story.detections
+            story.detections = detections[:num_detections]
+            story.setTagsFields()
+            story.detections = detections
+        self.deferred_story_tags = {}
+
+
+def source_files(obj: SecurityContentObject_Abstract) -> list[pathlib.Path]:
+    """
+    All of the files which are read to validate a piece of content.
+    """
+    if obj.file_path is None:
+        return []
+    files = [obj.file_path]
+    if isinstance(obj, FileBackedLookup):
+        files.append(obj.filename)
+    elif isinstance(obj, Playbook):
+        files += [obj.file_path.with_suffix(".json"), obj.file_path.with_suffix(".py")]
+    return files
+
+
+def content_dependencies(obj: SecurityContentObject_Abstract) -> set[str]:
+    """
+    The names of all of the other content referenced by a piece of content.
+    """
+    names: set[str] = set()
+    for field_name in type(obj).model_fields:
+        if field_name not in BACK_REFERENCE_FIELDS.get(type(obj), set()):
+            _add_referenced_names(getattr(obj, field_name), names)
+    names.discard(obj.name)
+    return names
+
+
+def _add_referenced_names(value: Any, names: set[str]) -> None:
+    if isinstance(value, SecurityContentObject_Abstract):
+        names.add(value.name)
+    elif isinstance(value, BaseModel):
+        back_references = BACK_REFERENCE_FIELDS.get(type(value), set())
+        for field_name in type(value).model_fields:
+            if field_name not in back_references:
+                _add_referenced_names(getattr(value, field_name), names)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            _add_referenced_names(item, names)
+    elif isinstance(value, dict):
+        for item in value.values():
+            _add_referenced_names(item, names)
+
+
+def detach_back_references(output_dto: DirectorOutputDto) -> list[tuple[Any, str, Any]]:
+    # Without this, every story would (through its detections and their
+    # stories) reference almost all other content, which is both wasteful
+    # and deep enough to exceed the recursion limit when pickling
+    saved: list[tuple[Any, str, Any]] = []
+    for story in output_dto.stories:
+        for field_name in BACK_REFERENCE_FIELDS[Story]:
+            saved.append((story, field_name, getattr(story, field_name)))
+            setattr(story, field_name, [])
+    for baseline in output_dto.baselines:
+        saved.append((baseline.tags, "detections", baseline.tags.detections))
+        baseline.tags.detections = [
+            d if isinstance(d, str) else d.name for d in baseline.tags.detections
+        ]
+    return saved
+
+
+def attach_back_references(saved: list[tuple[Any, str, Any]]) -> None:
+    for obj, field_name, value in saved:
+        setattr(obj, field_name, value)
+
+
+def clear_cached_properties(obj: BaseModel) -> None:
+    # Values of cached_property are stored alongside the fields, and may
+    # depend on state (such as deprecation info) that changes between runs
+    for key in list(obj.__dict__.keys()):
+        if key not in type(obj).model_fields:
+            del obj.__dict__[key]
+
+
+def fingerprint_file(
+    file_path: pathlib.Path, previous: Union[FileFingerprint, None] = None
+) -> Union[FileFingerprint, None]:
+    try:
+        stat = os.stat(file_path)
+        if previous is not None and previous[:2] == (stat.st_size, stat.st_mtime_ns):
+            return previous
+        with open(file_path, "rb") as file_handle:
+            content_hash = hashlib.file_digest(file_handle, "sha256").hexdigest()
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns, content_hash)
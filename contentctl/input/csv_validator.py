@@ -0,0 +1,187 @@
+import csv
+import hashlib
+import os
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TextIO, Union
+
+from contentctl.helper.utils import Utils
+
+# Bump this whenever the format of the cache, or the way that
+# CSV files are checked, changes. A cache with a different
+# version is ignored.
+CSV_CACHE_VERSION = 2
+
+# The default maximum number of errors reported for a single CSV file
+DEFAULT_MAX_CSV_ERRORS = 100
+
+
+@dataclass(frozen=True)
+class CsvStructure:
+    # The number of columns in the header row, or None if the CSV has no header row
+    columns: Union[int, None]
+    # Every row with the wrong number of columns, up to the maximum number of errors
+    errors: tuple[str, ...]
+
+
+def check_csv_structure(
+    handle: TextIO, max_errors: int = DEFAULT_MAX_CSV_ERRORS
+) -> CsvStructure:
+    """
+    Check that every row of a CSV has the same number of columns as its header row,
+    streaming over the rows without building a dict for each of them. Rows are numbered,
+    and empty rows are skipped, exactly as csv.DictReader numbers and skips them.
+    Checking stops once max_errors errors have been found.
+    """
+    reader = csv.reader(handle)
+    header = next(reader, None)
+    if header is None:
+        return CsvStructure(columns=None, errors=())
+
+    columns = len(header)
+    errors: list[str] = []
+    # Remember that row 1 has the headers.
+    # CSVs are typically indexed starting a row 1 for the header.
+    row_number = 1
+    for row in reader:
+        if len(row) == 0:
+            continue
+        row_number += 1
+        if len(row) == columns:
+            continue
+
+        if len(row) > columns:
+            errors.append(
+                f"row [{row_number}] should have [{columns}] columns, "
+                f"but instead had [{len(row)}]."
+            )
+        else:
+            # csv.DictReader fills in each missing column with None (and any duplicated
+            # column names collapse into one), and each None was reported separately
+            data_row: dict[str, Union[str, None]] = dict(zip(header, row))
+            for column_name in header[len(row) :]:
+                data_row[column_name] = None
+            for column_index, column_name in enumerate(data_row):
+                if data_row[column_name] is None:
+                    errors.append(
+                        f"row [{row_number}] should have [{columns}] columns, "
+                        f"but instead had [{column_index}]."
+                    )
+
+        if len(errors) >= max_errors:
+            errors = errors[:max_errors]
+            errors.append(
+                f"Stopped checking the CSV after [{max_errors}] errors. "
+                "There may be more errors."
+            )
+            break
+
+    return CsvStructure(columns=columns, errors=tuple(errors))
+
+
+class CsvValidator:
+    """
+    Check the structure of many CSV files at once, across a pool of threads.
+
+    If a cache_path is given, the result for each file is cached along with the size,
+    modification time, and a hash of the contents of the file. If the size and modification
+    time of the file match, the file is not read at all. If only the modification time
+    differs (for example, after a fresh git checkout), the file is hashed but not checked.
+    """
+
+    def __init__(
+        self,
+        cache_path: Union[pathlib.Path, None] = None,
+        max_errors: int = DEFAULT_MAX_CSV_ERRORS,
+    ):
+        self.cache_file = None if cache_path is None else cache_path / "csv.pickle"
+        self.max_errors = max_errors
+
+    def check_files(
+        self,
+        file_paths: list[pathlib.Path],
+        max_workers: Union[int, None] = None,
+    ) -> dict[str, CsvStructure]:
+        """
+        Returns:
+            dict[str, CsvStructure]: The structure of each file, keyed by its absolute path.
+            Files which could not be read are left out, so that the error is raised when
+            (and if) the file is checked again by its lookup.
+        """
+        cache = self._read_cache()
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            entries = list(
+                executor.map(
+                    lambda file_path: self._check_file(file_path, cache),
+                    file_paths,
+                )
+            )
+
+        results: dict[str, CsvStructure] = {}
+        for entry in entries:
+            if entry is not None:
+                cache[entry["file_path"]] = entry
+                results[entry["file_path"]] = entry["structure"]
+
+        self._write_cache(cache)
+        return results
+
+    def _check_file(
+        self, file_path: pathlib.Path, cache: dict[str, dict]
+    ) -> Union[dict, None]:
+        key = str(file_path.absolute())
+        try:
+            stat = os.stat(file_path)
+            entry = cache.get(key)
+            if (
+                entry is not None
+                and entry["size"] == stat.st_size
+                and entry["mtime_ns"] == stat.st_mtime_ns
+            ):
+                return entry
+
+            content_hash = None
+            if self.cache_file is not None:
+                with open(file_path, "rb") as file_handle:
+                    content_hash = hashlib.file_digest(
+                        file_handle, "sha256"
+                    ).hexdigest()
+            if entry is not None and entry["content_hash"] == content_hash:
+                structure = entry["structure"]
+            else:
+                with open(file_path, "r") as handle:
+                    structure = check_csv_structure(handle, self.max_errors)
+        except (OSError, ValueError, csv.Error):
+            return None
+
+        return {
+            "file_path": key,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "content_hash": content_hash,
+            "structure": structure,
+        }
+
+    def _read_cache(self) -> dict[str, dict]:
+        if self.cache_file is None:
+            return {}
+        cache = Utils.load_versioned_cache(self.cache_file, CSV_CACHE_VERSION)
+        if not isinstance(cache, dict) or cache.get("max_errors") != self.max_errors:
+            return {}
+        return cache["entries"]
+
+    def _write_cache(self, entries: dict[str, dict]) -> None:
+        if self.cache_file is None:
+            return
+        # Forget the files which have been deleted
+        entries = {
+            file_path: entry
+            for file_path, entry in entries.items()
+            if os.path.exists(file_path)
+        }
+        Utils.atomic_write_cache(
+            self.cache_file,
+            CSV_CACHE_VERSION,
+            {"max_errors": self.max_errors, "entries": entries},
+        )
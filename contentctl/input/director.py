@@ -1,13 +1,17 @@
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 from uuid import UUID
 
 from pydantic import TypeAdapter, ValidationError
 
 from contentctl.enrichments.attack_enrichment import AttackEnrichment
 from contentctl.enrichments.cve_enrichment import CveEnrichment
-from contentctl.helper.utils import Utils
+from contentctl.helper.name_index import NameIndex
+from contentctl.input.content_snapshot import ContentSnapshot
+from contentctl.input.csv_validator import CsvStructure, CsvValidator
+from contentctl.input.repo_file_index import RepoFileIndex
 from contentctl.input.yml_reader import YmlReader
 from contentctl.objects.abstract_security_content_objects.security_content_object_abstract import (
     DeprecationDocumentationFile,
@@ -38,6 +42,15 @@ from contentctl.objects.security_content_object import SecurityContentObject
 from contentctl.objects.story import Story
 from contentctl.output.runtime_csv_writer import RuntimeCsvWriter
 
+# Content types refer to each other by name (for example, a Story to its Detections), so
+# they can only be completed once every one of them has been imported, as they are here
+for content_type in (Baseline, Detection, Investigation, Playbook, Story):
+    content_type.model_rebuild()
+
+ContentType = (
+    type[SecurityContentObject] | TypeAdapter[CSVLookup | KVStoreLookup | MlModel]
+)
+
 
 @dataclass
 class DirectorOutputDto:
@@ -62,6 +75,14 @@ class DirectorOutputDto:
     )
     name_to_content_map: dict[str, SecurityContentObject] = field(default_factory=dict)
     uuid_to_content_map: dict[UUID, SecurityContentObject] = field(default_factory=dict)
+    file_path_to_content_map: dict[Path, SecurityContentObject] = field(
+        default_factory=dict
+    )
+
+    def __post_init__(self):
+        self.name_index = NameIndex()
+        # Every file in the content folders, set by the Director which constructs the content
+        self.file_index: RepoFileIndex | None = None
 
     def addContentToDictMappings(self, content: SecurityContentObject):
         content_name = content.name
@@ -107,6 +128,32 @@ class DirectorOutputDto:
 
         self.name_to_content_map[content_name] = content
         self.uuid_to_content_map[content.id] = content
+        if content.file_path is not None:
+            self.file_path_to_content_map[content.file_path] = content
+        self.name_index.add(content_name, type(content))
+
+    def compact(self) -> None:
+        """
+        Release everything which is only needed while content is being constructed and
+        validated, and store the large text fields of all content compressed.
+        """
+        self.name_index = NameIndex()
+        self.file_index = None
+        for content in self.name_to_content_map.values():
+            content.compact()
+
+    def suggestNames(
+        self, name: str, content_type: type[SecurityContentObject] | None = None
+    ) -> list[str]:
+        """
+        Suggest the names of up to 3 pieces of content which name was likely meant to be.
+
+        Args:
+            name (str): A name which does not belong to any content, or not to content of the expected type.
+            content_type (type[SecurityContentObject] | None, optional): Only suggest content of this
+                type. Defaults to None, which suggests content of any type.
+        """
+        return self.name_index.suggest(name, content_type)
 
 
 class Colors:
@@ -147,29 +194,66 @@ class Director:
     input_dto: validate
     output_dto: DirectorOutputDto
 
-    def __init__(self, output_dto: DirectorOutputDto) -> None:
+    # The types of content, in the order that they are constructed. Content
+    # may only reference content of the types that come before it.
+    content_types: list[ContentType] = [
+        Deployment,
+        LookupAdapter,
+        Macro,
+        Story,
+        Baseline,
+        DataSource,
+        Playbook,
+        Detection,
+        Dashboard,
+        RemovedSecurityContentObject,
+    ]
+
+    def __init__(
+        self,
+        output_dto: DirectorOutputDto,
+        snapshot: ContentSnapshot | None = None,
+        file_index: RepoFileIndex | None = None,
+    ) -> None:
+        """
+        Args:
+            output_dto (DirectorOutputDto): The object that all constructed content is added to.
+            snapshot (ContentSnapshot | None, optional): A snapshot of the content from a previous
+                run. Unchanged content is restored from it rather than validated. If this is None
+                and incremental validation is enabled, the snapshot is loaded from the cache.
+            file_index (RepoFileIndex | None, optional): An index of the content folders of the
+                repo, if one has just been built. Defaults to None, which builds a new index.
+        """
         self.output_dto = output_dto
+        self.file_index = file_index
+        self.parsed_yml_files: dict[Path, dict[str, Any] | Exception] = {}
+        self.snapshot = snapshot
+        self.restored_content: dict[Path, SecurityContentObject] = {}
+        # The structure of each lookup CSV, keyed by its absolute path
+        self.csv_structures: dict[str, CsvStructure] = {}
 
     def execute(self, input_dto: validate) -> None:
         self.input_dto = input_dto
+        if self.file_index is None:
+            self.file_index = RepoFileIndex.build(input_dto.path, self.content_types)
+        self.output_dto.file_index = self.file_index
 
-        for content in [
-            Deployment,
-            LookupAdapter,
-            Macro,
-            Story,
-            Baseline,
-            DataSource,
-            Playbook,
-            Detection,
-            Dashboard,
-            RemovedSecurityContentObject,
-        ]:
+        self.parseSecurityContentFiles(self.content_types)
+        for content in self.content_types:
             self.createSecurityContent(content)
+        if self.snapshot is not None:
+            self.snapshot.finish()
 
         self.loadDeprecationInfo(input_dto.app)
         self.buildRuntimeCsvs()
 
+        if input_dto.incremental:
+            ContentSnapshot.save(input_dto, self.output_dto)
+
+        # From here on, content is only read, so its derived values can be memoized
+        for content in self.output_dto.name_to_content_map.values():
+            content.seal()
+
     def buildRuntimeCsvs(self):
         self.buildDataSourceCsv()
         self.buildDeprecationRemovalCsv()
@@ -207,9 +291,14 @@ class Director:
         self.output_dto.addContentToDictMappings(datasource_lookup)
 
     def loadDeprecationInfo(self, app: CustomApp):
-        mapping_file_paths = list(
-            (self.input_dto.path / "removed").glob("deprecation_mapping*.YML")
-        )
+        try:
+            mapping_file_paths = self.file_index.get_files(
+                self.input_dto.path / RemovedSecurityContentObject.containing_folder(),
+                "deprecation_mapping*.YML",
+                recursive=False,
+            )
+        except FileNotFoundError:
+            mapping_file_paths = []
 
         if self.input_dto.enforce_deprecation_mapping_requirement is False:
             # If we are not required to enforce deprecation mapping, then do nothing at all (even if the files exist)
@@ -235,13 +324,109 @@ class Director:
 
         self.output_dto.deprecation_documentation.mapAllContent(self.output_dto, app)
 
+    def parseSecurityContentFiles(
+        self,
+        content_types: list[
+            type[SecurityContentObject]
+            | TypeAdapter[CSVLookup | KVStoreLookup | MlModel]
+        ],
+    ) -> None:
+        """
+        Parse the YML files for all content types up front, across a pool of worker
+        processes. The validation of each file still happens, in order, in
+        createSecurityContent. Any errors encountered while parsing are raised there
+        when the file is reached, so they are reported exactly as they would have been
+        if the files were parsed one at a time.
+        """
+        files: list[Path] = []
+        for contentType in content_types:
+            try:
+                files += self.file_index.get_files(
+                    self.input_dto.path / contentType.containing_folder(),  # type: ignore
+                    "*.yml",
+                )
+            except FileNotFoundError:
+                # createSecurityContent will raise this when it reaches the content type
+                continue
+
+        cache_path = self.input_dto.cache_path if self.input_dto.cache else None
+        if (
+            self.snapshot is None
+            and self.input_dto.incremental
+            and not self.input_dto.rebuild
+        ):
+            self.snapshot = ContentSnapshot.load(self.input_dto)
+        if self.snapshot is not None:
+            # Parse the files which changed first, since the names they now
+            # contain determine what other content must be validated again
+            changed_files = self.snapshot.changed_files(files, self.file_index)
+            self.parsed_yml_files = YmlReader.parse_files(
+                [f for f in files if str(f.absolute()) in changed_files],
+                self.input_dto.yml_parse_workers,
+                cache_path,
+            )
+            self.restored_content = self.snapshot.unchanged_content(
+                changed_files, self.parsed_yml_files
+            )
+            files = [
+                f
+                for f in files
+                if f not in self.restored_content and f not in self.parsed_yml_files
+            ]
+            print(
+                f"Incremental validation: restoring [{len(self.restored_content)}] unchanged "
+                "files from the last successful run"
+            )
+
+        self.parsed_yml_files.update(
+            YmlReader.parse_files(files, self.input_dto.yml_parse_workers, cache_path)
+        )
+
+        # Check the CSV files of all lookups which will be validated, rather than
+        # checking them one at a time as each lookup is validated
+        csv_files = [
+            file.parent / f"{file.stem}.{Lookup_Type.csv}"
+            for file in self.parsed_yml_files
+            if file.is_relative_to(
+                self.input_dto.path / LookupAdapter.containing_folder()  # type: ignore
+            )
+        ]
+        self.csv_structures = CsvValidator(
+            cache_path, self.input_dto.max_csv_errors
+        ).check_files([file for file in csv_files if file.is_file()])
+
+        # Load the Atomic Red Team tests (in lazy mode) and CVEs that the detections which
+        # will be validated refer to all at once, rather than one at a time as they are used
+        atomic_guids: set[UUID] = set()
+        cve_ids: set[str] = set()
+        for file, parsed in self.parsed_yml_files.items():
+            if not isinstance(parsed, dict) or not file.is_relative_to(
+                self.input_dto.path / Detection.containing_folder()
+            ):
+                continue
+            tags = parsed.get("tags")
+            if not isinstance(tags, dict):
+                continue
+            if isinstance(tags.get("atomic_guid"), list):
+                for atomic_guid in tags["atomic_guid"]:
+                    try:
+                        atomic_guids.add(UUID(str(atomic_guid)))
+                    except ValueError:
+                        # Reported when the detection is validated
+                        continue
+            if isinstance(tags.get("cve"), list):
+                cve_ids.update(str(cve_id) for cve_id in tags["cve"])
+        self.output_dto.atomic_enrichment.loadAtomics(atomic_guids)
+        self.output_dto.cve_enrichment.loadCves(cve_ids)
+
     def createSecurityContent(
         self,
         contentType: type[SecurityContentObject]
         | TypeAdapter[CSVLookup | KVStoreLookup | MlModel],
     ) -> None:
-        files = Utils.get_all_yml_files_from_directory(
-            self.input_dto.path / contentType.containing_folder()  # type: ignore
+        files = self.file_index.get_files(
+            self.input_dto.path / contentType.containing_folder(),  # type: ignore
+            "*.yml",
         )
 
         # convert this generator to a list so that we can
@@ -252,9 +437,10 @@ class Director:
 
         already_ran = False
         progress_percent = 0
-        context: dict[str, validate | DirectorOutputDto] = {
+        context: dict[str, validate | DirectorOutputDto | dict[str, CsvStructure]] = {
             "output_dto": self.output_dto,
             "config": self.input_dto,
+            "csv_structures": self.csv_structures,
         }
         contentCartegoryName: str = contentType.__name__.upper()  # type: ignore
 
@@ -262,22 +448,33 @@ class Director:
             progress_percent = ((index + 1) / len(security_content_files)) * 100
             try:
                 type_string = contentType.__name__.upper()  # type: ignore
-                modelDict = YmlReader.load_file(file)
-
-                if isinstance(contentType, type(SecurityContentObject)):
-                    content: SecurityContentObject = contentType.model_validate(
-                        modelDict, context=context
-                    )
-                elif contentType == LookupAdapter:
-                    content: SecurityContentObject = (  # type: ignore
-                        contentType.validate_python(modelDict, context=context)  # type:ignore
+                restored = self.restored_content.pop(file, None)
+                if self.snapshot is not None and restored is not None:
+                    content = self.snapshot.restore(restored, self.output_dto)
+                else:
+                    modelDict = YmlReader.load_file(
+                        file, parse_result=self.parsed_yml_files.pop(file, None)
                     )
-                    if not isinstance(content, SecurityContentObject):
+
+                    if isinstance(contentType, type(SecurityContentObject)):
+                        content: SecurityContentObject = contentType.model_validate(
+                            modelDict, context=context
+                        )
+                    elif contentType == LookupAdapter:
+                        content: SecurityContentObject = (  # type: ignore
+                            contentType.validate_python(modelDict, context=context)  # type:ignore
+                        )
+                        if not isinstance(content, SecurityContentObject):
+                            raise Exception(
+                                f"Expected lookup to be a SecurityContentObject (CSVLookup, KVStoreLookup, or MLModel), but it was actually: {type(content)}"  # type: ignore
+                            )
+                    else:
                         raise Exception(
-                            f"Expected lookup to be a SecurityContentObject (CSVLookup, KVStoreLookup, or MLModel), but it was actually: {type(content)}"  # type: ignore
+                            f"Unknown contentType in Director: {contentType}"
                         )
-                else:
-                    raise Exception(f"Unknown contentType in Director: {contentType}")
+
+                    if self.snapshot is not None:
+                        self.snapshot.validated(content)
 
                 self.output_dto.addContentToDictMappings(content)
 
@@ -0,0 +1,172 @@
+import fnmatch
+import os
+import pathlib
+from dataclasses import dataclass
+from typing import Any, Iterable, Union
+
+
+@dataclass(frozen=True)
+class IndexedFile:
+    path: pathlib.Path
+    suffix: str
+    size: int
+    mtime_ns: int
+    # The content type whose folder contains the file
+    content_type: Any
+
+
+class RepoFileIndex:
+    """
+    Every file in the content folders of a repository, found by walking each folder once
+    with os.scandir. Everything which needs to enumerate (or stat) the files of the repo
+    asks the index rather than walking the folders again.
+
+    Like pathlib's recursive glob, symlinks to directories are not followed and hidden
+    files are included. Files are listed in sorted order.
+    """
+
+    def __init__(self, repo_path: pathlib.Path):
+        self.repo_path = repo_path
+        # folder -> every file under the folder, or None if the folder does not exist
+        self.folders: dict[pathlib.Path, Union[list[IndexedFile], None]] = {}
+        # absolute path of the file -> the file
+        self.files_by_path: dict[str, IndexedFile] = {}
+
+    @classmethod
+    def build(
+        cls, repo_path: pathlib.Path, content_types: Iterable[Any]
+    ) -> "RepoFileIndex":
+        """
+        Args:
+            repo_path (pathlib.Path): The root of the repository.
+            content_types (Iterable[Any]): The content types to index. Each has a
+                containing_folder() relative to the root of the repository.
+        """
+        index = cls(repo_path)
+        for content_type in content_types:
+            folder = repo_path / content_type.containing_folder()
+            if folder not in index.folders:
+                index.add_folder(folder, content_type)
+        return index
+
+    def add_folder(self, folder: pathlib.Path, content_type: Any) -> None:
+        if not folder.is_dir():
+            self.folders[folder] = None
+            return
+
+        files: list[IndexedFile] = []
+        to_scan = [str(folder)]
+        while len(to_scan) > 0:
+            directory = to_scan.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir():
+                        if not entry.is_symlink():
+                            to_scan.append(entry.path)
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                path = pathlib.Path(entry.path)
+                files.append(
+                    IndexedFile(
+                        path=path,
+                        suffix=path.suffix,
+                        size=stat.st_size,
+                        mtime_ns=stat.st_mtime_ns,
+                        content_type=content_type,
+                    )
+                )
+
+        files.sort(key=lambda indexed_file: indexed_file.path)
+        self.folders[folder] = files
+        for indexed_file in files:
+            self.files_by_path[str(indexed_file.path.absolute())] = indexed_file
+
+    def get(self, path: Union[pathlib.Path, str]) -> Union[IndexedFile, None]:
+        """
+        Returns:
+            Union[IndexedFile, None]: The file at path, or None if it is not in the index.
+        """
+        return self.files_by_path.get(str(pathlib.Path(path).absolute()))
+
+    def get_files(
+        self, folder: pathlib.Path, pattern: str = "*", recursive: bool = True
+    ) -> list[pathlib.Path]:
+        """
+        Get the files in an indexed folder whose names match a glob pattern.
+
+        Args:
+            folder (pathlib.Path): One of the folders of the index.
+            pattern (str, optional): Only return files whose names match this pattern. Defaults to "*".
+            recursive (bool, optional): Also return the files in every subfolder. Defaults to True.
+
+        Raises:
+            FileNotFoundError: The folder does not exist.
+
+        Returns:
+            list[pathlib.Path]: The matching files, in sorted order.
+        """
+        files = self.folders[folder]
+        if files is None:
+            raise FileNotFoundError(
+                f"Trying to find files in the directory '{folder.absolute()}', but it does not exist.\n"
+                "It is not mandatory to have content/YMLs in this directory, but it must exist. Please create it."
+            )
+        return [
+            indexed_file.path
+            for indexed_file in files
+            if (recursive or indexed_file.path.parent == folder)
+            and fnmatch.fnmatchcase(indexed_file.path.name, pattern)
+        ]
+
+    def get_security_content_files(
+        self,
+        folder: pathlib.Path,
+        allowedFileExtensions: list[str] = [".yml"],
+        fileExtensionsToReturn: list[str] = [".yml"],
+    ) -> list[pathlib.Path]:
+        """
+        The same as Utils.get_security_content_files_from_directory, for an indexed folder.
+        """
+        if not set(fileExtensionsToReturn).issubset(set(allowedFileExtensions)):
+            raise Exception(
+                f"allowedFileExtensions {allowedFileExtensions} MUST be a subset of fileExtensionsToReturn {fileExtensionsToReturn}, but it is not"
+            )
+
+        if self.folders[folder] is None:
+            raise Exception(
+                f"Unable to get security_content files, required directory '{str(folder)}' does not exist or is not a directory"
+            )
+
+        files = self.get_files(folder, "*.*")
+        erroneousFiles = [
+            filePath
+            for filePath in files
+            if filePath.suffix not in allowedFileExtensions
+        ]
+        if len(erroneousFiles):
+            raise Exception(
+                f"The following files are not allowed in the directory '{folder}'. Only files with the extensions {allowedFileExtensions} are allowed:{[str(filePath) for filePath in erroneousFiles]}"
+            )
+
+        return [
+            filePath for filePath in files if filePath.suffix in fileExtensionsToReturn
+        ]
+
+    def signature(self) -> dict[str, tuple[int, int]]:
+        """
+        Returns:
+            dict[str, tuple[int, int]]: The size and modification time of every file,
+            which changes whenever any file is added, removed, or modified.
+        """
+        return {
+            str(indexed_file.path): (indexed_file.size, indexed_file.mtime_ns)
+            for files in self.folders.values()
+            if files is not None
+            for indexed_file in files
+        }
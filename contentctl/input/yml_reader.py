@@ -1,30 +1,79 @@
+import functools
+import hashlib
+import os
 import pathlib
 import sys
-from typing import Any, Dict
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Union
 
 import yaml
 
+from contentctl.helper.utils import Utils
+
+# Below this many files, the cost of starting worker processes outweighs
+# the time saved by parsing in parallel
+MIN_FILES_FOR_PARALLEL_PARSE = 200
+
+# Bump this whenever the format of a cache entry, or the way that
+# YML files are parsed, changes. Entries with a different version
+# are treated as a cache miss.
+YML_CACHE_VERSION = 2
+
+# Entries which have not been used for this long are deleted
+YML_CACHE_MAX_AGE_SECONDS = 14 * 24 * 60 * 60
+
+# Fields (at the top level of content, or in its tags) whose values are repeated across
+# many files, such as the author of a detection or the names of its data sources. Their
+# strings are interned, so that every piece of content shares one copy of each value.
+INTERNED_FIELDS = frozenset(
+    {
+        "author",
+        "type",
+        "status",
+        "data_source",
+        "analytic_story",
+        "asset_type",
+        "product",
+        "security_domain",
+        "mitre_attack_id",
+        "nist",
+        "cve",
+        "group",
+    }
+)
+
+
+class YmlReadError(Exception):
+    """Unrecoverable error opening or parsing a YML file.  The message has
+    already been formatted for output to the user."""
+
+    def __init__(self, message: str):
+        self.message = message
+        super().__init__(message)
+
 
 class YmlReader:
     @staticmethod
-    def load_file(
-        file_path: pathlib.Path,
-        add_fields: bool = True,
-        STRICT_YML_CHECKING: bool = False,
-    ) -> Dict[str, Any]:
+    def read_file(file_path: pathlib.Path) -> str:
         try:
             file_handler = open(file_path, "r", encoding="utf-8")
         except OSError as exc:
-            print(
+            raise YmlReadError(
                 f"\nThere was an unrecoverable error when opening the file '{file_path}' - we will exit immediately:\n{str(exc)}"
             )
-            sys.exit(1)
 
-            # The following code can help diagnose issues with duplicate keys or
-            # poorly-formatted but still "compliant" YML.  This code should be
-            # enabled manually for debugging purposes. As such, strictyaml
-            # library is intentionally excluded from the contentctl requirements
+        with file_handler:
+            return file_handler.read()
 
+    @staticmethod
+    def parse_data(
+        file_path: pathlib.Path, data: str, STRICT_YML_CHECKING: bool = False
+    ) -> Dict[str, Any]:
+        # The following code can help diagnose issues with duplicate keys or
+        # poorly-formatted but still "compliant" YML.  This code should be
+        # enabled manually for debugging purposes. As such, strictyaml
+        # library is intentionally excluded from the contentctl requirements
         try:
             if STRICT_YML_CHECKING:
                 # This is an extra level of verbose parsing that can be
@@ -32,8 +81,7 @@ class YmlReader:
                 # addition to the regular yml parsing
                 import strictyaml
 
-                strictyaml.dirty_load(file_handler.read(), allow_flow_style=True)
-                file_handler.seek(0)
+                strictyaml.dirty_load(data, allow_flow_style=True)
 
             # Ideally we should use
             # from contentctl.actions.new_content import NewContent
@@ -41,7 +89,6 @@ class YmlReader:
             # but there is a circular dependency right now which makes that difficult.
             # We have instead hardcoded UPDATE_PREFIX
             UPDATE_PREFIX = "__UPDATE__"
-            data = file_handler.read()
             if UPDATE_PREFIX in data:
                 raise Exception(
                     f"\nThe file {file_path} contains the value '{UPDATE_PREFIX}'. Please fill out any unpopulated fields as required."
@@ -56,14 +103,235 @@ class YmlReader:
                     "or remove the file."
                 )
         except yaml.YAMLError as exc:
-            print(
+            raise YmlReadError(
                 f"\nThere was an unrecoverable YML Parsing error when reading or parsing the file '{file_path}' - we will exit immediately:\n{str(exc)}"
             )
+
+        return yml_obj
+
+    @staticmethod
+    def parse_file(
+        file_path: pathlib.Path, STRICT_YML_CHECKING: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Read and parse a YML file.  Unlike load_file, unrecoverable errors are raised
+        as YmlReadError instead of being printed, so this function is safe to call
+        from a worker process.
+        """
+        data = YmlReader.read_file(file_path)
+        return YmlReader.parse_data(file_path, data, STRICT_YML_CHECKING)
+
+    @staticmethod
+    def load_file(
+        file_path: pathlib.Path,
+        add_fields: bool = True,
+        STRICT_YML_CHECKING: bool = False,
+        parse_result: Union[Dict[str, Any], Exception, None] = None,
+    ) -> Dict[str, Any]:
+        """
+        Read and parse a YML file, exiting immediately on an unrecoverable error.
+
+        Args:
+            file_path (pathlib.Path): The YML file to load.
+            add_fields (bool, optional): Add the file_path field to the returned object. Defaults to True.
+            STRICT_YML_CHECKING (bool, optional): Additionally parse the file with strictyaml. Defaults to False.
+            parse_result (Union[Dict[str, Any], Exception, None], optional): The result of parsing file_path
+                ahead of time with parse_files. If it is None, the file is read and parsed now.
+        """
+        try:
+            if parse_result is None:
+                yml_obj = YmlReader.parse_file(file_path, STRICT_YML_CHECKING)
+            elif isinstance(parse_result, Exception):
+                raise parse_result
+            else:
+                yml_obj = parse_result
+        except YmlReadError as exc:
+            print(exc.message)
             sys.exit(1)
 
+        intern_strings(yml_obj)
         if add_fields is False:
             return yml_obj
 
         yml_obj["file_path"] = str(file_path)
 
         return yml_obj
+
+    @staticmethod
+    def parse_files(
+        file_paths: list[pathlib.Path],
+        max_workers: Union[int, None] = None,
+        cache_path: Union[pathlib.Path, None] = None,
+    ) -> dict[pathlib.Path, Union[Dict[str, Any], Exception]]:
+        """
+        Parse many YML files, using a pool of worker processes when there are enough
+        files to make it worthwhile.  Errors are not raised here. Instead, they are
+        returned in place of the parsed object so that they can be raised by load_file
+        when (and if) the file is reached, exactly as if it had been parsed serially.
+
+        Args:
+            file_paths (list[pathlib.Path]): The YML files to parse.
+            max_workers (Union[int, None], optional): Maximum number of worker processes.
+                Defaults to None, which uses one worker per CPU.
+            cache_path (Union[pathlib.Path, None], optional): If set, parsed files are
+                read from and written to a YmlCache in this directory. Defaults to None.
+
+        Returns:
+            dict[pathlib.Path, Union[Dict[str, Any], Exception]]: The parsed object, or the
+            exception raised while parsing it, for each file.
+        """
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        max_workers = min(max_workers, len(file_paths))
+
+        parse = functools.partial(_parse_file_or_error, cache_path=cache_path)
+        if max_workers <= 1 or len(file_paths) < MIN_FILES_FOR_PARALLEL_PARSE:
+            results = [parse(file_path) for file_path in file_paths]
+        else:
+            # Hand each worker several files at once to reduce the
+            # cost of sending work to, and results from, the workers
+            chunksize = max(1, len(file_paths) // (max_workers * 4))
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(parse, file_paths, chunksize=chunksize))
+
+        if cache_path is not None:
+            YmlCache(cache_path).evict()
+
+        return dict(zip(file_paths, results))
+
+
+class YmlCache:
+    """
+    On-disk cache of parsed YML files.  Each file is cached as a pickled entry
+    containing the parsed object along with the size, modification time, and
+    a hash of the contents of the file it was parsed from.  If the size and
+    modification time of the file match the entry, the file is not read at all.
+    If only the modification time differs (for example, after a fresh git
+    checkout), the file is read and hashed, but not parsed.
+
+    Only files which were parsed successfully are cached, so every error, including
+    the check for the __UPDATE__ prefix, is raised exactly as it would be without
+    the cache.
+    """
+
+    def __init__(self, cache_path: pathlib.Path):
+        self.entries_path = cache_path / "yml"
+
+    def entry_path(self, file_path: pathlib.Path) -> pathlib.Path:
+        key = hashlib.sha256(str(file_path.absolute()).encode("utf-8")).hexdigest()
+        return self.entries_path / key[:2] / f"{key}.pickle"
+
+    def parse_file(self, file_path: pathlib.Path) -> Dict[str, Any]:
+        """
+        Return the parsed contents of file_path, from the cache if possible.
+        On a cache miss the file is parsed with YmlReader.parse_file, raising
+        the same exceptions, and the result is written to the cache.
+        """
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            # Let the YmlReader produce the appropriate error
+            return YmlReader.parse_file(file_path)
+
+        entry_path = self.entry_path(file_path)
+        entry = self._read_entry(entry_path, file_path)
+        if (
+            entry is not None
+            and entry["size"] == stat.st_size
+            and entry["mtime_ns"] == stat.st_mtime_ns
+        ):
+            self._touch(entry_path)
+            return entry["yml_obj"]
+
+        data = YmlReader.read_file(file_path)
+        content_hash = hashlib.sha256(data.encode("utf-8")).hexdigest()
+        if entry is not None and entry["content_hash"] == content_hash:
+            yml_obj = entry["yml_obj"]
+        else:
+            yml_obj = YmlReader.parse_data(file_path, data)
+
+        self._write_entry(
+            entry_path,
+            {
+                "file_path": str(file_path.absolute()),
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "content_hash": content_hash,
+                "yml_obj": yml_obj,
+            },
+        )
+        return yml_obj
+
+    def evict(self, max_age_seconds: int = YML_CACHE_MAX_AGE_SECONDS) -> int:
+        """
+        Delete every entry which has not been used in the last max_age_seconds.
+        Entries are touched every time that they are used, so this removes entries
+        for files which have been deleted or renamed, as well as entries left
+        behind by older versions of the cache.
+
+        Returns:
+            int: The number of entries which were deleted.
+        """
+        if not self.entries_path.is_dir():
+            return 0
+
+        oldest_allowed = time.time() - max_age_seconds
+        evicted = 0
+        for entry_path in self.entries_path.glob("*/*.pickle"):
+            try:
+                if entry_path.stat().st_mtime < oldest_allowed:
+                    entry_path.unlink()
+                    evicted += 1
+            except OSError:
+                # The entry was removed or replaced by another process
+                continue
+        return evicted
+
+    def _read_entry(
+        self, entry_path: pathlib.Path, file_path: pathlib.Path
+    ) -> Union[Dict[str, Any], None]:
+        entry = Utils.load_versioned_cache(entry_path, YML_CACHE_VERSION)
+        if not isinstance(entry, dict) or entry.get("file_path") != str(
+            file_path.absolute()
+        ):
+            return None
+        return entry
+
+    def _write_entry(self, entry_path: pathlib.Path, entry: Dict[str, Any]) -> None:
+        Utils.atomic_write_cache(entry_path, YML_CACHE_VERSION, entry)
+
+    def _touch(self, entry_path: pathlib.Path) -> None:
+        try:
+            os.utime(entry_path)
+        except OSError:
+            pass
+
+
+def _parse_file_or_error(
+    file_path: pathlib.Path, cache_path: Union[pathlib.Path, None] = None
+) -> Union[Dict[str, Any], Exception]:
+    # Defined at module level so that it can be pickled and sent to worker processes
+    try:
+        if cache_path is None:
+            return YmlReader.parse_file(file_path)
+        return YmlCache(cache_path).parse_file(file_path)
+    except Exception as e:
+        return e
+
+
+def intern_strings(yml_obj: Any) -> None:
+    """
+    Intern the strings of the INTERNED_FIELDS of a parsed YML file, in place.
+    """
+    if not isinstance(yml_obj, dict):
+        return
+    for key, value in yml_obj.items():
+        if key not in INTERNED_FIELDS:
+            if key == "tags":
+                intern_strings(value)
+        elif isinstance(value, str):
+            yml_obj[key] = sys.intern(value)
+        elif isinstance(value, list):
+            yml_obj[key] = [
+                sys.intern(item) if isinstance(item, str) else item for item in value
+            ]
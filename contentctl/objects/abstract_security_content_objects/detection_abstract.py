@@ -50,7 +50,9 @@ from contentctl.objects.enums import (
 from contentctl.objects.integration_test import IntegrationTest
 from contentctl.objects.manual_test import ManualTest
 from contentctl.objects.rba import RBAObject, RiskScoreValue_Type
+from contentctl.objects.sealable import sealed_property
 from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.spl_analysis import SplAnalysis
 from contentctl.objects.test_group import TestGroup
 from contentctl.objects.unit_test import UnitTest
 
@@ -241,7 +243,7 @@ class Detection_Abstract(SecurityContentObject):
         file_name = pathlib.Path(cls.contentNameToFileName(name)).stem
         file_name_with_filter = f"`{file_name}_filter`"
 
-        if file_name_with_filter not in value:
+        if not SplAnalysis.analyze(value).references(file_name_with_filter):
             raise ValueError(
                 f"Detection does not contain the EXACT filter macro {file_name_with_filter}. "
                 "This filter macro MUST be present in the search. It usually placed at the end "
@@ -351,19 +353,19 @@ class Detection_Abstract(SecurityContentObject):
         raise ValueError(f"Undefined overall test status for detection: {self.name}")
 
     @computed_field
-    @property
+    @sealed_property
     def datamodel(self) -> List[DataModel]:
-        return [dm for dm in DataModel if dm in self.search]
+        return list(SplAnalysis.analyze(self.search).datamodels)
 
     @computed_field
-    @property
+    @sealed_property
     def source(self) -> str:
         return self.file_path.absolute().parent.name
 
     deployment: Deployment = Field({})
 
     @computed_field
-    @property
+    @sealed_property
     def annotations(self) -> dict[str, Union[List[str], int, str]]:
         annotations_dict: dict[str, str | list[str] | int] = {}
         annotations_dict["analytic_story"] = [
@@ -389,7 +391,7 @@ class Detection_Abstract(SecurityContentObject):
     baselines: list[Baseline] = Field([], validate_default=True)
 
     @computed_field
-    @property
+    @sealed_property
     def mappings(self) -> dict[str, List[str]]:
         mappings: dict[str, Any] = {}
         if len(self.tags.cis20) > 0:
@@ -450,12 +452,12 @@ class Detection_Abstract(SecurityContentObject):
             return None
 
     @computed_field
-    @property
+    @sealed_property
     def providing_technologies(self) -> List[ProvidingTechnology]:
         return ProvidingTechnology.getProvidingTechFromSearch(self.search)
 
     @computed_field
-    @property
+    @sealed_property
     def risk(self) -> list[dict[str, Any]]:
         if self.rba is None:
             raise Exception(
@@ -470,7 +472,7 @@ class Detection_Abstract(SecurityContentObject):
         return rba_dict["risk_objects"] + rba_dict["threat_objects"]
 
     @computed_field
-    @property
+    @sealed_property
     def metadata(self) -> dict[str, str | float]:
         # NOTE: we ignore the type error around self.status because we are using Pydantic's
         # use_enum_values configuration
@@ -745,6 +747,19 @@ class Detection_Abstract(SecurityContentObject):
 
         return macros_from_search
 
+    # Many of the derived values of a Detection are computed from its tags
+    def seal(self) -> None:
+        super().seal()
+        self.tags.seal()
+
+    def unseal(self) -> None:
+        super().unseal()
+        self.tags.unseal()
+
+    def invalidate(self) -> None:
+        super().invalidate()
+        self.tags.invalidate()
+
     def get_content_dependencies(self) -> list[SecurityContentObject]:
         # Do this separately to satisfy type checker
         objects: list[SecurityContentObject] = []
@@ -1140,12 +1155,16 @@ class Detection_Abstract(SecurityContentObject):
             return self
 
         # Validate that all required output fields are present in the search
+        analysis = SplAnalysis.analyze(self.search)
         for data_source in self.data_source_objects:
             if not data_source.output_fields:
                 continue
 
+            referenced_fields = analysis.referenced_fields(data_source.output_fields)
             missing_fields = [
-                field for field in data_source.output_fields if field not in self.search
+                field
+                for field in data_source.output_fields
+                if field not in referenced_fields
             ]
 
             if missing_fields:
@@ -11,9 +11,9 @@ import datetime
 import pathlib
 import pprint
 import uuid
+import zlib
 from abc import abstractmethod
 from collections import Counter
-from difflib import get_close_matches
 from functools import cached_property
 from typing import List, Optional, Tuple, Union
 
@@ -43,6 +43,7 @@ from contentctl.objects.enums import (
     AnalyticsType,
     ContentStatus,
 )
+from contentctl.objects.sealable import Sealable
 
 
 class DeprecationInfo(BaseModel):
@@ -473,7 +474,15 @@ class DeprecationDocumentationFile(BaseModel):
         return []
 
 
-class SecurityContentObject_Abstract(BaseModel, abc.ABC):
+# Large text fields which are only read by the output writers. With compact(), they are
+# stored compressed (under the field name with this prefix) until they are next read.
+COMPACT_TEXT_FIELDS = ("description", "how_to_implement", "known_false_positives")
+COMPACT_TEXT_PREFIX = "_compact_"
+# Shorter text is not worth compressing
+MIN_COMPACT_TEXT_LENGTH = 256
+
+
+class SecurityContentObject_Abstract(Sealable, abc.ABC):
     model_config = ConfigDict(validate_default=True, extra="forbid")
     name: str = Field(..., max_length=99)
     author: str = Field(..., max_length=255)
@@ -573,6 +582,39 @@ class SecurityContentObject_Abstract(BaseModel, abc.ABC):
     def model_post_init(self, __context: Any) -> None:
         self.ensureFileNameMatchesSearchName()
 
+    def compact(self) -> None:
+        """
+        Store the large text fields of this content compressed, and discard any values
+        derived from its fields, once it has been validated. Each compressed field is
+        decompressed the next time that it is read, including when the content is
+        serialized (by serialize_model, which reads every field as an attribute).
+        """
+        for field_name in COMPACT_TEXT_FIELDS:
+            value = self.__dict__.get(field_name)
+            if isinstance(value, str) and len(value) >= MIN_COMPACT_TEXT_LENGTH:
+                self.__dict__[f"{COMPACT_TEXT_PREFIX}{field_name}"] = zlib.compress(
+                    value.encode("utf-8")
+                )
+                del self.__dict__[field_name]
+        # Usually the description itself, which would otherwise stay uncompressed
+        self.__dict__.pop("status_aware_description", None)
+        self.invalidate()
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called when name is not found normally, such as a field stored by compact()
+        compressed = self.__dict__.get(f"{COMPACT_TEXT_PREFIX}{name}")
+        if compressed is None:
+            if name in self.__dict__:
+                # Another thread restored it since it was looked up
+                return self.__dict__[name]
+            return super().__getattr__(name)  # type: ignore
+        value = zlib.decompress(compressed).decode("utf-8")
+        # Restore the field before removing the compressed value, so that it is
+        # always found by other threads which are writing the same content
+        self.__dict__[name] = value
+        self.__dict__.pop(f"{COMPACT_TEXT_PREFIX}{name}", None)
+        return value
+
     @computed_field
     @cached_property
     @abstractmethod
@@ -737,11 +779,7 @@ class SecurityContentObject_Abstract(BaseModel, abc.ABC):
                 # want to make any suggestions.  It is time consuming and not helpful
                 # to make these suggestions, so we just skip them in this check.
                 continue
-            matches = get_close_matches(
-                missing_object,
-                director.name_to_content_map.keys(),
-                n=3,
-            )
+            matches = director.suggestNames(missing_object, cls)
             if matches == []:
                 matches = ["NO SUGGESTIONS"]
 
@@ -751,10 +789,6 @@ class SecurityContentObject_Abstract(BaseModel, abc.ABC):
             )
 
         for mistyped_object in mistyped_objects:
-            matches = get_close_matches(
-                mistyped_object.name, director.name_to_content_map.keys(), n=3
-            )
-
             errors.append(
                 f"'{mistyped_object.name}' expected to have type '{cls.__name__}', but actually "
                 f"had type '{type(mistyped_object).__name__}'"
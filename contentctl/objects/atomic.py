@@ -4,15 +4,37 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from contentctl.objects.config import validate
 
+from contentctl.helper.utils import Utils
 from contentctl.input.yml_reader import YmlReader
-from pydantic import BaseModel, model_validator, ConfigDict, FilePath, UUID4
+from pydantic import (
+    BaseModel,
+    model_validator,
+    ConfigDict,
+    FilePath,
+    UUID4,
+    PrivateAttr,
+)
 import dataclasses
-from typing import List, Optional, Dict, Union, Self
+from typing import Any, List, Optional, Dict, Union, Self
 import pathlib
+import re
+import threading
+from collections import defaultdict
 from enum import StrEnum, auto
 import uuid
 
 
+# Finds the auto_generated_guid of every test in an atomics file without parsing the file
+AUTO_GENERATED_GUID = re.compile(
+    r"^[\s-]*auto_generated_guid:\s*['\"]?([0-9a-fA-F-]{36})", re.MULTILINE
+)
+
+# Bump this whenever the format of the cached index of the
+# Atomic Red Team repo changes. An index with a different
+# version is ignored.
+ATOMIC_INDEX_CACHE_VERSION = 2
+
+
 class SupportedPlatform(StrEnum):
     windows = auto()
     linux = auto()
@@ -109,8 +131,112 @@ class AtomicTest(BaseModel):
         )
 
     @classmethod
-    def parseArtRepo(cls, repo_path: pathlib.Path) -> dict[uuid.UUID, AtomicTest]:
+    def parseArtRepo(
+        cls,
+        repo_path: pathlib.Path,
+        max_workers: Union[int, None] = None,
+        cache_path: Union[pathlib.Path, None] = None,
+    ) -> dict[uuid.UUID, AtomicTest]:
         test_mapping: dict[uuid.UUID, AtomicTest] = {}
+        atomic_files = cls.parseAtomicFiles(
+            cls.getAtomicFilePaths(repo_path), max_workers, cache_path
+        )
+
+        # Now iterate over all the files, collect all the tests, and return the dict mapping
+        redefined_guids: set[uuid.UUID] = set()
+        for atomic_file in atomic_files:
+            for atomic_test in atomic_file.atomic_tests:
+                if atomic_test.auto_generated_guid in test_mapping:
+                    redefined_guids.add(atomic_test.auto_generated_guid)
+                else:
+                    test_mapping[atomic_test.auto_generated_guid] = atomic_test
+        cls.ensureNoRedefinedGuids(redefined_guids)
+
+        print(f"Successfully parsed [{len(test_mapping)}] Atomic Red Team Tests!")
+        return test_mapping
+
+    @classmethod
+    def indexArtRepo(
+        cls, repo_path: pathlib.Path, cache_path: Union[pathlib.Path, None] = None
+    ) -> dict[uuid.UUID, pathlib.Path]:
+        """
+        Find the file which defines each test in the Atomic Red Team repo, without parsing
+        any of the files. If a cache_path is given and the repo is a git repo, the index is
+        cached for the commit which is checked out.
+
+        Raises:
+            Exception: One or more auto_generated_guids are defined more than once.
+
+        Returns:
+            dict[uuid.UUID, pathlib.Path]: The file defining each auto_generated_guid.
+        """
+        cache_file = None if cache_path is None else cache_path / "atomic_index.pickle"
+        commit: Union[str, None] = None
+        if cache_file is not None:
+            import pygit2
+            from pygit2.enums import RepositoryOpenFlag
+
+            try:
+                # Only use the commit if repo_path is itself the root of a git repo, and not
+                # just inside of one (such as the content repo)
+                commit = str(
+                    pygit2.Repository(
+                        str(repo_path), RepositoryOpenFlag.NO_SEARCH
+                    ).head.target
+                )
+            except Exception:
+                # Not a git repo, so the index is not cached
+                pass
+            cache = Utils.load_versioned_cache(cache_file, ATOMIC_INDEX_CACHE_VERSION)
+            if (
+                commit is not None
+                and isinstance(cache, dict)
+                and cache.get("commit") == commit
+            ):
+                index = {
+                    uuid.UUID(guid): repo_path / relative_path
+                    for guid, relative_path in cache["index"].items()
+                }
+                print(
+                    f"Loaded the index of [{len(index)}] Atomic Red Team Tests from the cache"
+                )
+                return index
+
+        guid_files: defaultdict[uuid.UUID, list[pathlib.Path]] = defaultdict(list)
+        for obj_path in cls.getAtomicFilePaths(repo_path):
+            try:
+                text = obj_path.read_text(encoding="utf-8")
+            except (OSError, ValueError):
+                # Reported if (and when) a test in this file is used
+                continue
+            for guid in AUTO_GENERATED_GUID.findall(text):
+                try:
+                    guid_files[uuid.UUID(guid)].append(obj_path)
+                except ValueError:
+                    continue
+        cls.ensureNoRedefinedGuids(
+            {guid for guid, paths in guid_files.items() if len(paths) > 1}
+        )
+        index = {guid: paths[0] for guid, paths in guid_files.items()}
+
+        if cache_file is not None and commit is not None:
+            Utils.atomic_write_cache(
+                cache_file,
+                ATOMIC_INDEX_CACHE_VERSION,
+                {
+                    "commit": commit,
+                    "index": {
+                        str(guid): str(path.relative_to(repo_path))
+                        for guid, path in index.items()
+                    },
+                },
+            )
+
+        print(f"Indexed [{len(index)}] Atomic Red Team Tests")
+        return index
+
+    @staticmethod
+    def getAtomicFilePaths(repo_path: pathlib.Path) -> list[pathlib.Path]:
         atomics_path = repo_path / "atomics"
         if not atomics_path.is_dir():
             raise FileNotFoundError(
@@ -118,12 +244,28 @@ class AtomicTest(BaseModel):
                 f"but atomics directory does NOT exist at {atomics_path}. "
                 "Was it deleted or renamed?"
             )
+        return list(atomics_path.glob("**/T*.yaml"))
+
+    @classmethod
+    def parseAtomicFiles(
+        cls,
+        file_paths: list[pathlib.Path],
+        max_workers: Union[int, None] = None,
+        cache_path: Union[pathlib.Path, None] = None,
+    ) -> list[AtomicFile]:
+        """
+        Parse atomics files across a pool of worker processes, and validate them. Files
+        which cannot be validated are reported in a warning and left out.
+        """
+        parsed_files = YmlReader.parse_files(file_paths, max_workers, cache_path)
 
         atomic_files: List[AtomicFile] = []
         error_messages: List[str] = []
-        for obj_path in atomics_path.glob("**/T*.yaml"):
+        for obj_path in file_paths:
             try:
-                atomic_files.append(cls.constructAtomicFile(obj_path))
+                atomic_files.append(
+                    cls.constructAtomicFile(obj_path, parsed_files[obj_path])
+                )
             except Exception as e:
                 error_messages.append(f"File [{obj_path}]\n{str(e)}")
 
@@ -135,15 +277,10 @@ class AtomicTest(BaseModel):
                 "Note that this is only a warning and contentctl will ignore Atomics contained in these files.\n"
                 f"However, if you have written a detection that references them, 'contentctl build --enrichments' will fail:\n\n{exceptions_string}"
             )
+        return atomic_files
 
-        # Now iterate over all the files, collect all the tests, and return the dict mapping
-        redefined_guids: set[uuid.UUID] = set()
-        for atomic_file in atomic_files:
-            for atomic_test in atomic_file.atomic_tests:
-                if atomic_test.auto_generated_guid in test_mapping:
-                    redefined_guids.add(atomic_test.auto_generated_guid)
-                else:
-                    test_mapping[atomic_test.auto_generated_guid] = atomic_test
+    @staticmethod
+    def ensureNoRedefinedGuids(redefined_guids: set[uuid.UUID]) -> None:
         if len(redefined_guids) > 0:
             guids_string = "\n\t".join([str(guid) for guid in redefined_guids])
             raise Exception(
@@ -152,12 +289,13 @@ class AtomicTest(BaseModel):
                 f"auto_generated_guids MUST be unique:\n\t{guids_string}"
             )
 
-        print(f"Successfully parsed [{len(test_mapping)}] Atomic Red Team Tests!")
-        return test_mapping
-
     @classmethod
-    def constructAtomicFile(cls, file_path: pathlib.Path) -> AtomicFile:
-        yml_dict = YmlReader.load_file(file_path)
+    def constructAtomicFile(
+        cls,
+        file_path: pathlib.Path,
+        parse_result: Union[Dict[str, Any], Exception, None] = None,
+    ) -> AtomicFile:
+        yml_dict = YmlReader.load_file(file_path, parse_result=parse_result)
         atomic_file = AtomicFile.model_validate(yml_dict)
         return atomic_file
 
@@ -173,17 +311,66 @@ class AtomicFile(BaseModel):
 class AtomicEnrichment(BaseModel):
     data: dict[uuid.UUID, AtomicTest] = dataclasses.field(default_factory=dict)
     use_enrichment: bool = False
+    # Only set in lazy mode, where a test is not parsed until it is first used.
+    # Then, this is the file which defines each test.
+    guid_to_file: Optional[dict[uuid.UUID, pathlib.Path]] = None
+    _max_workers: Optional[int] = PrivateAttr(default=None)
+    _cache_path: Optional[pathlib.Path] = PrivateAttr(default=None)
+    _parsed_files: set[pathlib.Path] = PrivateAttr(default_factory=set)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
 
     @classmethod
     def getAtomicEnrichment(cls, config: validate) -> AtomicEnrichment:
         enrichment = AtomicEnrichment(use_enrichment=config.enrichments)
-        if config.enrichments:
-            enrichment.data = AtomicTest.parseArtRepo(config.atomic_red_team_repo_path)
+        if not config.enrichments:
+            return enrichment
+
+        enrichment._max_workers = config.yml_parse_workers
+        enrichment._cache_path = config.cache_path if config.cache else None
+        if config.lazy_atomic_enrichment:
+            enrichment.guid_to_file = AtomicTest.indexArtRepo(
+                config.atomic_red_team_repo_path, enrichment._cache_path
+            )
+        else:
+            enrichment.data = AtomicTest.parseArtRepo(
+                config.atomic_red_team_repo_path,
+                enrichment._max_workers,
+                enrichment._cache_path,
+            )
 
         return enrichment
 
+    def loadAtomics(self, atomic_guids: set[uuid.UUID]) -> None:
+        """
+        In lazy mode, parse every file defining one of atomic_guids which has not been
+        parsed yet, all at once. Otherwise, do nothing.
+        """
+        if not self.use_enrichment or self.guid_to_file is None:
+            return
+
+        with self._lock:
+            file_paths = sorted(
+                {
+                    self.guid_to_file[atomic_guid]
+                    for atomic_guid in atomic_guids
+                    if atomic_guid in self.guid_to_file
+                }
+                # Files are not parsed again, even if they could not be validated
+                - self._parsed_files
+            )
+            if len(file_paths) == 0:
+                return
+
+            self._parsed_files.update(file_paths)
+            for atomic_file in AtomicTest.parseAtomicFiles(
+                file_paths, self._max_workers, self._cache_path
+            ):
+                for atomic_test in atomic_file.atomic_tests:
+                    self.data[atomic_test.auto_generated_guid] = atomic_test
+
     def getAtomic(self, atomic_guid: uuid.UUID) -> AtomicTest:
         if self.use_enrichment:
+            self.loadAtomics({atomic_guid})
             if atomic_guid in self.data:
                 return self.data[atomic_guid]
             else:
@@ -4,8 +4,6 @@ from enum import StrEnum
 from pydantic import ConfigDict, BaseModel
 from splunklib.data import Record  # type: ignore
 
-from contentctl.helper.utils import Utils
-
 
 # TODO (#267): Align test reporting more closely w/ status enums (as it relates to "untested")
 # TODO (PEX-432): add status "UNSET" so that we can make sure the result is always of this enum
@@ -130,6 +128,8 @@ class BaseTestResult(BaseModel):
                 # small differences in the number of fields they share)
                 summary_dict[field] = None
 
+        from contentctl.helper.utils import Utils
+
         # Grab the job content fields required
         for field in job_fields:
             if self.job_content is not None:
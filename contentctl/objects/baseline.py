@@ -24,7 +24,9 @@ from contentctl.objects.constants import (
 from contentctl.objects.deployment import Deployment
 from contentctl.objects.enums import ContentStatus, DataModel
 from contentctl.objects.lookup import Lookup
+from contentctl.objects.sealable import sealed_property
 from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.spl_analysis import SplAnalysis
 
 
 class Baseline(SecurityContentObject):
@@ -80,9 +82,9 @@ class Baseline(SecurityContentObject):
         return Deployment.getDeployment(v, info)
 
     @computed_field
-    @property
+    @sealed_property
     def datamodel(self) -> List[DataModel]:
-        return [dm for dm in DataModel if dm in self.search]
+        return list(SplAnalysis.analyze(self.search).datamodels)
 
     @model_serializer
     def serialize_model(self):
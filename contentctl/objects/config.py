@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import hashlib
 import pathlib
 import random
 from abc import ABC, abstractmethod
@@ -7,11 +8,10 @@ from datetime import UTC, datetime
 from enum import StrEnum, auto
 from functools import partialmethod
 from os import environ
-from typing import Any, List, Optional, Self, Union
+from typing import TYPE_CHECKING, Any, List, Optional, Self, Union
 from urllib.parse import urlparse
 
 import semantic_version
-import tqdm
 from pydantic import (
     AnyUrl,
     BaseModel,
@@ -20,21 +20,25 @@ from pydantic import (
     Field,
     FilePath,
     HttpUrl,
+    NonNegativeFloat,
+    PositiveFloat,
     PositiveInt,
+    PrivateAttr,
     ValidationInfo,
     field_serializer,
     field_validator,
     model_validator,
 )
-from requests import RequestException, head
 
-from contentctl.helper.splunk_app import SplunkApp
+from contentctl.helper.app_cache import AppCache
 from contentctl.helper.utils import Utils
+from contentctl.input.csv_validator import DEFAULT_MAX_CSV_ERRORS
 from contentctl.objects.annotated_types import APPID_TYPE
 from contentctl.objects.constants import DOWNLOADS_DIRECTORY
-from contentctl.objects.detection import Detection
 from contentctl.objects.enums import PostTestBehavior
-from contentctl.output.yml_writer import YmlWriter
+
+if TYPE_CHECKING:
+    from contentctl.objects.detection import Detection
 
 ENTERPRISE_SECURITY_UID = 263
 COMMON_INFORMATION_MODEL_UID = 1621
@@ -105,16 +109,24 @@ class TestApp(App_Base):
         elif isinstance(self.hardcoded_path, pathlib.Path):
             destination = config.getLocalAppDir() / self.hardcoded_path.name
             if stage_file:
-                Utils.copy_local_file(
-                    str(self.hardcoded_path), str(destination), verbose_print=True
-                )
+                print(f"Staging [{self.hardcoded_path}] to [{destination}]")
+                AppCache.stage(self.hardcoded_path, destination)
 
         elif isinstance(self.hardcoded_path, AnyUrl):
             file_url_string = str(self.hardcoded_path)
             server_path = pathlib.Path(urlparse(file_url_string).path)
             destination = config.getLocalAppDir() / server_path.name
             if stage_file:
-                Utils.download_file_from_http(file_url_string, str(destination))
+                app_cache = config.getAppCache()
+                if app_cache is None:
+                    Utils.download_file_from_http(file_url_string, str(destination))
+                else:
+                    AppCache.stage(
+                        app_cache.download(
+                            AppCache.url_key(file_url_string), file_url_string
+                        ),
+                        destination,
+                    )
         else:
             raise Exception(f"Unknown path for app '{self.title}'")
 
@@ -217,11 +229,11 @@ class CustomApp(App_Base):
             config.getPackageFilePath(include_version=True).name
         )
         if stage_file:
-            Utils.copy_local_file(
-                str(config.getPackageFilePath(include_version=True)),
-                str(destination),
-                verbose_print=True,
-            )
+            package_path = config.getPackageFilePath(include_version=True)
+            if not package_path.is_file():
+                raise Exception(f"[{package_path}] does not exist")
+            print(f"Staging [{package_path}] to [{destination}]")
+            AppCache.stage(package_path, destination)
         return str(destination)
 
 
@@ -312,6 +324,13 @@ class validate(Config_Base):
         "and validating these values, but should otherwise "
         "be avoided for performance reasons.",
     )
+    lazy_atomic_enrichment: bool = Field(
+        default=False,
+        description="When enrichments are enabled, only parse the files of the Atomic Red "
+        "Team repo which define atomic_guids referenced by detections, rather than every "
+        "file in the repo. Duplicate auto_generated_guids are still found in every file, "
+        "but errors in files that no detection references are not reported.",
+    )
     build_app: bool = Field(
         default=True, description="Should an app be built and output in the build_path?"
     )
@@ -322,6 +341,90 @@ class validate(Config_Base):
     data_source_TA_validation: bool = Field(
         default=False, description="Validate latest TA information from Splunkbase"
     )
+    splunkbase_ttl_hours: NonNegativeFloat = Field(
+        default=24,
+        description="The number of hours for which the latest version of a TA, fetched "
+        "from Splunkbase by data_source_TA_validation, is cached when cache is enabled.",
+    )
+    check_references: bool = Field(
+        default=False,
+        description="Check that every link in the references of the content can be "
+        "resolved. Links are checked concurrently, with at most a few connections to "
+        "any one host. With --cache, the result of checking each link is cached in the "
+        "cache_directory until it expires.",
+    )
+    reference_success_ttl_hours: NonNegativeFloat = Field(
+        default=7 * 24,
+        description="The number of hours for which a link which was resolved is not "
+        "checked again, when check_references and cache are enabled.",
+    )
+    reference_failure_ttl_hours: NonNegativeFloat = Field(
+        default=1,
+        description="The number of hours for which a link which could not be resolved is "
+        "not checked again, when check_references and cache are enabled.",
+    )
+    reference_check_workers: PositiveInt = Field(
+        default=16,
+        description="The number of links which may be checked at the same time, "
+        "when check_references is enabled.",
+    )
+    yml_parse_workers: Optional[PositiveInt] = Field(
+        default=None,
+        description="The number of worker processes used to parse content YML files "
+        "before they are validated. If this is not set, one worker per CPU is used. "
+        "Set this to 1 to parse all files in the main process.",
+    )
+    memory_report: bool = Field(
+        default=False,
+        description="Trace memory allocations with tracemalloc, and report the memory "
+        "retained by each content type and by its largest fields once content has been "
+        "validated (and again once it has been built). Tracing slows contentctl down.",
+    )
+    compact: bool = Field(
+        default=False,
+        description="Reduce the memory used by large content sets. Once content has been "
+        "validated, the indexes used only while validating it are released, values derived "
+        "from its fields are discarded (and recomputed when needed), and large text fields "
+        "(description, how_to_implement, and known_false_positives) are stored compressed "
+        "until they are read by the output writers.",
+    )
+    cache: bool = Field(
+        default=False,
+        description="Cache parsed content YML files, the results of checking lookup "
+        "CSV files, and the MITRE ATT&CK enrichments built from mitre_cti_repo_path, in the "
+        "cache_directory. Files which have not changed "
+        "since the last run are loaded from the cache instead of being parsed or checked "
+        "again, and the enrichments are loaded from the cache as long as the same commit of "
+        "the mitre/cti repo is checked out. Use --no-cache to ignore the cache for a single run.",
+    )
+    cache_directory: Optional[pathlib.Path] = Field(
+        default=None,
+        description="The directory where the caches used by cache and incremental are "
+        "kept. If this is not set, each app has its own directory in the contentctl "
+        "directory of your user cache directory ($XDG_CACHE_HOME, or ~/.cache on Linux), "
+        "outside of the app, so that cache files are never committed to the repo of the "
+        "app. Cache files are signed with a key kept in that contentctl directory, and "
+        "any cache file which was not signed with it is ignored.",
+    )
+    max_csv_errors: PositiveInt = Field(
+        default=DEFAULT_MAX_CSV_ERRORS,
+        description="The maximum number of rows with the wrong number of columns reported "
+        "for each lookup CSV file. Checking a CSV file stops once this many errors are found.",
+    )
+    incremental: bool = Field(
+        default=False,
+        description="Only validate the content which changed since the last successful "
+        "incremental run, along with all of the content that depends on it. All other "
+        "content is restored from a snapshot in the cache_directory. If the version of "
+        "contentctl or the configuration changed, "
+        "all content is validated.",
+    )
+    rebuild: bool = Field(
+        default=False,
+        description="Ignore the snapshot and the rendered conf file stanzas cached by "
+        "previous incremental runs, and validate (and build) all content again. When used "
+        "with --incremental, the cache is replaced with the results of this run.",
+    )
 
     test_data_caches: list[AttackDataCache] = Field(
         default=[],
@@ -337,6 +440,14 @@ class validate(Config_Base):
     def external_repos_path(self) -> pathlib.Path:
         return self.path / "external_repos"
 
+    @property
+    def cache_path(self) -> pathlib.Path:
+        if self.cache_directory is not None:
+            return self.cache_directory
+        app_path = self.path.absolute()
+        app_hash = hashlib.sha256(str(app_path).encode("utf-8")).hexdigest()[:16]
+        return Utils.user_cache_directory() / f"{app_path.name}-{app_hash}"
+
     # We can't make this a validator because the constructor
     # is called many times - we don't want to print this out many times.
     def check_test_data_caches(self) -> Self:
@@ -381,6 +492,8 @@ class validate(Config_Base):
     def map_to_attack_data_cache(
         self, filename: HttpUrl | FilePath, verbose: bool = False
     ) -> HttpUrl | FilePath:
+        from requests import RequestException, head
+
         if str(filename) in ATTACK_DATA_CACHE_MAPPING_EXCEPTIONS:
             # This is already something that we have emitted a warning or
             # Exception for.  We don't want to emit it again as it will
@@ -476,6 +589,12 @@ class validate(Config_Base):
     def atomic_red_team_repo_path(self):
         return self.external_repos_path / "atomic-red-team"
 
+    @property
+    def nvd_feed_path(self) -> pathlib.Path:
+        # Optional. If NVD JSON feed files have been downloaded to this directory,
+        # CVEs are enriched from them when enrichments are enabled.
+        return self.external_repos_path / "nvd"
+
     @model_validator(mode="after")
     def ensureEnrichmentReposPresent(self) -> Self:
         """
@@ -522,6 +641,20 @@ class report(validate):
         return self.path / "reporting/"
 
 
+class watch(validate):
+    poll_interval: PositiveFloat = Field(
+        default=0.5,
+        description="How often, in seconds, to check the content directories for changes.",
+    )
+    query: bool = Field(
+        default=False,
+        description="Instead of watching the app, ask the 'contentctl watch' which is already "
+        "running for this app to validate any changes, print the result, and exit. "
+        "The exit code is 0 if validation succeeded and 1 if it failed. If contentctl watch "
+        "is not running, the content is validated as it would be by contentctl validate.",
+    )
+
+
 class build(validate):
     model_config = ConfigDict(validate_default=True, arbitrary_types_allowed=True)
     build_path: DirectoryPath = Field(
@@ -552,6 +685,24 @@ class build(validate):
             v.mkdir(parents=True)
         return v
 
+    app_cache_max_size_mb: PositiveInt = Field(
+        default=8192,
+        description="When cache is enabled, app packages which are downloaded (such as "
+        "the apps installed on test instances, or the previous build of your app from "
+        "Splunkbase) are cached in the cache_directory. Once the cached packages are "
+        "larger than this, the least recently used packages are removed from the cache.",
+    )
+    _app_cache: Optional[AppCache] = PrivateAttr(default=None)
+
+    def getAppCache(self) -> Optional[AppCache]:
+        if not self.cache:
+            return None
+        if self._app_cache is None:
+            self._app_cache = AppCache(
+                self.cache_path / "apps", self.app_cache_max_size_mb * 1024 * 1024
+            )
+        return self._app_cache
+
     def getBuildDir(self) -> pathlib.Path:
         return self.path / self.build_path
 
@@ -649,6 +800,8 @@ class inspect(build):
         :returns: Path object to previous app build
         :rtype: :class:`pathlib.Path`
         """
+        from contentctl.helper.splunk_app import SplunkApp
+
         previous_build_path = self.previous_build
         # Download the previous build as the latest release on Splunkbase if no path was provided
         if previous_build_path is None:
@@ -657,13 +810,25 @@ class inspect(build):
                 "build during validation..."
             )
             app = SplunkApp(app_uid=self.app.uid)
-            previous_build_path = app.download(
-                out=pathlib.Path(DOWNLOADS_DIRECTORY),
-                username=self.splunk_api_username,
-                password=self.splunk_api_password,
-                is_dir=True,
-                overwrite=True,
-            )
+            app_cache = self.getAppCache()
+            cache_key = AppCache.splunkbase_key(self.app.uid, app.latest_version)
+            cached_path = None if app_cache is None else app_cache.get(cache_key)
+            if app_cache is not None and cached_path is not None:
+                previous_build_path = pathlib.Path(
+                    DOWNLOADS_DIRECTORY, app_cache.name(cache_key)
+                )
+                previous_build_path.parent.mkdir(parents=True, exist_ok=True)
+                AppCache.stage(cached_path, previous_build_path)
+            else:
+                previous_build_path = app.download(
+                    out=pathlib.Path(DOWNLOADS_DIRECTORY),
+                    username=self.splunk_api_username,
+                    password=self.splunk_api_password,
+                    is_dir=True,
+                    overwrite=True,
+                )
+                if app_cache is not None:
+                    app_cache.add_file(cache_key, previous_build_path)
             print(
                 f"Latest release downloaded from Splunkbase to: {previous_build_path}"
             )
@@ -1059,6 +1224,8 @@ class test_common(build):
     )
 
     def dumpCICDPlanAndQuit(self, githash: str, detections: List[Detection]):
+        from contentctl.output.yml_writer import YmlWriter
+
         output_file = self.path / "test_plan.yml"
         self.mode = Selected(
             files=sorted(
@@ -1132,6 +1299,8 @@ class test_common(build):
     @model_validator(mode="after")
     def suppressTQDM(self) -> Self:
         if self.disable_tqdm:
+            import tqdm
+
             tqdm.tqdm.__init__ = partialmethod(tqdm.tqdm.__init__, disable=True)
             if self.post_test_behavior != PostTestBehavior.never_pause:
                 raise ValueError(
@@ -1223,6 +1392,23 @@ class test(test_common):
         if include_custom_app:
             apps.append(self.app)
 
+        app_cache = self.getAppCache()
+        if stage_file and app_cache is not None:
+            # Download every app which is not already cached at the same time,
+            # before they are staged one at a time
+            app_cache.download_all(
+                {
+                    AppCache.url_key(str(app.hardcoded_path)): str(app.hardcoded_path)
+                    for app in apps
+                    if isinstance(app, TestApp)
+                    and isinstance(app.hardcoded_path, AnyUrl)
+                    and (
+                        self.splunk_api_password is None
+                        or self.splunk_api_username is None
+                    )
+                }
+            )
+
         paths = [app.getApp(self, stage_file=stage_file) for app in apps]
 
         container_paths = []
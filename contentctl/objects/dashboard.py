@@ -1,15 +1,17 @@
 import json
 import pathlib
 from enum import StrEnum
-from typing import Any
+from typing import TYPE_CHECKING, Any
 
-from jinja2 import Environment
 from pydantic import Field, Json, field_validator, model_validator
 
 from contentctl.objects.config import build
 from contentctl.objects.enums import ContentStatus
 from contentctl.objects.security_content_object import SecurityContentObject
 
+if TYPE_CHECKING:
+    from jinja2 import Environment
+
 DEFAULT_DASHBOARD_JINJA2_TEMPLATE = """<dashboard version="2" theme="{{ dashboard.theme }}">
     <label>{{ dashboard.name }}</label>
     <description></description>
@@ -122,7 +124,7 @@ class Dashboard(SecurityContentObject):
 
         return pathlib.Path("default/data/ui/views") / filename
 
-    def writeDashboardFile(self, j2_env: Environment, config: build):
+    def writeDashboardFile(self, j2_env: "Environment", config: build):
         template = j2_env.from_string(self.j2_template)
         dashboard_text = template.render(config=config, dashboard=self)
 
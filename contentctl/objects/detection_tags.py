@@ -5,7 +5,6 @@ from typing import TYPE_CHECKING, List, Optional, Union
 
 from pydantic import (
     UUID4,
-    BaseModel,
     ConfigDict,
     Field,
     HttpUrl,
@@ -37,9 +36,10 @@ from contentctl.objects.mitre_attack_enrichment import (
     MitreAttackEnrichment,
     MitreAttackGroup,
 )
+from contentctl.objects.sealable import Sealable, sealed_property
 
 
-class DetectionTags(BaseModel):
+class DetectionTags(Sealable):
     # detection spec
 
     model_config = ConfigDict(validate_default=False, extra="forbid")
@@ -62,7 +62,7 @@ class DetectionTags(BaseModel):
     )
 
     @computed_field
-    @property
+    @sealed_property
     def kill_chain_phases(self) -> list[KillChainPhase]:
         phases: set[KillChainPhase] = set()
         for enrichment in self.mitre_attack_enrichments:
@@ -73,7 +73,7 @@ class DetectionTags(BaseModel):
 
     # We do not want this to be included in serialization. By default, @property
     # objects are not included in dumps
-    @property
+    @sealed_property
     def unique_mitre_attack_groups(self) -> list[MitreAttackGroup]:
         group_set: set[MitreAttackGroup] = set()
         for enrichment in self.mitre_attack_enrichments:
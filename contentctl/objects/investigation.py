@@ -20,7 +20,9 @@ from contentctl.objects.constants import (
 )
 from contentctl.objects.enums import ContentStatus, DataModel
 from contentctl.objects.investigation_tags import InvestigationTags
+from contentctl.objects.sealable import sealed_property
 from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.spl_analysis import SplAnalysis
 
 
 class Investigation(SecurityContentObject):
@@ -56,9 +58,9 @@ class Investigation(SecurityContentObject):
         return inputs
 
     @computed_field
-    @property
+    @sealed_property
     def datamodel(self) -> List[DataModel]:
-        return [dm for dm in DataModel if dm in self.search]
+        return list(SplAnalysis.analyze(self.search).datamodels)
 
     @computed_field
     @property
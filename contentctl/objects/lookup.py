@@ -1,10 +1,8 @@
 from __future__ import annotations
 
 import abc
-import csv
 import datetime
 import pathlib
-import re
 from enum import StrEnum, auto
 from functools import cached_property
 from typing import TYPE_CHECKING, Annotated, Any, Literal, Self
@@ -29,8 +27,14 @@ if TYPE_CHECKING:
 
 from io import StringIO, TextIOBase
 
+from contentctl.input.csv_validator import (
+    DEFAULT_MAX_CSV_ERRORS,
+    CsvStructure,
+    check_csv_structure,
+)
 from contentctl.objects.enums import ContentStatus
 from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.spl_analysis import SplAnalysis
 
 # This section is used to ignore lookups that are NOT  shipped with ESCU app but are used in the detections. Adding exclusions here will so that contentctl builds will not fail.
 LOOKUPS_TO_IGNORE = set(["outputlookup"])
@@ -159,28 +163,10 @@ class Lookup(SecurityContentObject, abc.ABC):
         director: DirectorOutputDto,
         ignore_lookups: set[str] = LOOKUPS_TO_IGNORE,
     ) -> list[Lookup]:
-        # Comprehensively match all kinds of lookups, including inputlookup and outputlookup
-        inputLookupsToGet = set(
-            re.findall(
-                r"[^\w]inputlookup(?:\s*(?:(?:append|strict|start|max)\s*=\s*(?:true|t|false|f))){0,4}\s+([\w]+)",
-                text_field,
-                re.IGNORECASE,
-            )
-        )
-        outputLookupsToGet = set(
-            re.findall(
-                r"[^\w]outputlookup(?:\s*(?:(?:append|create_empty|override_if_empty|max|key_field|allow_updates|createinapp|create_context|output_format)\s*=\s*[^\s]*))*\s+([\w]+)",
-                text_field,
-                re.IGNORECASE,
-            )
-        )
-        lookupsToGet = set(
-            re.findall(
-                r"[^\w](?:(?<!output)(?<!input))lookup(?:\s*(?:(?:local|update)\s*=\s*(?:true|t|false|f))){0,2}\s+([\w]+)",
-                text_field,
-                re.IGNORECASE,
-            )
-        )
+        analysis = SplAnalysis.analyze(text_field)
+        inputLookupsToGet = analysis.input_lookups
+        outputLookupsToGet = analysis.output_lookups
+        lookupsToGet = analysis.lookups
 
         input_lookups = Lookup.mapNamesToSecurityContentObjects(
             list(inputLookupsToGet - LOOKUPS_TO_IGNORE), director
@@ -284,41 +270,31 @@ class CSVLookup(FileBackedLookup):
         )
 
     @model_validator(mode="after")
-    def ensure_correct_csv_structure(self) -> Self:
-        # https://docs.python.org/3/library/csv.html#csv.DictReader
-        # Column Names (fieldnames) determine by the number of columns in the first row.
-        # If a row has MORE fields than fieldnames, they will be dumped in a list under the key 'restkey' - this should throw an Exception
-        # If a row has LESS fields than fieldnames, then the field should contain None by default. This should also throw an exception.
-        csv_errors: list[str] = []
-
-        RESTKEY = "extra_fields_in_a_row"
-        with self.content_file_handle as handle:
-            csv_dict = csv.DictReader(handle, restkey=RESTKEY)
-
-            if csv_dict.fieldnames is None:
-                raise ValueError(
-                    f"Error validating the CSV referenced by the lookup: {self.filename}:\n\t"
-                    "Unable to read fieldnames from CSV. Is the CSV empty?\n"
-                    "  Please try opening the file with a CSV Editor to ensure that it is correct."
-                )
-            # Remember that row 1 has the headers and we do not iterate over it in the loop below
-            # CSVs are typically indexed starting a row 1 for the header.
-            for row_index, data_row in enumerate(csv_dict):
-                row_index += 2
-                if len(data_row.get(RESTKEY, [])) > 0:
-                    csv_errors.append(
-                        f"row [{row_index}] should have [{len(csv_dict.fieldnames)}] columns,"
-                        f" but instead had [{len(csv_dict.fieldnames) + len(data_row.get(RESTKEY, []))}]."
-                    )
-
-                for column_index, column_name in enumerate(data_row):
-                    if data_row[column_name] is None:
-                        csv_errors.append(
-                            f"row [{row_index}] should have [{len(csv_dict.fieldnames)}] columns, "
-                            f"but instead had [{column_index}]."
-                        )
-        if len(csv_errors) > 0:
-            err_string = "\n\t".join(csv_errors)
+    def ensure_correct_csv_structure(self, info: ValidationInfo) -> Self:
+        # Every row must have the same number of columns as the first row, which holds the
+        # column names. The Director checks the CSVs of all lookups up front, in parallel.
+        # Otherwise (for example, for a RuntimeCSV), the CSV is checked now.
+        context = info.context or {}
+        config: validate | None = context.get("config", None)
+        max_errors = DEFAULT_MAX_CSV_ERRORS if config is None else config.max_csv_errors
+
+        structure: CsvStructure | None = None
+        if self.file_path is not None:
+            structure = context.get("csv_structures", {}).get(
+                str(self.filename.absolute()), None
+            )
+        if structure is None:
+            with self.content_file_handle as handle:
+                structure = check_csv_structure(handle, max_errors)
+
+        if structure.columns is None:
+            raise ValueError(
+                f"Error validating the CSV referenced by the lookup: {self.filename}:\n\t"
+                "Unable to read fieldnames from CSV. Is the CSV empty?\n"
+                "  Please try opening the file with a CSV Editor to ensure that it is correct."
+            )
+        if len(structure.errors) > 0:
+            err_string = "\n\t".join(structure.errors)
             raise ValueError(
                 f"Error validating the CSV referenced by the lookup: {self.filename}:\n\t{err_string}\n"
                 f"  Please try opening the file with a CSV Editor to ensure that it is correct."
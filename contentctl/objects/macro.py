@@ -4,7 +4,6 @@ from __future__ import annotations
 
 import datetime
 import pathlib
-import re
 import uuid
 from typing import TYPE_CHECKING, List
 
@@ -15,6 +14,7 @@ if TYPE_CHECKING:
 
 from contentctl.objects.enums import ContentStatus
 from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.spl_analysis import SplAnalysis
 
 # The following macros are included in commonly-installed apps.
 # As such, we will ignore if they are missing from our app.
@@ -70,29 +70,16 @@ class Macro(SecurityContentObject):
         director: DirectorOutputDto,
         ignore_macros: set[str] = MACROS_TO_IGNORE,
     ) -> list[Macro]:
-        # Remove any comments, allowing there to be macros (which have a single backtick) inside those comments
-        # If a comment ENDS in a macro, for example ```this is a comment with a macro `macro_here````
-        # then there is a small edge case where the regex below does not work properly.  If that is
-        # the case, we edit the search slightly to insert a space
-        if re.findall(r"\`\`\`\`", text_field):
+        # Macros inside of comments are not included in the analysis
+        analysis = SplAnalysis.analyze(text_field)
+        if analysis.invalid_backticks:
             raise ValueError(
                 "Search contained four or more '`' characters in a row which is invalid SPL"
                 "This may have occurred when a macro was commented out.\n"
                 "Please ammend your search to remove the substring '````'"
             )
 
-        # Replace all the comments with a space. This prevents a comment from looking like a macro to the parser below
-        text_field = re.sub(r"\`\`\`[\s\S]*?\`\`\`", " ", text_field)
-
-        # Find all the macros, which start and end with a '`' character
-        macros_to_get = re.findall(r"`([^\s]+)`", text_field)
-        # If macros take arguments, stop at the first argument.  We just want the name of the macro
-        macros_to_get = set(
-            [
-                macro[: macro.find("(")] if macro.find("(") != -1 else macro
-                for macro in macros_to_get
-            ]
-        )
+        macros_to_get = set(analysis.macros)
 
         macros_to_ignore = set(
             [
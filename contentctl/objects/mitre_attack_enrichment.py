@@ -45,7 +45,8 @@ class MitreExternalReference(BaseModel):
 
 
 class MitreAttackGroup(BaseModel):
-    model_config = ConfigDict(extra="forbid")
+    # Each group is shared by the enrichment of every technique that it uses
+    model_config = ConfigDict(extra="forbid", frozen=True)
     contributors: list[str] = []
     created: datetime.datetime
     created_by_ref: str
@@ -99,7 +100,9 @@ class MitreAttackGroup(BaseModel):
 
 
 class MitreAttackEnrichment(BaseModel):
-    ConfigDict(extra="forbid")
+    # A single enrichment of each technique is shared by every piece of content which
+    # references it, so enrichments may never be changed once they have been created
+    model_config = ConfigDict(extra="forbid", frozen=True)
     mitre_attack_id: MITRE_ATTACK_ID_TYPE = Field(...)
     mitre_attack_technique: str = Field(...)
     mitre_attack_tactics: List[MitreTactics] = Field(...)
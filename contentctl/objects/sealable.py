@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import functools
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+# Marks a model as sealed. Like the values of a cached_property, this is stored alongside
+# the fields of the model, which keeps it out of comparisons and serialization.
+SEALED = "_sealed"
+
+
+class sealed_property(functools.cached_property):
+    """
+    A property which is computed every time that it is accessed until its model is sealed,
+    and only once after that. Like a cached_property, it may be wrapped by computed_field.
+    """
+
+    def __get__(self, instance: Any, owner: type | None = None) -> Any:
+        if instance is None:
+            return self
+        if SEALED not in instance.__dict__:
+            return self.func(instance)
+        # Stores the value in the __dict__ of the instance, where it is found
+        # (without calling this method) every time it is accessed from now on
+        return super().__get__(instance, owner)
+
+
+@functools.cache
+def sealed_property_names(cls: type) -> tuple[str, ...]:
+    return tuple(
+        name
+        for klass in cls.__mro__
+        for name, attribute in vars(klass).items()
+        if isinstance(attribute, sealed_property)
+    )
+
+
+class Sealable(BaseModel):
+    """
+    A model whose derived values (see sealed_property) are memoized once it has been
+    sealed. The Director seals all content once it has been constructed, since from then
+    on it is only read, many times over, by the output templates and serializers.
+
+    Assigning to any field of a sealed model discards its memoized values. Nothing else
+    does, so the following changes must be followed by a call to invalidate() on every
+    model whose values depend on what changed:
+    - changing a field in place, such as appending to one of its lists;
+    - assigning to a field of a nested model, which only invalidates the nested model
+      itself (for example, a detection's tags, but not the detection);
+    - changing other content which a value is derived from. For example, the data_sources
+      of a story are derived from its detections, and are not discarded when one of those
+      detections is assigned new data sources;
+    - writing to the __dict__ of the model directly, rather than through setattr.
+    Discarding the values of every cached_property of a model also unseals it.
+    """
+
+    # Allow sealed properties which are not also computed fields
+    model_config = ConfigDict(ignored_types=(sealed_property,))
+
+    @property
+    def sealed(self) -> bool:
+        return SEALED in self.__dict__
+
+    def seal(self) -> None:
+        self.__dict__[SEALED] = True
+
+    def unseal(self) -> None:
+        self.invalidate()
+        self.__dict__.pop(SEALED, None)
+
+    def invalidate(self) -> None:
+        for name in sealed_property_names(type(self)):
+            self.__dict__.pop(name, None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        if SEALED in self.__dict__:
+            self.invalidate()
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import functools
+import re
+from dataclasses import dataclass
+from typing import Iterable
+
+from contentctl.objects.enums import DataModel
+
+# Comments are surrounded by three '`' characters. Four in a row is invalid SPL.
+SPL_COMMENT = re.compile(r"\`\`\`[\s\S]*?\`\`\`")
+SPL_INVALID_BACKTICKS = re.compile(r"\`\`\`\`")
+
+# Macros start and end with a '`' character
+SPL_MACRO = re.compile(r"`([^\s]+)`")
+
+# Comprehensively match all kinds of lookups, including inputlookup and outputlookup
+SPL_INPUT_LOOKUP = re.compile(
+    r"[^\w]inputlookup(?:\s*(?:(?:append|strict|start|max)\s*=\s*(?:true|t|false|f))){0,4}\s+([\w]+)",
+    re.IGNORECASE,
+)
+SPL_OUTPUT_LOOKUP = re.compile(
+    r"[^\w]outputlookup(?:\s*(?:(?:append|create_empty|override_if_empty|max|key_field|allow_updates|createinapp|create_context|output_format)\s*=\s*[^\s]*))*\s+([\w]+)",
+    re.IGNORECASE,
+)
+SPL_LOOKUP = re.compile(
+    r"[^\w](?:(?<!output)(?<!input))lookup(?:\s*(?:(?:local|update)\s*=\s*(?:true|t|false|f))){0,2}\s+([\w]+)",
+    re.IGNORECASE,
+)
+
+# Enough to hold every search in a large app, while still bounding
+# the memory used by a long running 'contentctl watch'
+SPL_ANALYSIS_CACHE_SIZE = 8192
+
+
+@dataclass(frozen=True)
+class SplAnalysis:
+    """
+    Everything that contentctl needs to know about the references in an SPL search.
+    Searches are analyzed once, the first time they are seen, and the analysis is shared
+    by everything that inspects the search (macro and lookup resolution, datamodels,
+    the filter macro and the fields that data sources output).
+    """
+
+    search: str
+    # True if the search contains four or more '`' characters in a row
+    invalid_backticks: bool
+    # Names of the macros outside of comments, without any arguments
+    macros: frozenset[str]
+    input_lookups: frozenset[str]
+    output_lookups: frozenset[str]
+    lookups: frozenset[str]
+    datamodels: tuple[DataModel, ...]
+
+    def references(self, text: str) -> bool:
+        """
+        Whether the search refers to text anywhere, including inside of comments and
+        inside of longer identifiers. This is how the filter macro has always been checked
+        for, and existing content relies on it.
+        """
+        return text in self.search
+
+    def referenced_fields(self, fields: Iterable[str]) -> list[str]:
+        """
+        The fields which the search refers to, in the same order as they are given.
+        Like references, a field inside of a comment or a longer identifier counts.
+        """
+        return [field for field in fields if self.references(field)]
+
+    @staticmethod
+    @functools.lru_cache(maxsize=SPL_ANALYSIS_CACHE_SIZE)
+    def analyze(search: str) -> SplAnalysis:
+        # Replace all the comments with a space. This prevents a comment from looking like a macro.
+        # If a comment ENDS in a macro, for example ```this is a comment with a macro `macro_here````
+        # then there is a small edge case where this does not work properly, which is why four '`'
+        # characters in a row are treated as invalid.
+        without_comments = SPL_COMMENT.sub(" ", search)
+
+        # If macros take arguments, stop at the first argument. We just want the name of the macro
+        macros = frozenset(
+            macro[: macro.find("(")] if macro.find("(") != -1 else macro
+            for macro in SPL_MACRO.findall(without_comments)
+        )
+
+        return SplAnalysis(
+            search=search,
+            invalid_backticks=SPL_INVALID_BACKTICKS.search(search) is not None,
+            macros=macros,
+            input_lookups=frozenset(SPL_INPUT_LOOKUP.findall(search)),
+            output_lookups=frozenset(SPL_OUTPUT_LOOKUP.findall(search)),
+            lookups=frozenset(SPL_LOOKUP.findall(search)),
+            datamodels=tuple(dm for dm in DataModel if dm in search),
+        )
@@ -25,6 +25,7 @@ if TYPE_CHECKING:
 import pathlib
 
 from contentctl.objects.enums import ContentStatus
+from contentctl.objects.sealable import sealed_property
 from contentctl.objects.security_content_object import SecurityContentObject
 
 
@@ -57,7 +58,7 @@ class Story(SecurityContentObject):
         )  # type:ignore
 
     @computed_field
-    @property
+    @sealed_property
     def data_sources(self) -> list[DataSource]:
         # Only add a data_source if it does not already exist in the story
         data_source_objects: set[DataSource] = set()
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Callable
+from typing import TYPE_CHECKING, Callable, Sequence
 
 if TYPE_CHECKING:
     from contentctl.objects.baseline import Baseline
@@ -15,12 +15,15 @@ import pathlib
 import shutil
 import tarfile
 
+from contentctl.helper.file_sync import place_file, sync_directory, write_text
 from contentctl.objects.config import build
 
 # These must be imported separately because they are not just used for typing,
 # they are used in isinstance (which requires the object to be imported)
-from contentctl.objects.lookup import FileBackedLookup, MlModel
+from contentctl.objects.lookup import FileBackedLookup, MlModel, RuntimeCSV
+from contentctl.objects.security_content_object import SecurityContentObject
 from contentctl.output.conf_writer import ConfWriter
+from contentctl.output.stanza_cache import StanzaCache
 
 
 class ConfOutput:
@@ -32,11 +35,47 @@ class ConfOutput:
         # Create the build directory if it does not exist
         config.getPackageDirectoryPath().parent.mkdir(parents=True, exist_ok=True)
 
-        # Remove the app path, if it exists
-        shutil.rmtree(config.getPackageDirectoryPath(), ignore_errors=True)
+        # When building incrementally, the app from the last build is reused, and only the
+        # template files which changed since then are copied into it again
+        self.incremental_staging = config.incremental and not config.rebuild
+        if self.incremental_staging:
+            stats = sync_directory(
+                config.getAppTemplatePath(), config.getPackageDirectoryPath()
+            )
+            print(
+                f"Staged the app template: [{stats.unchanged}] files were unchanged, "
+                f"[{stats.copied}] were copied, [{stats.linked}] were linked, and "
+                f"[{stats.removed}] were removed."
+            )
+        else:
+            # Remove the app path, if it exists
+            shutil.rmtree(config.getPackageDirectoryPath(), ignore_errors=True)
+
+            # Copy all the template files into the app
+            shutil.copytree(
+                config.getAppTemplatePath(), config.getPackageDirectoryPath()
+            )
+
+        # When building incrementally, only the stanzas of content which changed are rendered
+        self.stanza_cache = StanzaCache.load(config) if config.incremental else None
+
+    def writeConfFile(
+        self,
+        app_output_path: pathlib.Path,
+        template_name: str,
+        objects: Sequence[SecurityContentObject],
+    ) -> pathlib.Path:
+        return ConfWriter.writeConfFile(
+            app_output_path, template_name, self.config, objects, self.stanza_cache
+        )
 
-        # Copy all the template files into the app
-        shutil.copytree(config.getAppTemplatePath(), config.getPackageDirectoryPath())
+    def saveStanzaCache(self) -> None:
+        if self.stanza_cache is not None:
+            self.stanza_cache.save()
+            print(
+                f"Rendered [{self.stanza_cache.misses}] stanzas which changed since the "
+                f"last incremental build, and reused [{self.stanza_cache.hits}]."
+            )
 
     def writeHeaders(self) -> set[pathlib.Path]:
         written_files: set[pathlib.Path] = set()
@@ -104,8 +143,8 @@ class ConfOutput:
             ("default/analyticstories.conf", "analyticstories_detections.j2"),
         ]:
             written_files.add(
-                ConfWriter.writeConfFile(
-                    pathlib.Path(output_app_path), template_name, self.config, objects
+                self.writeConfFile(
+                    pathlib.Path(output_app_path), template_name, objects
                 )
             )
         return written_files
@@ -113,10 +152,9 @@ class ConfOutput:
     def writeStories(self, objects: list[Story]) -> set[pathlib.Path]:
         written_files: set[pathlib.Path] = set()
         written_files.add(
-            ConfWriter.writeConfFile(
+            self.writeConfFile(
                 pathlib.Path("default/analyticstories.conf"),
                 "analyticstories_stories.j2",
-                self.config,
                 objects,
             )
         )
@@ -125,10 +163,9 @@ class ConfOutput:
     def writeBaselines(self, objects: list[Baseline]) -> set[pathlib.Path]:
         written_files: set[pathlib.Path] = set()
         written_files.add(
-            ConfWriter.writeConfFile(
+            self.writeConfFile(
                 pathlib.Path("default/savedsearches.conf"),
                 "savedsearches_baselines.j2",
-                self.config,
                 objects,
             )
         )
@@ -140,9 +177,7 @@ class ConfOutput:
             ("default/savedsearches.conf", "savedsearches_investigations.j2"),
             ("default/analyticstories.conf", "analyticstories_investigations.j2"),
         ]:
-            ConfWriter.writeConfFile(
-                pathlib.Path(output_app_path), template_name, self.config, objects
-            )
+            self.writeConfFile(pathlib.Path(output_app_path), template_name, objects)
 
         workbench_panels: list[Investigation] = []
         for investigation in objects:
@@ -175,11 +210,8 @@ class ConfOutput:
             ("default/workflow_actions.conf", "workflow_actions.j2"),
         ]:
             written_files.add(
-                ConfWriter.writeConfFile(
-                    pathlib.Path(output_app_path),
-                    template_name,
-                    self.config,
-                    workbench_panels,
+                self.writeConfFile(
+                    pathlib.Path(output_app_path), template_name, workbench_panels
                 )
             )
         return written_files
@@ -194,10 +226,9 @@ class ConfOutput:
             # those files happens in the MLTK app by enumerating the __mlspl_*
             # files in the lookups/ directory of the app
             written_files.add(
-                ConfWriter.writeConfFile(
+                self.writeConfFile(
                     pathlib.Path(output_app_path),
                     template_name,
-                    self.config,
                     [lookup for lookup in objects if not isinstance(lookup, MlModel)],
                 )
             )
@@ -214,27 +245,33 @@ class ConfOutput:
             # All File backed lookups, including __mlspl_ files, should be copied here,
             # even though the MLModel info was intentionally not written to the
             # transforms.conf file as noted above.
-            if isinstance(lookup, FileBackedLookup):
-                with (
-                    open(lookup_folder / lookup.app_filename.name, "w") as output_file,
-                    lookup.content_file_handle as output,
-                ):
-                    output_file.write(output.read())
+            if isinstance(lookup, RuntimeCSV):
+                # The contents are written straight from memory, without another copy
+                write_text(lookup.contents, lookup_folder / lookup.app_filename.name)
+            elif isinstance(lookup, FileBackedLookup):
+                # Lookup files are placed byte for byte, without reading them into Python.
+                # When building incrementally, they are hardlinked where possible.
+                place_file(
+                    lookup.filename,
+                    lookup_folder / lookup.app_filename.name,
+                    link=self.incremental_staging,
+                )
         return written_files
 
     def writeMacros(self, objects: list[Macro]) -> set[pathlib.Path]:
         written_files: set[pathlib.Path] = set()
         written_files.add(
-            ConfWriter.writeConfFile(
-                pathlib.Path("default/macros.conf"), "macros.j2", self.config, objects
+            self.writeConfFile(
+                pathlib.Path("default/macros.conf"), "macros.j2", objects
             )
         )
         return written_files
 
     def writeDashboards(self, objects: list[Dashboard]) -> set[pathlib.Path]:
-        written_files: set[pathlib.Path] = set()
-        written_files.update(ConfWriter.writeDashboardFiles(self.config, objects))
-        return written_files
+        return {
+            ConfWriter.writeDashboardFile(self.config, dashboard)
+            for dashboard in objects
+        }
 
     def packageAppTar(self) -> None:
         with tarfile.open(
@@ -1,18 +1,37 @@
+from __future__ import annotations
+
 import configparser
 import datetime
+import functools
 import json
-import os
 import pathlib
 import re
 import xml.etree.ElementTree as ET
-from typing import Any, Sequence
+from typing import TYPE_CHECKING, Any, Sequence, Union
 
-from jinja2 import Environment, FileSystemLoader, StrictUndefined
+from jinja2 import (
+    Environment,
+    FileSystemBytecodeCache,
+    FileSystemLoader,
+    StrictUndefined,
+)
 
 from contentctl.objects.config import CustomApp, build
 from contentctl.objects.dashboard import Dashboard
 from contentctl.objects.security_content_object import SecurityContentObject
 
+if TYPE_CHECKING:
+    from contentctl.output.stanza_cache import StanzaCache
+
+# The templates which every file written by ConfWriter is rendered from
+TEMPLATES_PATH = pathlib.Path(__file__).parent / "templates"
+
+# The directory, within the cache directory of the app, where compiled templates are cached
+J2_BYTECODE_CACHE_DIRECTORY = "jinja2"
+
+# Stands in for the stanzas of the objects, when a template is rendered without them
+STANZA_MARKER = "\0contentctl-stanzas\0"
+
 # This list is not exhaustive of all default conf files, but should be
 # sufficient for our purposes.
 DEFAULT_CONF_FILES = [
@@ -152,7 +171,7 @@ class ConfWriter:
         app_output_path = pathlib.Path("default/server.conf")
         template_name = "server.conf.j2"
 
-        j2_env = ConfWriter.getJ2Environment()
+        j2_env = ConfWriter.getJ2Environment(config)
         template = j2_env.get_template(template_name)
 
         output = template.render(
@@ -171,7 +190,7 @@ class ConfWriter:
         app_output_path = pathlib.Path("default/app.conf")
         template_name = "app.conf.j2"
 
-        j2_env = ConfWriter.getJ2Environment()
+        j2_env = ConfWriter.getJ2Environment(config)
         template = j2_env.get_template(template_name)
 
         output = template.render(
@@ -192,7 +211,7 @@ class ConfWriter:
         config: build,
         objects: list[CustomApp],
     ) -> pathlib.Path:
-        j2_env = ConfWriter.getJ2Environment()
+        j2_env = ConfWriter.getJ2Environment(config)
         template = j2_env.get_template(template_name)
 
         output = template.render(
@@ -217,14 +236,7 @@ class ConfWriter:
             .isoformat()
         )
 
-        j2_env = Environment(
-            loader=FileSystemLoader(
-                os.path.join(os.path.dirname(__file__), "templates")
-            ),
-            trim_blocks=True,
-        )
-
-        template = j2_env.get_template("header.j2")
+        template = ConfWriter.getJ2Environment(config).get_template("header.j2")
         output = template.render(
             time=utc_time,
             author=" - ".join([config.app.author_name, config.app.author_company]),
@@ -240,7 +252,7 @@ class ConfWriter:
         config: build,
         objects: list[str],
     ) -> None:
-        j2_env = ConfWriter.getJ2Environment()
+        j2_env = ConfWriter.getJ2Environment(config)
         template = j2_env.get_template(template_name)
 
         output = template.render(objects=objects, app=config.app)
@@ -255,26 +267,19 @@ class ConfWriter:
         ConfWriter.validateXmlFile(output_path)
 
     @staticmethod
-    def writeDashboardFiles(
-        config: build, dashboards: list[Dashboard]
-    ) -> set[pathlib.Path]:
-        written_files: set[pathlib.Path] = set()
-        for dashboard in dashboards:
-            output_file_path = dashboard.getOutputFilepathRelativeToAppRoot(config)
-            # Check that the full output path does not exist so that we are not having an
-            # name collision with a file in app_template
-            if (config.getPackageDirectoryPath() / output_file_path).exists():
-                raise FileExistsError(
-                    f"ERROR: Overwriting Dashboard File {output_file_path}. Does this file exist in {config.getAppTemplatePath()} AND {config.path / 'dashboards'}?"
-                )
-
-            ConfWriter.writeXmlFileHeader(output_file_path, config)
-            dashboard.writeDashboardFile(ConfWriter.getJ2Environment(), config)
-            ConfWriter.validateXmlFile(
-                config.getPackageDirectoryPath() / output_file_path
+    def writeDashboardFile(config: build, dashboard: Dashboard) -> pathlib.Path:
+        output_file_path = dashboard.getOutputFilepathRelativeToAppRoot(config)
+        # Check that the full output path does not exist so that we are not having an
+        # name collision with a file in app_template
+        if (config.getPackageDirectoryPath() / output_file_path).exists():
+            raise FileExistsError(
+                f"ERROR: Overwriting Dashboard File {output_file_path}. Does this file exist in {config.getAppTemplatePath()} AND {config.path / 'dashboards'}?"
             )
-            written_files.add(output_file_path)
-        return written_files
+
+        ConfWriter.writeXmlFileHeader(output_file_path, config)
+        dashboard.writeDashboardFile(ConfWriter.getJ2Environment(config), config)
+        ConfWriter.validateXmlFile(config.getPackageDirectoryPath() / output_file_path)
+        return output_file_path
 
     @staticmethod
     def writeXmlFileHeader(app_output_path: pathlib.Path, config: build) -> None:
@@ -293,13 +298,29 @@ class ConfWriter:
         # the file is an empty XML document (besides the commented header). This means that it will FAIL validation
 
     @staticmethod
-    def getJ2Environment() -> Environment:
+    def getJ2Environment(config: build) -> Environment:
+        return ConfWriter.createJ2Environment(
+            config.cache_path / J2_BYTECODE_CACHE_DIRECTORY
+        )
+
+    @staticmethod
+    @functools.cache
+    def createJ2Environment(
+        bytecode_cache_path: pathlib.Path, templates_path: pathlib.Path = TEMPLATES_PATH
+    ) -> Environment:
+        """
+        Create the environment which every template is rendered with. It is only created
+        once per process, so that each template is only loaded and compiled the first time
+        it is used, rather than every time a file is written. Compiled templates are also
+        cached on disk, so they are only compiled again when the template changes. The
+        cache is kept outside the build directory, so that it is never packaged.
+        """
+        bytecode_cache_path.mkdir(parents=True, exist_ok=True)
         j2_env = Environment(
-            loader=FileSystemLoader(
-                os.path.join(os.path.dirname(__file__), "templates")
-            ),
+            loader=FileSystemLoader(templates_path),
             trim_blocks=True,
             undefined=StrictUndefined,
+            bytecode_cache=FileSystemBytecodeCache(str(bytecode_cache_path)),
         )
         j2_env.globals.update(
             objectListToNameList=SecurityContentObject.objectListToNameList
@@ -317,9 +338,10 @@ class ConfWriter:
         template_name: str,
         config: build,
         objects: Sequence[SecurityContentObject] | list[CustomApp],
+        stanza_cache: Union[StanzaCache, None] = None,
     ) -> pathlib.Path:
         output_path = config.getPackageDirectoryPath() / app_output_path
-        j2_env = ConfWriter.getJ2Environment()
+        j2_env = ConfWriter.getJ2Environment(config)
 
         template = j2_env.get_template(template_name)
 
@@ -346,6 +368,18 @@ class ConfWriter:
             with open(output_path, "a") as f:
                 output = "".join(outputs).encode("utf-8", "ignore").decode("utf-8")
                 f.write(output)
+        elif stanza_cache is not None:
+            output = ConfWriter.renderCachedConfFile(
+                template_name,
+                config,
+                objects,  # type: ignore
+                stanza_cache,
+            )
+
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(output_path, "a") as f:
+                output = output.encode("utf-8", "ignore").decode("utf-8")
+                f.write(output)
         else:
             output = template.render(objects=objects, app=config.app)
 
@@ -356,6 +390,66 @@ class ConfWriter:
 
         return output_path
 
+    @staticmethod
+    def splitConfTemplate(
+        template_name: str, config: build
+    ) -> Union[tuple[str, str], None]:
+        """
+        Templates which write one stanza for each object define that stanza in a block named
+        "stanza", inside the loop over the objects. Render the text which such a template
+        writes before and after all of the stanzas.
+
+        Returns:
+            Union[tuple[str, str], None]: The text before and after the stanzas, or None if
+            the template does not define a stanza block.
+        """
+        j2_env = ConfWriter.getJ2Environment(config)
+        if "stanza" not in j2_env.get_template(template_name).blocks:
+            return None
+        skeleton = j2_env.from_string(
+            f'{{% extends "{template_name}" %}}'
+            "{% block stanza %}{{ stanza_marker }}{% endblock %}"
+        )
+        header, footer = skeleton.render(
+            objects=[None], app=config.app, stanza_marker=STANZA_MARKER
+        ).split(STANZA_MARKER)
+        return header, footer
+
+    @staticmethod
+    def renderCachedConfFile(
+        template_name: str,
+        config: build,
+        objects: Sequence[SecurityContentObject],
+        stanza_cache: StanzaCache,
+    ) -> str:
+        """
+        Render a conf file template, like template.render does, except that the stanzas
+        found in stanza_cache are not rendered again. Each stanza which is rendered is
+        rendered on its own, and added to the cache.
+        """
+        template = ConfWriter.getJ2Environment(config).get_template(template_name)
+        split = ConfWriter.splitConfTemplate(template_name, config)
+        if split is None:
+            return template.render(objects=objects, app=config.app)
+
+        header, footer = split
+        stanzas: list[str] = [header]
+        for obj in objects:
+            key = stanza_cache.key(template, obj)
+            stanza = stanza_cache.get(key)
+            if stanza is None:
+                output = template.render(objects=[obj], app=config.app)
+                if not (output.startswith(header) and output.endswith(footer)):
+                    raise Exception(
+                        f"The text around the stanzas written by {template_name} must "
+                        "not depend on the objects, so that they can be cached"
+                    )
+                stanza = output[len(header) : len(output) - len(footer)]
+                stanza_cache.put(key, stanza)
+            stanzas.append(stanza)
+        stanzas.append(footer)
+        return "".join(stanzas)
+
     @staticmethod
     def validateConfFile(path: pathlib.Path):
         """Ensure that the conf file is valid.  We will do this by reading back
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import enum
+import hashlib
+import pathlib
+import threading
+from typing import Any, Union
+
+from jinja2 import Template
+from pydantic import BaseModel
+
+import contentctl
+from contentctl.helper.utils import Utils
+from contentctl.input.content_snapshot import ContentSnapshot
+from contentctl.objects.abstract_security_content_objects.security_content_object_abstract import (
+    SecurityContentObject_Abstract,
+)
+from contentctl.objects.config import build
+
+# Bump this whenever the way that stanzas are keyed or stored changes
+STANZA_CACHE_VERSION = 2
+
+
+class StanzaCache:
+    """
+    The stanza rendered by each template for each object during the last incremental build.
+    A stanza is keyed by a hash of the template, the app configuration, the fields of the
+    object, and the fields of all of the content that the object directly references (for
+    example, the stories of a detection, or the detections of a story). On the next build,
+    only the stanzas whose key changed are rendered again.
+
+    Only the stanzas used by a build are saved, so stanzas of content which was removed (or
+    has since changed) do not accumulate in the cache.
+    """
+
+    def __init__(self, config: build, stanzas: dict[str, str]):
+        self.config = config
+        self.stanzas = stanzas
+        self.used_stanzas: dict[str, str] = {}
+        self.lock = threading.Lock()
+        # The hash of the fields of each object, and the objects which it references,
+        # keyed by the id of the object (which is kept alive by the build)
+        self.object_hashes: dict[
+            int, tuple[bytes, list[SecurityContentObject_Abstract]]
+        ] = {}
+        self.template_hashes: dict[str, bytes] = {}
+        self.salt = hashlib.sha256(
+            "\n".join(
+                [
+                    contentctl.__version__,
+                    ContentSnapshot.config_fingerprint(config) or "",
+                    config.app.model_dump_json(),
+                ]
+            ).encode("utf-8")
+        ).digest()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def cache_file_path(config: build) -> pathlib.Path:
+        return config.cache_path / "stanzas.pickle"
+
+    @classmethod
+    def load(cls, config: build) -> Union[StanzaCache, None]:
+        """
+        Load the stanzas saved by the last incremental build.
+
+        Returns:
+            Union[StanzaCache, None]: The cache, or None if stanzas cannot be cached with the
+            current configuration. If --rebuild was given, the cache is empty.
+        """
+        if ContentSnapshot.config_fingerprint(config) is None:
+            return None
+        if config.rebuild:
+            return cls(config, {})
+        stanzas = Utils.load_versioned_cache(
+            cls.cache_file_path(config), STANZA_CACHE_VERSION
+        )
+        # A missing or corrupt cache just means that every stanza is rendered
+        return cls(config, stanzas if isinstance(stanzas, dict) else {})
+
+    def save(self) -> None:
+        Utils.atomic_write_cache(
+            self.cache_file_path(self.config), STANZA_CACHE_VERSION, self.used_stanzas
+        )
+
+    def key(self, template: Template, obj: SecurityContentObject_Abstract) -> str:
+        """
+        The key of the stanza rendered by template for obj.
+        """
+        digest = hashlib.sha256(self.salt)
+        digest.update(self.template_hash(template))
+        object_hash, references = self.object_hash(obj)
+        digest.update(object_hash)
+        for reference_hash in sorted(
+            self.object_hash(reference)[0] for reference in references
+        ):
+            digest.update(reference_hash)
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Union[str, None]:
+        stanza = self.stanzas.get(key)
+        with self.lock:
+            if stanza is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.used_stanzas[key] = stanza
+        return stanza
+
+    def put(self, key: str, stanza: str) -> None:
+        with self.lock:
+            self.used_stanzas[key] = stanza
+
+    def template_hash(self, template: Template) -> bytes:
+        if template.name not in self.template_hashes:
+            assert template.filename is not None
+            self.template_hashes[template.name] = hashlib.sha256(
+                pathlib.Path(template.filename).read_bytes()
+            ).digest()
+        return self.template_hashes[template.name]
+
+    def object_hash(
+        self, obj: SecurityContentObject_Abstract
+    ) -> tuple[bytes, list[SecurityContentObject_Abstract]]:
+        """
+        Hash the fields of obj. Other content which it references is only hashed by name.
+
+        Returns:
+            tuple[bytes, list[SecurityContentObject_Abstract]]: The hash, and the content
+            which obj references.
+        """
+        if id(obj) not in self.object_hashes:
+            digest = hashlib.sha256()
+            references: list[SecurityContentObject_Abstract] = []
+            _hash_value(obj, obj, digest, references)
+            self.object_hashes[id(obj)] = (digest.digest(), references)
+        return self.object_hashes[id(obj)]
+
+
+def _hash_value(
+    value: Any,
+    root: SecurityContentObject_Abstract,
+    digest: Any,
+    references: list[SecurityContentObject_Abstract],
+) -> None:
+    if isinstance(value, SecurityContentObject_Abstract) and value is not root:
+        digest.update(f"<content {type(value).__name__} {value.name!r}>".encode())
+        references.append(value)
+    elif isinstance(value, BaseModel):
+        # Fields are read with getattr so that compacted fields are decompressed
+        digest.update(f"<{type(value).__qualname__}".encode())
+        for field_name in type(value).model_fields:
+            digest.update(f" {field_name}=".encode())
+            _hash_value(getattr(value, field_name), root, digest, references)
+        digest.update(b">")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _hash_value(item, root, digest, references)
+            digest.update(b",")
+        digest.update(b"]")
+    elif isinstance(value, (set, frozenset)):
+        digest.update(b"{")
+        for item in sorted(value, key=_sort_key):
+            _hash_value(item, root, digest, references)
+            digest.update(b",")
+        digest.update(b"}")
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for item_key, item in value.items():
+            digest.update(f"{item_key!r}:".encode())
+            _hash_value(item, root, digest, references)
+            digest.update(b",")
+        digest.update(b"}")
+    elif isinstance(value, enum.Enum):
+        digest.update(f"<{type(value).__qualname__} {value.value!r}>".encode())
+    else:
+        digest.update(repr(value).encode())
+
+
+def _sort_key(value: Any) -> str:
+    # The repr of content includes all of its fields, but its name is unique
+    if isinstance(value, SecurityContentObject_Abstract):
+        return value.name
+    return repr(value)
@@ -0,0 +1,99 @@
+"""
+Benchmark the construction of MITRE ATT&CK enrichments against a local clone of the
+mitre/cti repo, comparing it to the nested loop it replaced and checking that both
+produce the same enrichments.
+
+    git clone --depth 1 https://github.com/mitre/cti.git /tmp/cti
+    python -m tests.benchmarks.attack_enrichment /tmp/cti
+"""
+
+import argparse
+import pathlib
+import time
+from typing import Any, cast
+
+from attackcti import attack_client  # type: ignore[reportMissingTypeStubs]
+
+from contentctl.enrichments.attack_enrichment import (
+    AttackEnrichment,
+    AttackPattern,
+    IntrusionSet,
+    Relationship,
+)
+
+
+def nested_loop_groups(
+    all_enterprise_techniques: list[AttackPattern],
+    enterprise_relationships: list[Relationship],
+    enterprise_groups: list[IntrusionSet],
+) -> dict[str, list[str]]:
+    # How the groups using each technique were found before they were indexed
+    technique_groups: dict[str, list[str]] = {}
+    for technique in all_enterprise_techniques:
+        apt_groups: list[dict[str, Any]] = []
+        for relationship in enterprise_relationships:
+            if relationship["target_object"] == technique["id"] and relationship[
+                "source_object"
+            ].startswith("intrusion-set"):
+                for group in enterprise_groups:
+                    if relationship["source_object"] == group["id"]:
+                        apt_groups.append(dict(group))
+        technique_groups[technique["technique_id"]] = sorted(
+            group["group"] for group in apt_groups
+        )
+    return technique_groups
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("mitre_cti_repo_path", type=pathlib.Path)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    lift = attack_client(
+        local_paths={
+            "enterprise": str(args.mitre_cti_repo_path / "enterprise-attack"),
+            "mobile": str(args.mitre_cti_repo_path / "mobile-attack"),
+            "ics": str(args.mitre_cti_repo_path / "ics-attack"),
+        }
+    )
+    techniques = cast(
+        list[AttackPattern], lift.get_enterprise_techniques(stix_format=False)
+    )
+    relationships = cast(
+        list[Relationship], lift.get_enterprise_relationships(stix_format=False)
+    )
+    groups = cast(list[IntrusionSet], lift.get_enterprise_groups(stix_format=False))
+    print(
+        f"Loaded [{len(techniques)}] techniques, [{len(relationships)}] relationships "
+        f"and [{len(groups)}] groups in [{time.perf_counter() - start:.2f}] seconds"
+    )
+
+    start = time.perf_counter()
+    expected = nested_loop_groups(techniques, relationships, groups)
+    print(f"Nested loop:       [{time.perf_counter() - start:.3f}] seconds")
+
+    best = float("inf")
+    enrichment = AttackEnrichment()
+    for _ in range(args.rounds):
+        enrichment = AttackEnrichment()
+        start = time.perf_counter()
+        enrichment.addEnterpriseTechniques(techniques, relationships, groups)
+        best = min(best, time.perf_counter() - start)
+    print(
+        f"Indexed (best of {args.rounds}): [{best:.3f}] seconds, "
+        "including validation of every enrichment"
+    )
+
+    actual = {
+        technique_id: enrichment.mitre_attack_groups
+        for technique_id, enrichment in enrichment.data.items()
+    }
+    if actual != expected:
+        raise SystemExit("The indexed enrichments do not match the nested loop")
+    print("The indexed enrichments match the nested loop")
+
+
+if __name__ == "__main__":
+    main()
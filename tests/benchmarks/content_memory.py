@@ -0,0 +1,109 @@
+"""
+Measure the memory saved by sharing a single enrichment of each MITRE ATT&CK technique
+between all of the content which references it, and by interning the strings of the
+fields which are repeated across content (see INTERNED_FIELDS). The content of an app is
+validated under tracemalloc, and then the memory that one copy of each shared enrichment
+and of each interned string per reference would have taken is measured.
+
+    cd path/to/app
+    python -m tests.benchmarks.content_memory . --enrichments
+"""
+
+import argparse
+import contextlib
+import pathlib
+import tracemalloc
+from typing import Iterator
+
+from pydantic import BaseModel
+
+import contentctl.contentctl  # noqa: F401 - defines the content models fully
+from contentctl.actions.validate import Validate
+from contentctl.input.director import DirectorOutputDto
+from contentctl.input.yml_reader import INTERNED_FIELDS, YmlReader
+from contentctl.objects.config import validate
+
+
+@contextlib.contextmanager
+def traced_size() -> Iterator[list[int]]:
+    # The number of bytes still allocated by the block, once it has finished
+    size = [0]
+    before = tracemalloc.get_traced_memory()[0]
+    yield size
+    size[0] = tracemalloc.get_traced_memory()[0] - before
+
+
+def interned_strings(content: BaseModel) -> Iterator[str]:
+    fields = dict(content)
+    tags = fields.get("tags")
+    if isinstance(tags, BaseModel):
+        fields |= {f"tags.{key}": value for key, value in tags}
+    for key, value in fields.items():
+        if key.removeprefix("tags.") not in INTERNED_FIELDS:
+            continue
+        for item in value if isinstance(value, list) else [value]:
+            # Enums are already singletons
+            if type(item) is str:
+                yield item
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=pathlib.Path)
+    parser.add_argument("--enrichments", action="store_true")
+    args = parser.parse_args()
+
+    config = validate.model_validate(
+        YmlReader.load_file(args.path / "contentctl.yml", add_fields=False)
+        | {"path": args.path, "enrichments": args.enrichments}
+    )
+
+    tracemalloc.start()
+    with traced_size() as content_size:
+        output_dto: DirectorOutputDto = Validate().execute(config)
+    print(f"Content retained:       [{content_size[0] / 2**20:8.2f}] MiB")
+
+    references = [
+        enrichment
+        for detection in output_dto.detections
+        for enrichment in detection.tags.mitre_attack_enrichments
+    ]
+    shared = {id(enrichment) for enrichment in references}
+    with traced_size() as enrichments_saved:
+        # What every reference beyond the first would cost, if it had its own copy
+        seen: set[int] = set()
+        enrichment_copies = []
+        for enrichment in references:
+            if id(enrichment) in seen:
+                enrichment_copies.append(enrichment.model_copy(deep=True))
+            seen.add(id(enrichment))
+    print(
+        f"Enrichments shared:     [{enrichments_saved[0] / 2**20:8.2f}] MiB saved, "
+        f"[{len(shared)}] enrichments are shared by [{len(references)}] references"
+    )
+    del enrichment_copies
+
+    strings = [
+        string
+        for content in output_dto.name_to_content_map.values()
+        for string in interned_strings(content)
+    ]
+    unique_strings = {id(string) for string in strings}
+    with traced_size() as strings_saved:
+        # Slicing a concatenation creates an equal string which is not interned
+        seen = set()
+        string_copies = []
+        for string in strings:
+            if id(string) in seen:
+                string_copies.append((string + " ")[:-1])
+            seen.add(id(string))
+    print(
+        f"Strings interned:       [{strings_saved[0] / 2**20:8.2f}] MiB saved, "
+        f"[{len(unique_strings)}] strings are shared by [{len(strings)}] references"
+    )
+    del string_copies
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Measure the time and Python memory taken to place large lookup files in an app, the way
+ConfOutput.writeLookups used to (reading each file into a string and writing it back in text
+mode), and with the helpers it uses now: copying the file without reading it into Python
+(a reflink, where the filesystem supports it), and hardlinking it (as incremental builds do).
+RuntimeCSVs, whose contents are held in memory, are written both ways too.
+
+    python -m tests.benchmarks.lookup_transfer --size-mb 300 --count 2
+"""
+
+import argparse
+import contextlib
+import io
+import pathlib
+import shutil
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Iterator
+
+from contentctl.helper.file_sync import place_file, write_text
+
+ROW = "2026-01-01T00:00:00,example.com,10.0.0.1,a lookup value which is not too short\n"
+
+
+@contextlib.contextmanager
+def measured(label: str) -> Iterator[None]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{label:<32} [{elapsed:7.2f}] s, peak [{peak / 2**20:9.2f}] MiB")
+
+
+def write_lookup(path: pathlib.Path, size_mb: int) -> None:
+    block = ROW * (2**20 // len(ROW))
+    with open(path, "w") as lookup_file:
+        lookup_file.write("time,domain,ip,value\n")
+        for _ in range(size_mb):
+            lookup_file.write(block)
+
+
+def read_and_write(source: pathlib.Path, destination: pathlib.Path) -> None:
+    with open(destination, "w") as output_file, open(source, "r") as output:
+        output_file.write(output.read())
+
+
+def place_each(
+    label: str,
+    sources: list[pathlib.Path],
+    destination: pathlib.Path,
+    place: Callable[[pathlib.Path, pathlib.Path], object],
+) -> None:
+    shutil.rmtree(destination, ignore_errors=True)
+    destination.mkdir()
+    with measured(label):
+        for source in sources:
+            place(source, destination / source.name)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=int, default=300)
+    parser.add_argument("--count", type=int, default=2)
+    parser.add_argument(
+        "--directory",
+        type=pathlib.Path,
+        default=None,
+        help="Where to write the lookups. Use a directory on the filesystem that apps "
+        "are built on, since reflinks and hardlinks depend on it.",
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir=args.directory) as directory:
+        root = pathlib.Path(directory)
+        (root / "lookups").mkdir()
+        sources = [root / "lookups" / f"lookup_{i}.csv" for i in range(args.count)]
+        for source in sources:
+            write_lookup(source, args.size_mb)
+        print(f"[{args.count}] lookups of [{args.size_mb}] MiB")
+
+        app_lookups = root / "app_lookups"
+        place_each("Read and write as text", sources, app_lookups, read_and_write)
+        place_each("Copy", sources, app_lookups, place_file)
+        place_each(
+            "Hardlink",
+            sources,
+            app_lookups,
+            lambda source, destination: place_file(source, destination, link=True),
+        )
+
+        contents = sources[0].read_text()
+        with measured("RuntimeCSV, read and write"):
+            with (
+                open(app_lookups / "runtime.csv", "w") as output_file,
+                io.StringIO(contents) as output,
+            ):
+                output_file.write(output.read())
+        with measured("RuntimeCSV, written in chunks"):
+            write_text(contents, app_lookups / "runtime.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import os
+import pathlib
+import re
+import subprocess
+import sys
+
+import pytest
+
+import contentctl
+
+REPO_ROOT = pathlib.Path(contentctl.__file__).parent.parent
+DETECTIONS = pathlib.Path("detections/endpoint")
+
+
+@pytest.fixture(autouse=True)
+def user_cache_directory(tmp_path_factory, monkeypatch):
+    # Keep the caches (and the key which signs them) written by tests out of the home directory
+    cache_home = tmp_path_factory.mktemp("cache_home")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache_home))
+    return cache_home / "contentctl"
+
+
+BASELINE = """name: Baseline One
+id: 00000000-0000-0000-0000-0000000000b1
+version: 1
+date: '2024-01-01'
+author: a
+type: Baseline
+status: production
+description: a baseline
+search: '| tstats count from datamodel=Endpoint.Processes by Processes.dest'
+how_to_implement: nothing
+known_false_positives: none
+tags:
+  analytic_story:
+  - Cobalt Strike
+  detections:
+  - Anomalous usage of 7zip 1
+  - Anomalous usage of 7zip 2
+  product:
+  - Splunk Enterprise
+  security_domain: endpoint
+"""
+
+LOOKUP = """name: lk_0
+date: '2024-01-01'
+version: 1
+id: 00000000-0000-0000-0000-0000000000c1
+author: a
+description: lookup 0
+lookup_type: csv
+case_sensitive_match: false
+"""
+
+
+@pytest.fixture(scope="session")
+def example_app(tmp_path_factory) -> pathlib.Path:
+    """
+    An app created by contentctl init, with more detections (one of which uses a lookup, and
+    one of which has its own filter macro), a second story, and a baseline.
+    """
+    app_path = tmp_path_factory.mktemp("example_app") / "app"
+    app_path.mkdir()
+    subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "contentctl.contentctl",
+            "init",
+            "--path",
+            str(app_path),
+        ],
+        cwd=app_path,
+        env=os.environ | {"PYTHONPATH": str(REPO_ROOT)},
+        capture_output=True,
+        check=True,
+    )
+
+    detection = (app_path / DETECTIONS / "anomalous_usage_of_7zip.yml").read_text()
+    for i in range(4):
+        text = (
+            detection.replace(
+                "name: Anomalous usage of 7zip\n",
+                f"name: Anomalous usage of 7zip {i}\n",
+            )
+            .replace(
+                "9364ee8e-a39a-11eb-8f1d-acde48001122",
+                f"{i:08}-0000-0000-0000-000000000000",
+            )
+            .replace(
+                "anomalous_usage_of_7zip_filter", f"anomalous_usage_of_7zip_{i}_filter"
+            )
+        )
+        if i == 0:
+            text = text.replace(
+                "`drop_dm_object_name(Processes)`",
+                "`drop_dm_object_name(Processes)` | lookup lk_0 a OUTPUT b",
+            )
+        elif i == 1:
+            text = text.replace(
+                "  - Cobalt Strike\n", "  - Story B\n  - Cobalt Strike\n"
+            )
+        (app_path / DETECTIONS / f"anomalous_usage_of_7zip_{i}.yml").write_text(text)
+
+    (app_path / "macros" / "anomalous_usage_of_7zip_0_filter.yml").write_text(
+        "definition: search *\ndescription: filter 0\nname: anomalous_usage_of_7zip_0_filter\n"
+    )
+    story = (app_path / "stories" / "cobalt_strike.yml").read_text()
+    (app_path / "stories" / "story_b.yml").write_text(
+        re.sub(
+            r"\nid: .*\n",
+            "\nid: 00000000-0000-0000-0000-0000000000a1\n",
+            story.replace("name: Cobalt Strike\n", "name: Story B\n"),
+        )
+    )
+    (app_path / "baselines" / "baseline_one.yml").write_text(BASELINE)
+    (app_path / "lookups" / "lk_0.yml").write_text(LOOKUP)
+    (app_path / "lookups" / "lk_0.csv").write_text("a,b\n0,x\n1,y\n")
+    return app_path
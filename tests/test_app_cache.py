@@ -0,0 +1,151 @@
+import hashlib
+import http.server
+import os
+import threading
+from typing import Union
+
+import pytest
+
+from contentctl.helper.app_cache import AppCache
+
+PACKAGE = bytes(range(256)) * 64
+
+
+class PackageHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves packages by path, and supports range requests like Splunkbase and most CDNs do.
+    """
+
+    protocol_version = "HTTP/1.1"
+    packages: dict[str, bytes] = {}
+    requests_seen: list[tuple[str, Union[str, None]]] = []
+
+    def respond(
+        self,
+        status: int,
+        body: bytes = b"",
+        headers: Union[dict[str, str], None] = None,
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        range_header = self.headers.get("Range")
+        self.requests_seen.append((self.path, range_header))
+        package = self.packages.get(self.path)
+        if package is None:
+            self.respond(404)
+        elif range_header is None:
+            self.respond(200, package)
+        else:
+            start = int(range_header.removeprefix("bytes=").removesuffix("-"))
+            end = len(package) - 1
+            if start > end:
+                self.respond(416, headers={"Content-Range": f"bytes */{len(package)}"})
+            else:
+                content_range = f"bytes {start}-{end}/{len(package)}"
+                self.respond(206, package[start:], {"Content-Range": content_range})
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    PackageHandler.packages = {"/app.tgz": PACKAGE}
+    PackageHandler.requests_seen = []
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), PackageHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def partial_path(app_cache: AppCache, key: str):
+    return (
+        app_cache.root
+        / "partial"
+        / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()}.part"
+    )
+
+
+def test_download(stub_server, tmp_path):
+    url = f"{stub_server}/app.tgz"
+    key = AppCache.url_key(url)
+
+    # Resume an interrupted download
+    app_cache = AppCache(tmp_path, max_size_bytes=2**20)
+    partial = partial_path(app_cache, key)
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(PACKAGE[:1000])
+    path = app_cache.download(key, url)
+    assert PackageHandler.requests_seen == [("/app.tgz", "bytes=1000-")]
+    assert path.read_bytes() == PACKAGE
+    assert path == app_cache.object_path(hashlib.sha256(PACKAGE).hexdigest())
+    assert app_cache.name(key) == "app.tgz"
+    assert not partial.exists()
+
+    # A second run makes no requests
+    PackageHandler.requests_seen = []
+    app_cache = AppCache(tmp_path, max_size_bytes=2**20)
+    assert app_cache.download(key, url) == path
+    assert PackageHandler.requests_seen == []
+
+    # A corrupted package is evicted and downloaded again
+    path.write_bytes(b"corrupt")
+    app_cache = AppCache(tmp_path, max_size_bytes=2**20)
+    assert app_cache.download(key, url).read_bytes() == PACKAGE
+    assert PackageHandler.requests_seen == [("/app.tgz", None)]
+
+    # A partial download which is longer than the package is started again
+    PackageHandler.requests_seen = []
+    app_cache = AppCache(tmp_path / "other", max_size_bytes=2**20)
+    partial = partial_path(app_cache, key)
+    partial.parent.mkdir(parents=True)
+    partial.write_bytes(PACKAGE + b"extra")
+    assert app_cache.download(key, url).read_bytes() == PACKAGE
+    assert PackageHandler.requests_seen == [
+        ("/app.tgz", f"bytes={len(PACKAGE) + 5}-"),
+        ("/app.tgz", None),
+    ]
+
+
+def test_least_recently_used_packages_are_evicted(tmp_path):
+    packages = []
+    for i in range(3):
+        packages.append(tmp_path / f"app_{i}.tgz")
+        packages[i].write_bytes(bytes([i]) * 1000)
+
+    app_cache = AppCache(tmp_path / "cache", max_size_bytes=2500)
+    first = app_cache.add_file("first", packages[0])
+    app_cache.add_file("second", packages[1])
+    assert app_cache.get("first") == first
+    app_cache.add_file("third", packages[2])
+
+    app_cache = AppCache(tmp_path / "cache", max_size_bytes=2500)
+    assert app_cache.get("second") is None
+    assert app_cache.get("first") == first
+    assert app_cache.get("third") is not None
+    assert len(list((tmp_path / "cache" / "objects").glob("*/*"))) == 2
+
+
+def test_stage(tmp_path):
+    package = tmp_path / "app.tgz"
+    package.write_bytes(PACKAGE)
+    app_cache = AppCache(tmp_path / "cache", max_size_bytes=2**20)
+    path = app_cache.add_file("app", package)
+
+    apps = tmp_path / "apps"
+    apps.mkdir()
+    (apps / "app.tgz").write_bytes(b"an older package")
+    AppCache.stage(path, apps / "app.tgz")
+    assert os.path.samefile(path, apps / "app.tgz")
+    # Staging the same package again leaves it alone
+    AppCache.stage(path, apps / "app.tgz")
+    assert os.path.samefile(path, apps / "app.tgz")
+    assert path.read_bytes() == PACKAGE
@@ -0,0 +1,203 @@
+import pathlib
+import threading
+import uuid
+
+import pygit2
+import pytest
+
+from contentctl.objects.atomic import AtomicEnrichment, AtomicTest
+
+GUIDS = [uuid.UUID(f"00000000-0000-4000-8000-{i:012}") for i in range(6)]
+
+
+def commit_all(repo: pygit2.Repository) -> None:
+    repo.index.add_all()
+    repo.index.write()
+    signature = pygit2.Signature("contentctl", "contentctl@example.com")
+    parents = [] if repo.head_is_unborn else [repo.head.target]
+    repo.create_commit(
+        "HEAD", signature, signature, "commit", repo.index.write_tree(), parents
+    )
+
+
+def atomic_test(guid: uuid.UUID, quote: str = "") -> str:
+    return f"""- name: Test {guid}
+  auto_generated_guid: {quote}{guid}{quote}
+  description: |
+    Mentions another test, which does not define it
+    auto_generated_guid is {GUIDS[-1]}
+  supported_platforms:
+  - windows
+  executor:
+    name: powershell
+    command: Write-Host {guid}
+"""
+
+
+def atomic_file(technique: str, *tests: str) -> str:
+    return (
+        f"attack_technique: {technique}\n"
+        f"display_name: Technique {technique}\n"
+        "atomic_tests:\n" + "".join(tests)
+    )
+
+
+@pytest.fixture
+def repo_path(tmp_path) -> pathlib.Path:
+    """
+    A copy of the Atomic Red Team repo with three files of atomic tests, the last of
+    which cannot be validated
+    """
+    repo_path = tmp_path / "atomic-red-team"
+    files = {
+        "T1001": atomic_file(
+            "T1001", atomic_test(GUIDS[0]), atomic_test(GUIDS[1], quote="'")
+        ),
+        "T1002": atomic_file("T1002", atomic_test(GUIDS[2], quote='"')),
+        "T1003": atomic_file("T1003", atomic_test(GUIDS[3])).replace(
+            "supported_platforms", "unsupported_field"
+        ),
+    }
+    for technique, text in files.items():
+        (repo_path / "atomics" / technique).mkdir(parents=True)
+        (repo_path / "atomics" / technique / f"{technique}.yaml").write_text(text)
+    # Only T*.yaml files define tests
+    (repo_path / "atomics" / "Indexes").mkdir()
+    (repo_path / "atomics" / "Indexes" / "index.yaml").write_text(
+        atomic_file("T1004", atomic_test(GUIDS[4]))
+    )
+    return repo_path
+
+
+def test_index_matches_parsed_repo(repo_path, capsys):
+    index = AtomicTest.indexArtRepo(repo_path)
+    assert {guid: path.name for guid, path in index.items()} == {
+        GUIDS[0]: "T1001.yaml",
+        GUIDS[1]: "T1001.yaml",
+        GUIDS[2]: "T1002.yaml",
+        GUIDS[3]: "T1003.yaml",
+    }
+
+    # Every test which can be parsed is indexed, and found in the file which defines it
+    parsed = AtomicTest.parseArtRepo(repo_path, max_workers=1)
+    assert parsed.keys() == {GUIDS[0], GUIDS[1], GUIDS[2]}
+    for guid in parsed:
+        assert any(
+            test.auto_generated_guid == guid
+            for test in AtomicTest.constructAtomicFile(index[guid]).atomic_tests
+        )
+    assert "T1003.yaml" in capsys.readouterr().out
+
+
+def test_redefined_guids(repo_path):
+    (repo_path / "atomics" / "T1002" / "T1002.yaml").write_text(
+        atomic_file("T1002", atomic_test(GUIDS[2]), atomic_test(GUIDS[0]))
+    )
+    for parse in (
+        AtomicTest.indexArtRepo,
+        lambda repo_path: AtomicTest.parseArtRepo(repo_path, max_workers=1),
+    ):
+        with pytest.raises(Exception, match="defined more than once") as error:
+            parse(repo_path)
+        assert str(GUIDS[0]) in str(error.value)
+        assert str(GUIDS[2]) not in str(error.value)
+
+
+def test_index_is_cached_for_each_commit(repo_path, tmp_path, capsys):
+    cache_path = tmp_path / "cache"
+
+    # A repo which is not a git repo is indexed every time
+    index = AtomicTest.indexArtRepo(repo_path, cache_path)
+    assert not (cache_path / "atomic_index.pickle").exists()
+
+    repo = pygit2.init_repository(str(repo_path))
+    commit_all(repo)
+    capsys.readouterr()
+    assert AtomicTest.indexArtRepo(repo_path, cache_path) == index
+    assert "Indexed [4] Atomic Red Team Tests" in capsys.readouterr().out
+    assert AtomicTest.indexArtRepo(repo_path, cache_path) == index
+    assert "Loaded the index of [4]" in capsys.readouterr().out
+
+    # Files are not read at all while the same commit is checked out
+    (repo_path / "atomics" / "T1002" / "T1002.yaml").write_text(
+        atomic_file("T1002", atomic_test(GUIDS[5]))
+    )
+    assert AtomicTest.indexArtRepo(repo_path, cache_path) == index
+
+    commit_all(repo)
+    new_index = AtomicTest.indexArtRepo(repo_path, cache_path)
+    assert "Indexed [4] Atomic Red Team Tests" in capsys.readouterr().out
+    assert new_index.keys() == {GUIDS[0], GUIDS[1], GUIDS[3], GUIDS[5]}
+
+
+@pytest.fixture
+def parsed_files(monkeypatch) -> list[list[str]]:
+    """The names of the files parsed by each call to AtomicTest.parseAtomicFiles"""
+    parsed_files: list[list[str]] = []
+    parse_atomic_files = AtomicTest.parseAtomicFiles
+
+    def parse(file_paths, max_workers=None, cache_path=None):
+        parsed_files.append([path.name for path in file_paths])
+        return parse_atomic_files(file_paths, max_workers, cache_path)
+
+    monkeypatch.setattr(AtomicTest, "parseAtomicFiles", parse)
+    return parsed_files
+
+
+def test_files_are_parsed_once_when_first_used(repo_path, parsed_files, capsys):
+    enrichment = AtomicEnrichment(
+        use_enrichment=True, guid_to_file=AtomicTest.indexArtRepo(repo_path)
+    )
+    assert enrichment.data == {}
+
+    assert enrichment.getAtomic(GUIDS[2]).auto_generated_guid == GUIDS[2]
+    assert parsed_files == [["T1002.yaml"]]
+    assert enrichment.data.keys() == {GUIDS[2]}
+
+    # Every test in a file is loaded together
+    enrichment.loadAtomics({GUIDS[0], GUIDS[1], GUIDS[2], GUIDS[5]})
+    assert parsed_files == [["T1002.yaml"], ["T1001.yaml"]]
+    assert enrichment.data.keys() == {GUIDS[0], GUIDS[1], GUIDS[2]}
+    enrichment.getAtomic(GUIDS[1])
+    assert len(parsed_files) == 2
+
+    # Neither a file which cannot be validated, nor a test which is not defined,
+    # is looked for again
+    for guid in (GUIDS[3], GUIDS[5]):
+        for _ in range(2):
+            with pytest.raises(Exception, match="not found"):
+                enrichment.getAtomic(guid)
+    assert parsed_files == [["T1002.yaml"], ["T1001.yaml"], ["T1003.yaml"]]
+
+
+def test_files_are_parsed_once_by_concurrent_threads(repo_path, parsed_files):
+    enrichment = AtomicEnrichment(
+        use_enrichment=True, guid_to_file=AtomicTest.indexArtRepo(repo_path)
+    )
+    barrier = threading.Barrier(8)
+
+    def get_atomics(guids: list[uuid.UUID]) -> None:
+        barrier.wait()
+        for guid in guids:
+            enrichment.getAtomic(guid)
+
+    threads = [
+        threading.Thread(target=get_atomics, args=([GUIDS[i % 3], GUIDS[2 - i % 3]],))
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert sorted(name for names in parsed_files for name in names) == [
+        "T1001.yaml",
+        "T1002.yaml",
+    ]
+    assert enrichment.data.keys() == {GUIDS[0], GUIDS[1], GUIDS[2]}
+
+
+def test_without_enrichment_nothing_is_parsed(parsed_files):
+    enrichment = AtomicEnrichment(use_enrichment=False)
+    assert enrichment.getAtomic(GUIDS[0]).name == "Missing Atomic"
+    assert parsed_files == []
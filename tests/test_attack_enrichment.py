@@ -0,0 +1,37 @@
+import pygit2
+
+from contentctl.enrichments.attack_enrichment import (
+    MITRE_CTI_DOMAINS,
+    AttackEnrichment,
+)
+
+
+def commit_all(repo: pygit2.Repository) -> None:
+    repo.index.add_all()
+    repo.index.write()
+    signature = pygit2.Signature("contentctl", "contentctl@example.com")
+    repo.create_commit(
+        "HEAD", signature, signature, "commit", repo.index.write_tree(), []
+    )
+
+
+def test_fingerprint_repo(tmp_path):
+    content_repo = pygit2.init_repository(str(tmp_path))
+    (tmp_path / "README.md").write_text("content\n")
+    commit_all(content_repo)
+
+    # A copy of mitre/cti which is not a git repo, inside of the content repo
+    cti_path = tmp_path / "external_repos" / "cti"
+    for domain in MITRE_CTI_DOMAINS:
+        (cti_path / domain).mkdir(parents=True)
+    (cti_path / "enterprise-attack" / "attack-pattern.json").write_text("{}")
+    fingerprint = AttackEnrichment.fingerprint_repo(cti_path)
+    assert fingerprint is not None and fingerprint.startswith("files:")
+    (cti_path / "enterprise-attack" / "attack-pattern.json").write_text('{"a": 1}')
+    assert AttackEnrichment.fingerprint_repo(cti_path) != fingerprint
+
+    # A clone of mitre/cti is identified by its commit
+    commit_all(pygit2.init_repository(str(cti_path)))
+    assert AttackEnrichment.fingerprint_repo(cti_path) == (
+        f"commit:{pygit2.Repository(str(cti_path)).head.target}"
+    )
@@ -0,0 +1,69 @@
+import pickle
+
+from contentctl.helper import utils
+from contentctl.helper.utils import CACHE_FILE_MAGIC, Utils
+from contentctl.objects.config import validate
+
+
+def test_cache_round_trip(tmp_path):
+    cache_path = tmp_path / "cache" / "entries.pickle"
+    Utils.atomic_write_cache(cache_path, 1, {"entries": [1, 2, 3]})
+    assert Utils.load_versioned_cache(cache_path, 1) == {"entries": [1, 2, 3]}
+    assert Utils.load_versioned_cache(cache_path, 2) is None
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+
+
+def test_unsigned_cache_is_not_loaded(tmp_path):
+    cache_path = tmp_path / "entries.pickle"
+
+    class Planted:
+        def __reduce__(self):
+            return (exec, ("raise SystemExit('planted pickle was loaded')",))
+
+    # A bare pickle, and a pickle dressed up as a cache file with the wrong signature
+    cache_path.write_bytes(pickle.dumps((1, Planted())))
+    assert Utils.load_versioned_cache(cache_path, 1) is None
+    cache_path.write_bytes(CACHE_FILE_MAGIC + bytes(32) + pickle.dumps((1, Planted())))
+    assert Utils.load_versioned_cache(cache_path, 1) is None
+
+    # Changing any byte of a signed file invalidates it
+    Utils.atomic_write_cache(cache_path, 1, "payload")
+    data = bytearray(cache_path.read_bytes())
+    data[-2] ^= 1
+    cache_path.write_bytes(bytes(data))
+    assert Utils.load_versioned_cache(cache_path, 1) is None
+
+
+def test_failed_cache_write_is_ignored(tmp_path, monkeypatch):
+    cache_path = tmp_path / "cache" / "entries.pickle"
+    Utils.atomic_write_cache(cache_path, 1, "payload")
+
+    # A payload which cannot be pickled
+    Utils.atomic_write_cache(cache_path, 1, lambda: None)
+    assert Utils.load_versioned_cache(cache_path, 1) == "payload"
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+
+    # A failure after the temporary file was written
+    def fail_to_replace(src, dst):
+        raise PermissionError(dst)
+
+    monkeypatch.setattr(utils.os, "replace", fail_to_replace)
+    Utils.atomic_write_cache(cache_path, 1, "a new payload")
+    assert Utils.load_versioned_cache(cache_path, 1) == "payload"
+    assert list(cache_path.parent.iterdir()) == [cache_path]
+
+
+def test_cache_is_outside_the_app(tmp_path, user_cache_directory):
+    config = validate(path=tmp_path)
+    assert config.cache_path.parent == user_cache_directory
+    assert not config.cache_path.is_relative_to(tmp_path)
+    # Apps with the same name at different paths do not share a cache
+    (tmp_path / "a" / "app").mkdir(parents=True)
+    (tmp_path / "b" / "app").mkdir(parents=True)
+    assert (
+        validate(path=tmp_path / "a" / "app").cache_path
+        != validate(path=tmp_path / "b" / "app").cache_path
+    )
+
+    config = validate(path=tmp_path, cache_directory=tmp_path / "cache")
+    assert config.cache_path == tmp_path / "cache"
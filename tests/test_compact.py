@@ -0,0 +1,160 @@
+import pathlib
+import pickle
+import shutil
+import tracemalloc
+
+import pytest
+
+from contentctl.helper.memory_report import MemoryReport, deep_size
+from contentctl.input.director import DirectorOutputDto
+from contentctl.objects.abstract_security_content_objects.security_content_object_abstract import (
+    COMPACT_TEXT_FIELDS,
+    COMPACT_TEXT_PREFIX,
+    MIN_COMPACT_TEXT_LENGTH,
+)
+from contentctl.objects.config import build
+from contentctl.output.conf_output import ConfOutput
+from tests.test_incremental_validation import run_validate
+
+
+@pytest.fixture
+def app_path(example_app, tmp_path) -> pathlib.Path:
+    return shutil.copytree(example_app, tmp_path / "app")
+
+
+def validated(
+    app_path: pathlib.Path, capsys: pytest.CaptureFixture[str]
+) -> DirectorOutputDto:
+    director_output_dto, _ = run_validate(app_path, capsys)
+    assert director_output_dto is not None
+    return director_output_dto
+
+
+def compacted_fields(director_output_dto: DirectorOutputDto) -> set[tuple[str, str]]:
+    return {
+        (obj.name, field_name)
+        for obj in director_output_dto.name_to_content_map.values()
+        for field_name in COMPACT_TEXT_FIELDS
+        if f"{COMPACT_TEXT_PREFIX}{field_name}" in obj.__dict__
+    }
+
+
+def test_compacted_fields_read_the_same(app_path, capsys):
+    director_output_dto = validated(app_path, capsys)
+    contents = list(director_output_dto.name_to_content_map.values())
+    dumps = [obj.model_dump() for obj in contents]
+    values = [
+        {
+            field_name: getattr(obj, field_name)
+            for field_name in COMPACT_TEXT_FIELDS
+            if field_name in type(obj).model_fields
+        }
+        for obj in contents
+    ]
+
+    director_output_dto.compact()
+    compacted = compacted_fields(director_output_dto)
+    # Only long values are compressed, and they are not also kept uncompressed
+    assert ("Anomalous usage of 7zip 0", "description") in compacted
+    for name, field_name in compacted:
+        obj = director_output_dto.name_to_content_map[name]
+        assert field_name not in obj.__dict__
+    for obj, obj_values in zip(contents, values):
+        for field_name, value in obj_values.items():
+            if (obj.name, field_name) not in compacted:
+                assert (
+                    not isinstance(value, str) or len(value) < MIN_COMPACT_TEXT_LENGTH
+                )
+
+    # Serializing reads every compressed field, and then they are stored as they were
+    assert [obj.model_dump() for obj in contents] == dumps
+    assert compacted_fields(director_output_dto) == set()
+    for obj, obj_values in zip(contents, values):
+        assert {
+            field_name: obj.__dict__[field_name] for field_name in obj_values
+        } == obj_values
+
+    # As does reading a field, including to recompute a value derived from it
+    detection = director_output_dto.name_to_content_map["Anomalous usage of 7zip 0"]
+    status_aware_description = detection.status_aware_description
+    director_output_dto.compact()
+    assert "status_aware_description" not in detection.__dict__
+    assert detection.status_aware_description == status_aware_description
+    director_output_dto.compact()
+    assert detection.description == values[contents.index(detection)]["description"]
+    assert "description" in detection.__dict__
+    assert f"{COMPACT_TEXT_PREFIX}description" not in detection.__dict__
+    with pytest.raises(AttributeError):
+        detection.not_a_field
+
+
+def test_compacted_content_can_be_pickled(app_path, capsys):
+    director_output_dto = validated(app_path, capsys)
+    dumps = [
+        obj.model_dump() for obj in director_output_dto.name_to_content_map.values()
+    ]
+    director_output_dto.compact()
+    restored = pickle.loads(pickle.dumps(director_output_dto.name_to_content_map))
+    assert [obj.model_dump() for obj in restored.values()] == dumps
+
+
+def written_conf_files(
+    director_output_dto: DirectorOutputDto, config: build
+) -> dict[str, str]:
+    conf_output = ConfOutput(config)
+    written_files = (
+        conf_output.writeDetections(director_output_dto.detections)
+        | conf_output.writeStories(director_output_dto.stories)
+        | conf_output.writeBaselines(director_output_dto.baselines)
+        | conf_output.writeMacros(director_output_dto.macros)
+    )
+    return {
+        str(path.relative_to(config.getPackageDirectoryPath())): path.read_text()
+        for path in written_files
+    }
+
+
+def test_templates_render_compacted_content_the_same(app_path, capsys):
+    # Render derived values, such as status_aware_description, before compacting
+    director_output_dto = validated(app_path, capsys)
+    expected = written_conf_files(director_output_dto, build(path=app_path))
+
+    director_output_dto = validated(app_path, capsys)
+    director_output_dto.compact()
+    assert compacted_fields(director_output_dto)
+    assert written_conf_files(director_output_dto, build(path=app_path)) == expected
+
+
+def content_size(director_output_dto: DirectorOutputDto) -> int:
+    seen: set[int] = set()
+    return sum(
+        deep_size(obj.__dict__, seen, obj)
+        for obj in director_output_dto.name_to_content_map.values()
+    )
+
+
+def test_memory_report(app_path, capsys):
+    tracing = tracemalloc.is_tracing()
+    try:
+        memory_report = MemoryReport()
+        director_output_dto = validated(app_path, capsys)
+        memory_report.print_report(director_output_dto, "validated content")
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    report = capsys.readouterr().out.splitlines()
+    assert report[0] == "----- Memory report: validated content -----"
+    assert report[1].startswith("Traced memory: [")
+    types = report[report.index("Retained by each content type:") + 1 :]
+    assert any(
+        line.split()[0] == "Detection" and line.endswith(" MiB in [5] objects")
+        for line in types
+    )
+    fields = report[report.index("Largest 15 fields:") + 1 :]
+    assert any(line.split()[0] == "Detection.description" for line in fields)
+
+    # Compacting shrinks the content which is reported
+    size = content_size(director_output_dto)
+    director_output_dto.compact()
+    assert content_size(director_output_dto) < size
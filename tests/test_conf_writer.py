@@ -0,0 +1,115 @@
+import os
+import pathlib
+import shutil
+import tarfile
+
+import pytest
+
+from contentctl.contentctl import build_func
+from contentctl.input.yml_reader import YmlReader
+from contentctl.objects.config import build
+from contentctl.objects.macro import Macro
+from contentctl.output.conf_writer import (
+    J2_BYTECODE_CACHE_DIRECTORY,
+    TEMPLATES_PATH,
+    ConfWriter,
+)
+
+MACROS = [
+    Macro(name=f"macro_{i}", definition=f"index={i}", description="A macro")
+    for i in range(3)
+]
+
+
+def render_macros(environment) -> tuple[str, int]:
+    """The rendered macros.j2, and the number of templates compiled to render it"""
+    compiled: list[str] = []
+    compile = environment.compile
+
+    def counting_compile(source, name=None, *args, **kwargs):
+        compiled.append(name)
+        return compile(source, name, *args, **kwargs)
+
+    environment.compile = counting_compile
+    try:
+        text = environment.get_template("macros.j2").render(objects=MACROS)
+    finally:
+        del environment.compile
+    return text, len(compiled)
+
+
+def test_template_edits_are_picked_up(tmp_path):
+    templates_path = shutil.copytree(TEMPLATES_PATH, tmp_path / "templates")
+    bytecode_cache_path = tmp_path / "cache"
+    # Creates an environment like a new process would, sharing the cache on disk
+    new_environment = ConfWriter.createJ2Environment.__wrapped__
+
+    environment = ConfWriter.createJ2Environment(bytecode_cache_path, templates_path)
+    assert (
+        ConfWriter.createJ2Environment(bytecode_cache_path, templates_path)
+        is environment
+    )
+    text, compiled = render_macros(environment)
+    assert "[macro_2]" in text
+    assert compiled == 1
+    assert render_macros(environment) == (text, 0)
+    assert render_macros(new_environment(bytecode_cache_path, templates_path)) == (
+        text,
+        0,
+    )
+
+    # Edit the template, without changing its size
+    template_path = templates_path / "macros.j2"
+    template = template_path.read_text()
+    edited = template.replace("description = ", "DESCRIPTION = ")
+    assert edited != template and len(edited) == len(template)
+    stat = template_path.stat()
+    template_path.write_text(edited)
+    os.utime(template_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    edited_text, compiled = render_macros(environment)
+    assert edited_text != text
+    assert "DESCRIPTION = A macro" in edited_text
+    assert compiled == 1
+    assert render_macros(new_environment(bytecode_cache_path, templates_path)) == (
+        edited_text,
+        0,
+    )
+
+    # A new process never uses code compiled from another version of the template,
+    # whatever the modification time of the template is
+    shutil.rmtree(bytecode_cache_path)
+    render_macros(new_environment(bytecode_cache_path, templates_path))
+    template_path.write_text(template)
+    assert render_macros(new_environment(bytecode_cache_path, templates_path)) == (
+        text,
+        1,
+    )
+
+
+@pytest.fixture
+def app_path(example_app, tmp_path) -> pathlib.Path:
+    return shutil.copytree(example_app, tmp_path / "app")
+
+
+def test_compiled_templates_are_not_packaged(app_path, capsys):
+    config_obj = YmlReader.load_file(app_path / "contentctl.yml", add_fields=False)
+    config = build.model_validate(config_obj | {"path": app_path})
+    build_func(config)
+    capsys.readouterr()
+
+    bytecode_cache_path = config.cache_path / J2_BYTECODE_CACHE_DIRECTORY
+    assert any(path.suffix == ".cache" for path in bytecode_cache_path.iterdir())
+    assert not bytecode_cache_path.is_relative_to(config.getBuildDir())
+
+    built_files = [
+        path.relative_to(config.getBuildDir())
+        for path in config.getBuildDir().glob("**/*")
+    ]
+    with tarfile.open(config.getPackageFilePath()) as package:
+        packaged_files = package.getnames()
+    assert len(built_files) > 0
+    assert len(packaged_files) > 0
+    for name in [str(path) for path in built_files] + packaged_files:
+        assert "jinja2" not in name
+        assert not name.endswith(".cache")
@@ -0,0 +1,158 @@
+import csv
+import io
+import os
+import pathlib
+
+import pytest
+
+from contentctl.input import csv_validator
+from contentctl.input.csv_validator import CsvValidator, check_csv_structure
+
+CSVS = {
+    "valid": "a,b,c\n1,2,3\n4,5,6\n",
+    "extra columns": "a,b\n1,2,3\n4,5\n6,7,8,9\n",
+    "missing columns": "a,b,c\n1,2\n3\n4,5,6\n",
+    "blank lines": "a,b\n\n1,2\n\n\n3\n4,5,6\n",
+    "quoted newlines": 'a,b\n"1\n2",3\n"4\n\n5"\n6,7\n',
+    "duplicated columns": "a,b,a\n1,2,3\n1,2\n1\n",
+    "header only": "a,b\n",
+    "empty header": "\n1,2\n",
+    "empty": "",
+    "crlf": "a,b\r\n1,2\r\n3\r\n",
+}
+
+
+def dict_reader_errors(handle: io.TextIOBase) -> list[str] | None:
+    """
+    The errors reported by Lookup.ensure_correct_csv_structure before it used
+    check_csv_structure, or None if the CSV had no header row.
+    """
+    csv_errors: list[str] = []
+    RESTKEY = "extra_fields_in_a_row"
+    csv_dict = csv.DictReader(handle, restkey=RESTKEY)
+    if csv_dict.fieldnames is None:
+        return None
+    for row_index, data_row in enumerate(csv_dict):
+        row_index += 2
+        if len(data_row.get(RESTKEY, [])) > 0:
+            csv_errors.append(
+                f"row [{row_index}] should have [{len(csv_dict.fieldnames)}] columns,"
+                f" but instead had [{len(csv_dict.fieldnames) + len(data_row.get(RESTKEY, []))}]."
+            )
+
+        for column_index, column_name in enumerate(data_row):
+            if data_row[column_name] is None:
+                csv_errors.append(
+                    f"row [{row_index}] should have [{len(csv_dict.fieldnames)}] columns, "
+                    f"but instead had [{column_index}]."
+                )
+    return csv_errors
+
+
+@pytest.mark.parametrize("text", CSVS.values(), ids=CSVS.keys())
+def test_messages_match_dict_reader(text):
+    structure = check_csv_structure(io.StringIO(text, newline=""))
+    expected = dict_reader_errors(io.StringIO(text, newline=""))
+    if expected is None:
+        assert structure.columns is None
+    else:
+        assert structure.columns is not None
+    assert list(structure.errors) == (expected or [])
+
+
+def test_max_errors():
+    text = "a,b,c\n" + "1\n" * 10
+    expected = dict_reader_errors(io.StringIO(text))
+    # Each row with a single column is two errors
+    assert expected is not None and len(expected) == 20
+
+    errors = check_csv_structure(io.StringIO(text), max_errors=5).errors
+    assert list(errors[:5]) == expected[:5]
+    assert errors[5:] == (
+        "Stopped checking the CSV after [5] errors. There may be more errors.",
+    )
+    assert list(check_csv_structure(io.StringIO(text), max_errors=20).errors) == (
+        expected
+        + ["Stopped checking the CSV after [20] errors. There may be more errors."]
+    )
+    assert list(check_csv_structure(io.StringIO(text), max_errors=21).errors) == (
+        expected
+    )
+
+
+def set_mtime(path: pathlib.Path, mtime_ns: int) -> None:
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def checked_files(monkeypatch) -> list[str]:
+    """
+    The names of the files which have been checked rather than loaded from the cache,
+    in no particular order
+    """
+    checked: list[str] = []
+
+    def check(handle, max_errors=csv_validator.DEFAULT_MAX_CSV_ERRORS):
+        checked.append(pathlib.Path(handle.name).name)
+        return check_csv_structure(handle, max_errors)
+
+    monkeypatch.setattr(csv_validator, "check_csv_structure", check)
+    return checked
+
+
+def test_cache(tmp_path, checked_files):
+    cache_path = tmp_path / "cache"
+    valid = tmp_path / "valid.csv"
+    valid.write_text(CSVS["valid"])
+    invalid = tmp_path / "invalid.csv"
+    invalid.write_text(CSVS["missing columns"])
+    files = [valid, invalid]
+
+    results = CsvValidator(cache_path).check_files(files)
+    assert sorted(checked_files) == ["invalid.csv", "valid.csv"]
+    assert results[str(valid)] == check_csv_structure(io.StringIO(CSVS["valid"]))
+    assert len(results[str(invalid)].errors) == 3
+
+    # Unchanged files are not read
+    checked_files.clear()
+    assert CsvValidator(cache_path).check_files(files) == results
+    assert checked_files == []
+
+    # A file whose modification time changed is hashed, but not checked again
+    set_mtime(valid, valid.stat().st_mtime_ns + 10**9)
+    assert CsvValidator(cache_path).check_files(files) == results
+    assert checked_files == []
+
+    # A file whose contents changed is checked again, even if its size is the same
+    invalid.write_text(CSVS["missing columns"].replace("4,5,6", "4\n5\n6"))
+    set_mtime(invalid, invalid.stat().st_mtime_ns + 10**9)
+    results = CsvValidator(cache_path).check_files(files)
+    assert checked_files == ["invalid.csv"]
+    assert len(results[str(invalid)].errors) == 9
+
+    # As is every file, if the maximum number of errors changed
+    checked_files.clear()
+    results = CsvValidator(cache_path, max_errors=1).check_files(files)
+    assert sorted(checked_files) == ["invalid.csv", "valid.csv"]
+    assert len(results[str(invalid)].errors) == 2
+
+    # Without a cache, every file is always checked
+    checked_files.clear()
+    CsvValidator().check_files(files)
+    CsvValidator().check_files(files)
+    assert sorted(checked_files) == ["invalid.csv"] * 2 + ["valid.csv"] * 2
+
+
+def test_unreadable_files_are_left_out(tmp_path):
+    valid = tmp_path / "valid.csv"
+    valid.write_text(CSVS["valid"])
+    # A field which is too large for the csv module
+    too_large = tmp_path / "too_large.csv"
+    too_large.write_text("a\n" + "x" * (csv.field_size_limit() + 1) + "\n")
+    with too_large.open() as handle, pytest.raises(csv.Error):
+        check_csv_structure(handle)
+
+    results = CsvValidator(tmp_path / "cache").check_files(
+        [valid, too_large, tmp_path / "missing.csv"]
+    )
+    assert results.keys() == {str(valid)}
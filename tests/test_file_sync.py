@@ -0,0 +1,36 @@
+import os
+
+from contentctl.helper.file_sync import sync_directory
+
+
+def test_sync_directory(tmp_path):
+    source = tmp_path / "source"
+    destination = tmp_path / "destination"
+    (source / "default").mkdir(parents=True)
+    (source / "default" / "app.conf").write_text("[app]\n")
+    (source / "static").mkdir()
+    (source / "static" / "icon.png").write_bytes(b"\x89PNG")
+
+    stats = sync_directory(source, destination)
+    assert (stats.copied, stats.linked, stats.unchanged) == (1, 1, 0)
+    assert os.path.samefile(
+        source / "static" / "icon.png", destination / "static" / "icon.png"
+    )
+
+    # Files written by a build are removed, and the template files it changed are restored
+    (destination / "default" / "app.conf").write_text("[app]\nchanged\n")
+    (destination / "default" / "macros.conf").write_text("[macro]\n")
+    (destination / "lookups").mkdir()
+    (destination / "lookups" / "lookup.csv").write_text("a,b\n")
+
+    stats = sync_directory(source, destination)
+    assert (stats.copied, stats.unchanged, stats.removed) == (1, 1, 2)
+    assert (destination / "default" / "app.conf").read_text() == "[app]\n"
+    assert sorted(
+        p.relative_to(destination).as_posix() for p in destination.rglob("*")
+    ) == [
+        "default",
+        "default/app.conf",
+        "static",
+        "static/icon.png",
+    ]
@@ -0,0 +1,65 @@
+import os
+import pathlib
+import subprocess
+import sys
+
+import contentctl
+
+# The import time budgets, in seconds. These are several times what startup takes on a
+# typical machine, so that they only fail when startup becomes much slower, usually
+# because a heavy dependency is imported at module level again.
+HELP_IMPORT_BUDGET_SECONDS = 2.5
+VALIDATE_IMPORT_BUDGET_SECONDS = 4.0
+
+# Dependencies which are only needed by some subcommands
+SUBCOMMAND_DEPENDENCIES = {
+    "attackcti",
+    "bottle",
+    "docker",
+    "git",
+    "jinja2",
+    "pycvesearch",
+    "pygit2",
+    "questionary",
+    "requests",
+    "splunklib",
+    "tqdm",
+}
+
+
+def import_times(cwd: pathlib.Path, *args: str) -> dict[str, float]:
+    """
+    Run python with -X importtime, and return the time taken to import each module
+    (excluding the modules that it imports), in seconds.
+    """
+    repo_root = pathlib.Path(contentctl.__file__).parent.parent
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=cwd,
+        env=os.environ | {"PYTHONPATH": str(repo_root)},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_time, _, module = line.removeprefix("import time:").split("|")
+        times[module.strip()] = int(self_time) / 1e6
+    return times
+
+
+def test_help_import_time(tmp_path):
+    times = import_times(tmp_path, "-m", "contentctl.contentctl", "--help")
+    assert SUBCOMMAND_DEPENDENCIES.isdisjoint(times)
+    assert sum(times.values()) < HELP_IMPORT_BUDGET_SECONDS
+
+
+def test_validate_import_time(tmp_path):
+    times = import_times(
+        tmp_path, "-c", "import contentctl.contentctl, contentctl.actions.validate"
+    )
+    # The results of tests are splunklib Records, which are part of every detection
+    assert (SUBCOMMAND_DEPENDENCIES - {"splunklib"}).isdisjoint(times)
+    assert sum(times.values()) < VALIDATE_IMPORT_BUDGET_SECONDS
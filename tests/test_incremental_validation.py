@@ -0,0 +1,232 @@
+import hashlib
+import pathlib
+import shutil
+from typing import Any, Callable, Sequence, Union
+
+import pytest
+
+from contentctl.actions.validate import Validate
+from contentctl.enrichments.attack_enrichment import AttackEnrichment
+from contentctl.enrichments.cve_enrichment import CveEnrichment
+from contentctl.input.director import DirectorOutputDto, ValidationFailedError
+from contentctl.input.yml_reader import YmlReader
+from contentctl.objects.atomic import AtomicEnrichment
+from contentctl.objects.baseline import Baseline
+from contentctl.objects.config import validate
+from contentctl.objects.macro import Macro
+from contentctl.objects.security_content_object import SecurityContentObject
+from contentctl.objects.story import Story
+from contentctl.output.stanza_cache import _hash_value
+
+DETECTIONS = pathlib.Path("detections/endpoint")
+
+
+@pytest.fixture
+def app_path(example_app, tmp_path) -> pathlib.Path:
+    return shutil.copytree(example_app, tmp_path / "app")
+
+
+def run_validate(
+    app_path: pathlib.Path, capsys: pytest.CaptureFixture[str], **settings: Any
+) -> tuple[Union[DirectorOutputDto, None], str]:
+    """
+    Validate the app like 'contentctl validate' does.
+
+    Returns:
+        tuple[Union[DirectorOutputDto, None], str]: The content, or None if validation
+        failed, and everything that was printed.
+    """
+    config_obj = YmlReader().load_file(app_path / "contentctl.yml", add_fields=False)
+    config = validate.model_validate(config_obj | {"path": app_path} | settings)
+    director_output_dto: Union[DirectorOutputDto, None] = DirectorOutputDto(
+        AtomicEnrichment.getAtomicEnrichment(config),
+        AttackEnrichment.getAttackEnrichment(config),
+        CveEnrichment.getCveEnrichment(config),
+    )
+    try:
+        Validate().validate_content(config, director_output_dto)
+    except (ValidationFailedError, SystemExit):
+        director_output_dto = None
+    return director_output_dto, capsys.readouterr().out
+
+
+def content_hashes(director_output_dto: DirectorOutputDto) -> dict[str, str]:
+    """
+    A hash of the fields of each piece of content, in the order that it was constructed.
+    Other content which it references is only hashed by name.
+    """
+    hashes: dict[str, str] = {}
+    for obj in director_output_dto.name_to_content_map.values():
+        digest = hashlib.sha256()
+        for field_name in type(obj).model_fields:
+            # Macros which do not have an id are given a random one
+            if not (isinstance(obj, Macro) and field_name == "id"):
+                digest.update(field_name.encode())
+                _hash_value(getattr(obj, field_name), obj, digest, [])
+        hashes[obj.name] = digest.hexdigest()
+    return hashes
+
+
+def replace_text(path: pathlib.Path, old: str, new: str) -> None:
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new))
+
+
+def rename_detection(app_path: pathlib.Path) -> None:
+    detection_path = app_path / DETECTIONS / "anomalous_usage_of_7zip_3.yml"
+    replace_text(detection_path, "7zip 3\n", "7zip three\n")
+    detection_path.rename(detection_path.with_name("anomalous_usage_of_7zip_three.yml"))
+
+
+def rename_story(app_path: pathlib.Path) -> None:
+    replace_text(app_path / "stories" / "story_b.yml", "name: Story B", "name: Story C")
+    replace_text(
+        app_path / DETECTIONS / "anomalous_usage_of_7zip_1.yml", "Story B", "Story C"
+    )
+
+
+EDITS: dict[str, Callable[[pathlib.Path], None]] = {
+    "nothing": lambda app_path: None,
+    "edit macro": lambda app_path: replace_text(
+        app_path / "macros" / "security_content_ctime.yml", "ctime(", "strftime("
+    ),
+    "delete filter macro": lambda app_path: (
+        app_path / "macros" / "anomalous_usage_of_7zip_0_filter.yml"
+    ).unlink(),
+    "rename macro": lambda app_path: replace_text(
+        app_path / "macros" / "security_content_summariesonly.yml",
+        "name: security_content_summariesonly",
+        "name: security_content_summaries",
+    ),
+    "move macro": lambda app_path: (
+        app_path / "macros" / "security_content_ctime.yml"
+    ).rename(app_path / "macros" / "ctime.yml"),
+    "edit data source": lambda app_path: replace_text(
+        app_path / "data_sources" / "sysmon_eventid_1.yml",
+        "description: ",
+        "description: Changed. ",
+    ),
+    "delete data source": lambda app_path: (
+        app_path / "data_sources" / "sysmon_eventid_1.yml"
+    ).unlink(),
+    "edit story": lambda app_path: replace_text(
+        app_path / "stories" / "story_b.yml", "description: ", "description: Changed. "
+    ),
+    "delete story": lambda app_path: (app_path / "stories" / "story_b.yml").unlink(),
+    "rename story": rename_story,
+    "edit detection": lambda app_path: replace_text(
+        app_path / DETECTIONS / "anomalous_usage_of_7zip_2.yml",
+        "description: ",
+        "description: Changed. ",
+    ),
+    "edit detection stories": lambda app_path: replace_text(
+        app_path / DETECTIONS / "anomalous_usage_of_7zip_0.yml",
+        "  - Cobalt Strike\n",
+        "  - Cobalt Strike\n  - Story B\n",
+    ),
+    "invalid detection": lambda app_path: replace_text(
+        app_path / DETECTIONS / "anomalous_usage_of_7zip_2.yml",
+        "type: Anomaly",
+        "type: Unknown",
+    ),
+    "delete detection": lambda app_path: (
+        app_path / DETECTIONS / "anomalous_usage_of_7zip_2.yml"
+    ).unlink(),
+    "rename detection": rename_detection,
+    "edit baseline detections": lambda app_path: replace_text(
+        app_path / "baselines" / "baseline_one.yml", "7zip 2\n", "7zip 3\n"
+    ),
+    "edit lookup file": lambda app_path: replace_text(
+        app_path / "lookups" / "lk_0.csv", "1,y\n", "1,y\n2,z\n"
+    ),
+}
+
+
+def names(content: Sequence[Union[SecurityContentObject, str]]) -> list[str]:
+    """
+    The names of content, which may only be referred to by name if it does not exist.
+    """
+    return [
+        f"{type(obj).__name__}: {obj if isinstance(obj, str) else obj.name}"
+        for obj in content
+    ]
+
+
+def without_timings(output: str) -> list[str]:
+    return [
+        line
+        for line in output.splitlines()
+        if "Incremental validation" not in line and " seconds" not in line
+    ]
+
+
+@pytest.mark.parametrize("edit", EDITS)
+def test_incremental_validation_matches_full_validation(app_path, capsys, edit):
+    # Write the snapshot
+    director_output_dto, _ = run_validate(app_path, capsys, incremental=True)
+    assert director_output_dto is not None
+
+    EDITS[edit](app_path)
+    incremental_dto, incremental_output = run_validate(
+        app_path, capsys, incremental=True
+    )
+    full_dto, full_output = run_validate(app_path, capsys)
+
+    assert "Incremental validation: restoring" in incremental_output
+    assert without_timings(incremental_output) == without_timings(full_output)
+    assert (incremental_dto is None) == (full_dto is None)
+    if incremental_dto is None or full_dto is None:
+        return
+    assert list(content_hashes(incremental_dto).items()) == list(
+        content_hashes(full_dto).items()
+    )
+
+    # The content which other content adds itself to, in the same order
+    for incremental_story, full_story in zip(incremental_dto.stories, full_dto.stories):
+        assert names(incremental_story.detections) == names(full_story.detections)
+        assert incremental_story.tags == full_story.tags
+    for incremental_baseline, full_baseline in zip(
+        incremental_dto.baselines, full_dto.baselines
+    ):
+        assert names(incremental_baseline.tags.detections) == names(
+            full_baseline.tags.detections
+        )
+
+
+def test_snapshot_requires_the_same_configuration(app_path, capsys):
+    director_output_dto, _ = run_validate(app_path, capsys, incremental=True)
+    assert director_output_dto is not None
+
+    # Settings which cannot change the result of validation do not discard the snapshot
+    _, output = run_validate(app_path, capsys, incremental=True, cache=True)
+    assert "Incremental validation: restoring" in output
+
+    # Settings which can do
+    _, output = run_validate(app_path, capsys, incremental=True, max_csv_errors=5)
+    assert "Incremental validation" not in output
+    _, output = run_validate(app_path, capsys, incremental=True, rebuild=True)
+    assert "Incremental validation" not in output
+
+
+def test_stories_and_baselines_are_restored(app_path, capsys):
+    run_validate(app_path, capsys, incremental=True)
+    director_output_dto, output = run_validate(app_path, capsys, incremental=True)
+    assert director_output_dto is not None
+    assert "Incremental validation: restoring" in output
+
+    stories = {story.name: story for story in director_output_dto.stories}
+    assert [d.name for d in stories["Story B"].detections] == [
+        "Anomalous usage of 7zip 1"
+    ]
+    assert len(stories["Cobalt Strike"].detections) == 5
+    assert isinstance(director_output_dto.baselines[0], Baseline)
+    assert names(director_output_dto.baselines[0].tags.detections) == [
+        "Detection: Anomalous usage of 7zip 1",
+        "Detection: Anomalous usage of 7zip 2",
+    ]
+    # Filter macros which are not defined by a file are created by their detections
+    macros = {macro.name: macro for macro in director_output_dto.macros}
+    assert macros["anomalous_usage_of_7zip_0_filter"].file_path is not None
+    assert macros["anomalous_usage_of_7zip_1_filter"].file_path is None
+    assert all(isinstance(story, Story) for story in stories.values())
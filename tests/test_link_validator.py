@@ -0,0 +1,95 @@
+import http.server
+import threading
+
+import pytest
+
+from contentctl.helper.link_validator import LinkValidator
+
+
+class StubHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests_seen: list[tuple[str, str]] = []
+    connections = 0
+
+    def setup(self) -> None:
+        super().setup()
+        type(self).connections += 1
+
+    def respond(self, status: int, body: bytes = b"ok") -> None:
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def do_HEAD(self) -> None:
+        self.requests_seen.append(("HEAD", self.path))
+        if self.path == "/no-head":
+            self.respond(405)
+        elif self.path == "/missing":
+            self.respond(404)
+        else:
+            self.respond(200)
+
+    def do_GET(self) -> None:
+        self.requests_seen.append(("GET", self.path))
+        if self.path == "/missing":
+            self.respond(404)
+        else:
+            self.respond(200)
+
+    def log_message(self, format: str, *args: object) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    StubHandler.requests_seen = []
+    StubHandler.connections = 0
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_validate_references(stub_server, tmp_path):
+    references = {
+        f"{stub_server}/ok": {"a.yml", "b.yml"},
+        f"{stub_server}/no-head": {"a.yml"},
+        f"{stub_server}/missing": {"b.yml"},
+    }
+    cache_file = tmp_path / "references.pickle"
+
+    failures = LinkValidator(cache_file).validate_references(references)
+    assert [(f.reference, f.status_code) for f in failures] == [
+        (f"{stub_server}/missing", 404)
+    ]
+    assert failures[0].referencing_files == {"b.yml"}
+    # GET is only used when HEAD does not succeed
+    assert sorted(StubHandler.requests_seen) == [
+        ("GET", "/missing"),
+        ("GET", "/no-head"),
+        ("HEAD", "/missing"),
+        ("HEAD", "/no-head"),
+        ("HEAD", "/ok"),
+    ]
+
+    # Successes are cached, and failures are checked again once they expire
+    StubHandler.requests_seen = []
+    validator = LinkValidator(cache_file, failure_ttl_seconds=0)
+    assert len(validator.validate_references(references)) == 1
+    assert validator.uncached_checks == 1
+    assert sorted(StubHandler.requests_seen) == [
+        ("GET", "/missing"),
+        ("HEAD", "/missing"),
+    ]
+
+
+def test_connections_are_reused(stub_server):
+    references = {f"{stub_server}/ok/{i}": {"a.yml"} for i in range(10)}
+    validator = LinkValidator(max_workers=2, max_connections_per_host=2)
+    assert validator.validate_references(references) == []
+    assert len(StubHandler.requests_seen) == 10
+    assert 1 <= StubHandler.connections <= 2
@@ -0,0 +1,127 @@
+import difflib
+import random
+
+import pytest
+
+from contentctl.helper import name_index
+from contentctl.helper.name_index import NameIndex
+
+WORDS = [
+    "windows",
+    "linux",
+    "aws",
+    "azure",
+    "suspicious",
+    "process",
+    "creation",
+    "registry",
+    "powershell",
+    "execution",
+    "remote",
+    "detect",
+    "new",
+    "local",
+    "admin",
+    "account",
+]
+# Names shorter than a trigram, and names which only differ by case
+SHORT_NAMES = ["a", "ab", "7z", "x1", "Aws", "aws", "AWS"]
+
+
+class Parent:
+    pass
+
+
+class Child(Parent):
+    pass
+
+
+class Other:
+    pass
+
+
+def random_names(rng: random.Random, count: int) -> list[str]:
+    # Built from a few words in any order, so that many names share most of their
+    # trigrams, which is the hardest case for the index
+    names: set[str] = set(SHORT_NAMES)
+    while len(names) < count:
+        names.add(" ".join(rng.sample(WORDS, rng.randint(2, 5))).title())
+    return sorted(names)
+
+
+def misspell(rng: random.Random, name: str) -> str:
+    characters = list(name)
+    for _ in range(rng.randint(1, 3)):
+        position = rng.randrange(len(characters) + 1)
+        edit = rng.choice(["insert", "delete", "replace"])
+        if edit == "insert" or len(characters) == 0:
+            characters.insert(position, rng.choice("abcxyz "))
+        elif edit == "delete":
+            del characters[min(position, len(characters) - 1)]
+        else:
+            characters[min(position, len(characters) - 1)] = rng.choice("abcxyz")
+    return "".join(characters)
+
+
+@pytest.fixture(scope="module")
+def indexed_names() -> tuple[NameIndex, dict[type, list[str]], list[str]]:
+    rng = random.Random(6)
+    names = random_names(rng, 600)
+    rng.shuffle(names)
+    names_by_type: dict[type, list[str]] = {Parent: [], Child: [], Other: []}
+    index = NameIndex()
+    for i, name in enumerate(names):
+        content_type = [Parent, Child, Other][i % 3]
+        names_by_type[content_type].append(name)
+        index.add(name, content_type)
+
+    queries = [misspell(rng, rng.choice(names)) for _ in range(40)]
+    queries += SHORT_NAMES + ["", "z", "Process", "Completely Unrelated"]
+    return index, names_by_type, queries
+
+
+@pytest.mark.parametrize("max_candidates", [1, 200, 100_000])
+@pytest.mark.parametrize("n,cutoff", [(3, 0.6), (1, 0.6), (5, 0.8)])
+def test_suggestions_match_get_close_matches(
+    indexed_names, monkeypatch, max_candidates, n, cutoff
+):
+    # However few names are scored first, the suggestions are the same
+    monkeypatch.setattr(name_index, "MAX_SUGGESTION_CANDIDATES", max_candidates)
+    index, names_by_type, queries = indexed_names
+    all_names = [name for names in names_by_type.values() for name in names]
+    for query in queries:
+        assert index.suggest(query, n=n, cutoff=cutoff) == difflib.get_close_matches(
+            query, all_names, n=n, cutoff=cutoff
+        ), query
+        assert index.suggest(
+            query, Other, n=n, cutoff=cutoff
+        ) == difflib.get_close_matches(query, names_by_type[Other], n=n, cutoff=cutoff)
+
+
+def test_suggestions_are_scoped_by_type(indexed_names):
+    index, names_by_type, queries = indexed_names
+    parent_names = names_by_type[Parent] + names_by_type[Child]
+    for query in queries:
+        # The names of a type include the names of its subclasses
+        assert index.suggest(query, Parent) == difflib.get_close_matches(
+            query, parent_names
+        )
+        assert index.suggest(query, Child) == difflib.get_close_matches(
+            query, names_by_type[Child]
+        )
+
+    name = names_by_type[Child][0]
+    assert index.suggest(name, Child)[0] == name
+    assert index.suggest(name, Parent)[0] == name
+    assert name not in index.suggest(name, Other)
+
+
+def test_short_names():
+    index = NameIndex()
+    for name in SHORT_NAMES:
+        index.add(name, Other)
+    assert index.suggest("ab", Other) == ["ab", "a"]
+    assert index.suggest("Aws", Other) == ["Aws", "aws"]
+    assert index.suggest("7", Other) == ["7z"]
+    assert index.suggest("", Other) == []
+    assert index.suggest("x", Parent) == []
@@ -0,0 +1,273 @@
+import gzip
+import json
+import os
+import pathlib
+from decimal import Decimal
+from typing import Any, Union
+
+import pytest
+
+from contentctl.enrichments import nvd_index
+from contentctl.enrichments.cve_enrichment import CveEnrichment
+from contentctl.enrichments.nvd_index import NvdIndex, NvdRecord
+
+
+def cve_2_0(
+    cve_id: str,
+    metrics: dict[str, list[dict[str, Any]]],
+    description: str,
+    last_modified: str = "2024-01-01T00:00:00.000",
+) -> dict[str, Any]:
+    return {
+        "cve": {
+            "id": cve_id,
+            "lastModified": last_modified,
+            "descriptions": [
+                {"lang": "es", "value": f"{description} (es)"},
+                {"lang": "en", "value": description},
+            ],
+            "metrics": metrics,
+        }
+    }
+
+
+def metric(score: float, type: str = "Primary") -> dict[str, Any]:
+    return {"type": type, "cvssData": {"baseScore": score}}
+
+
+def cve_1_1(
+    cve_id: str,
+    impact: dict[str, Any],
+    description: str,
+    last_modified: str = "2024-01-01T00:00Z",
+) -> dict[str, Any]:
+    return {
+        "cve": {
+            "CVE_data_meta": {"ID": cve_id},
+            "description": {"description_data": [{"lang": "en", "value": description}]},
+        },
+        "impact": impact,
+        "lastModifiedDate": last_modified,
+    }
+
+
+def write_feed(
+    path: pathlib.Path,
+    vulnerabilities: Union[list[dict[str, Any]], None] = None,
+    cve_items: Union[list[dict[str, Any]], None] = None,
+) -> None:
+    feed: dict[str, Any] = {}
+    if vulnerabilities is not None:
+        feed["vulnerabilities"] = vulnerabilities
+    if cve_items is not None:
+        feed["CVE_Items"] = cve_items
+    text = json.dumps(feed)
+    if path.suffix == ".gz":
+        with gzip.open(path, "wt", encoding="utf-8") as feed_file:
+            feed_file.write(text)
+    else:
+        path.write_text(text)
+    # Make sure that a rewritten feed never has the same modification time as before
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+
+@pytest.fixture
+def feed_path(tmp_path) -> pathlib.Path:
+    feed_path = tmp_path / "nvd"
+    feed_path.mkdir()
+    write_feed(
+        feed_path / "nvdcve-2.0-2024.json",
+        vulnerabilities=[
+            cve_2_0(
+                "CVE-2024-0001",
+                {
+                    "cvssMetricV2": [metric(4.3)],
+                    "cvssMetricV40": [metric(9.3)],
+                    "cvssMetricV31": [metric(7.5, "Secondary"), metric(8.8)],
+                },
+                "Three versions of CVSS",
+            ),
+            cve_2_0(
+                "CVE-2024-0002",
+                {"cvssMetricV2": [metric(5)], "cvssMetricV40": [metric(6.9)]},
+                "CVSS 4.0 and 2",
+            ),
+            cve_2_0(
+                "CVE-2024-0003",
+                {"cvssMetricV30": [metric(6.1, "Secondary")]},
+                "Scored by the CNA only",
+            ),
+            cve_2_0("CVE-2024-0004", {}, "Not scored"),
+        ],
+    )
+    write_feed(
+        feed_path / "nvdcve-1.1-2019.json.gz",
+        cve_items=[
+            cve_1_1(
+                "CVE-2019-0001",
+                {
+                    "baseMetricV2": {"cvssV2": {"baseScore": 5.0}},
+                    "baseMetricV3": {"cvssV3": {"baseScore": 9.8}},
+                },
+                "Legacy CVSS 3 and 2",
+            ),
+            cve_1_1(
+                "CVE-2019-0002",
+                {"baseMetricV2": {"cvssV2": {"baseScore": 2.1}}},
+                "Legacy CVSS 2",
+            ),
+        ],
+    )
+    return feed_path
+
+
+def test_feeds_are_read(feed_path, tmp_path):
+    index = NvdIndex(feed_path, tmp_path / "nvd.sqlite")
+    assert index.refresh() == 2
+    records = index.lookup(
+        ["CVE-2024-0001", "CVE-2024-0004", "CVE-2019-0002", "CVE-2000-0001"]
+    )
+    assert records == {
+        "CVE-2024-0001": NvdRecord(
+            "CVE-2024-0001", Decimal("8.8"), "Three versions of CVSS"
+        ),
+        "CVE-2024-0004": NvdRecord("CVE-2024-0004", None, "Not scored"),
+        "CVE-2019-0002": NvdRecord("CVE-2019-0002", Decimal("2.1"), "Legacy CVSS 2"),
+    }
+
+
+def test_cvss_metric_preference(feed_path, tmp_path):
+    index = NvdIndex(feed_path, tmp_path / "nvd.sqlite")
+    index.refresh()
+    scores = {
+        cve_id: record.cvss
+        for cve_id, record in index.lookup(
+            [
+                "CVE-2024-0001",
+                "CVE-2024-0002",
+                "CVE-2024-0003",
+                "CVE-2019-0001",
+                "CVE-2019-0002",
+            ]
+        ).items()
+    }
+    assert scores == {
+        # CVSS 3.1, then 3.0, then 4.0, then 2, and NVD's own score before the CNA's
+        "CVE-2024-0001": Decimal("8.8"),
+        "CVE-2024-0002": Decimal("6.9"),
+        "CVE-2024-0003": Decimal("6.1"),
+        # CVSS 3, then 2, in the legacy feeds
+        "CVE-2019-0001": Decimal("9.8"),
+        "CVE-2019-0002": Decimal("2.1"),
+    }
+
+
+def test_refresh(feed_path, tmp_path):
+    index = NvdIndex(feed_path, tmp_path / "nvd.sqlite")
+    assert index.refresh() == 2
+    assert index.refresh() == 0
+
+    # A new feed is ingested on its own, and the most recently modified version of a CVE
+    # in several feeds is kept, whichever feed is ingested last
+    write_feed(
+        feed_path / "nvdcve-2.0-modified.json",
+        vulnerabilities=[
+            cve_2_0(
+                "CVE-2024-0004",
+                {"cvssMetricV31": [metric(3.1)]},
+                "Scored later",
+                last_modified="2024-06-01T00:00:00.000",
+            ),
+            cve_2_0(
+                "CVE-2024-0002",
+                {"cvssMetricV31": [metric(1.0)]},
+                "An older version",
+                last_modified="2023-01-01T00:00:00.000",
+            ),
+        ],
+    )
+    index = NvdIndex(feed_path, tmp_path / "nvd.sqlite")
+    assert index.refresh() == 1
+    records = index.lookup(["CVE-2024-0002", "CVE-2024-0004"])
+    assert records["CVE-2024-0002"].summary == "CVSS 4.0 and 2"
+    assert records["CVE-2024-0004"] == NvdRecord(
+        "CVE-2024-0004", Decimal("3.1"), "Scored later"
+    )
+
+    # A changed feed is ingested again
+    write_feed(
+        feed_path / "nvdcve-1.1-2019.json.gz",
+        cve_items=[
+            cve_1_1(
+                "CVE-2019-0002",
+                {"baseMetricV2": {"cvssV2": {"baseScore": 2.6}}},
+                "Rescored",
+                last_modified="2024-02-01T00:00Z",
+            ),
+        ],
+    )
+    assert index.refresh() == 1
+    assert index.lookup(["CVE-2019-0002"])["CVE-2019-0002"].cvss == Decimal("2.6")
+
+    # Removing a feed rebuilds the index from the feeds which are left
+    (feed_path / "nvdcve-2.0-modified.json").unlink()
+    assert index.refresh() == 2
+    assert index.lookup(["CVE-2024-0004"])["CVE-2024-0004"] == NvdRecord(
+        "CVE-2024-0004", None, "Not scored"
+    )
+    assert index.lookup(["CVE-2019-0002"])["CVE-2019-0002"].cvss == Decimal("2.6")
+    (feed_path / "nvdcve-1.1-2019.json.gz").unlink()
+    assert index.refresh() == 1
+    assert index.lookup(["CVE-2019-0001", "CVE-2019-0002"]) == {}
+
+
+def test_fingerprint(feed_path):
+    fingerprint = NvdIndex.fingerprint(feed_path)
+    assert NvdIndex.fingerprint(feed_path) == fingerprint
+    write_feed(feed_path / "nvdcve-2.0-2024.json", vulnerabilities=[])
+    assert NvdIndex.fingerprint(feed_path) != fingerprint
+
+
+def test_batched_lookup_matches_lookup_of_each_cve(feed_path, tmp_path, monkeypatch):
+    # Look CVEs up in more than one query
+    monkeypatch.setattr(nvd_index, "MAX_QUERY_PARAMETERS", 2)
+    index = NvdIndex(feed_path, tmp_path / "nvd.sqlite")
+    index.refresh()
+    cve_ids = [
+        "CVE-2024-0001",
+        "CVE-2024-0002",
+        "CVE-2024-0003",
+        "CVE-2024-0004",
+        "CVE-2019-0001",
+        "CVE-2019-0002",
+        "CVE-2000-0001",
+    ]
+
+    # Each CVE is looked up on its own as it is enriched
+    one_at_a_time = CveEnrichment(use_enrichment=True, nvd_index=index)
+    expected = [
+        one_at_a_time.enrich_cve(cve_id, raise_exception_on_failure=False)
+        for cve_id in cve_ids
+    ]
+
+    # Every CVE is looked up before any is enriched, as the Director does
+    batched = CveEnrichment(use_enrichment=True, nvd_index=index)
+    batched.loadCves(set(cve_ids))
+    assert batched._nvd_records.keys() == set(cve_ids)
+    assert [
+        batched.enrich_cve(cve_id, raise_exception_on_failure=False)
+        for cve_id in cve_ids
+    ] == expected
+    assert index.lookup(cve_ids) == {
+        cve_id: record
+        for cve_id in cve_ids
+        for record in index.lookup([cve_id]).values()
+    }
+
+    # CVEs without a score fail when failures are raised, however they were looked up
+    for enrichment in (one_at_a_time, batched):
+        with pytest.raises(Exception, match="unable to find a CVSS score"):
+            enrichment.enrich_cve("CVE-2024-0004")
+        with pytest.raises(Exception, match="unable to find a CVSS score"):
+            enrichment.enrich_cve("CVE-2000-0001")
@@ -0,0 +1,178 @@
+import ast
+import os
+import pathlib
+
+import pytest
+
+from contentctl.helper.utils import Utils
+from contentctl.input.director import Director
+from contentctl.input.repo_file_index import RepoFileIndex
+from contentctl.objects.removed_security_content_object import (
+    RemovedSecurityContentObject,
+)
+
+FOLDERS = sorted(
+    {
+        pathlib.Path(content_type.containing_folder())  # type: ignore
+        for content_type in Director.content_types
+    }
+)
+
+
+@pytest.fixture
+def repo_path(tmp_path) -> pathlib.Path:
+    """
+    A repo with files in every content folder, and the kinds of file and folder which
+    globbing treats specially
+    """
+    repo_path = tmp_path / "repo"
+    outside = tmp_path / "outside"
+    outside.mkdir()
+    (outside / "linked.yml").write_text("name: linked")
+    for folder in FOLDERS:
+        for relative_path in (
+            "b.yml",
+            "a.yml",
+            ".hidden.yml",
+            "UPPER.YML",
+            "no_suffix",
+            "sub/c.yml",
+            "sub/deeper/d.yml",
+            "sub.yml/e.yml",
+            "deprecation_mapping_1.YML",
+            "sub/deprecation_mapping_2.YML",
+        ):
+            path = repo_path / folder / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(relative_path)
+        os.symlink(outside, repo_path / folder / "sub" / "linked")
+    (repo_path / "lookups" / "lookup.csv").write_text("a,b\n")
+    (repo_path / "lookups" / "sub" / "model.mlmodel").write_text("{}")
+    return repo_path
+
+
+def globbed_files(paths) -> list[pathlib.Path]:
+    # Globbing also matches folders, such as sub.yml, which the index leaves out
+    return sorted(path for path in paths if not path.is_dir())
+
+
+def test_index_agrees_with_globbing(repo_path):
+    index = RepoFileIndex.build(repo_path, Director.content_types)
+    for folder in FOLDERS:
+        folder = repo_path / folder
+        assert folder / "sub.yml" in Utils.get_all_yml_files_from_directory(folder)
+        assert index.get_files(folder, "*.yml") == globbed_files(
+            Utils.get_all_yml_files_from_directory(folder)
+        )
+        assert index.get_files(folder) == globbed_files(folder.glob("**/*"))
+        assert index.get_files(
+            folder, "deprecation_mapping*.YML", recursive=False
+        ) == globbed_files(folder.glob("deprecation_mapping*.YML"))
+        assert folder / "sub" / "linked" / "linked.yml" not in index.get_files(folder)
+
+        for path in index.get_files(folder):
+            indexed_file = index.get(path)
+            assert indexed_file is not None
+            stat = path.stat()
+            assert (indexed_file.size, indexed_file.mtime_ns) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            )
+        assert index.get(folder / "sub") is None
+
+
+def security_content_files(get_files, *args, **kwargs):
+    try:
+        return globbed_files(get_files(*args, **kwargs))
+    except Exception as e:
+        # The files which are not allowed are listed in the order they were found in
+        message, _, not_allowed = str(e).partition(" are allowed:")
+        return (
+            type(e),
+            message,
+            globbed_files(map(pathlib.Path, ast.literal_eval(not_allowed or "[]"))),
+        )
+
+
+@pytest.mark.parametrize(
+    "allowed,to_return",
+    [
+        ([".yml", ".YML", ".csv", ".mlmodel"], [".csv", ".mlmodel"]),
+        ([".yml", ".YML", ".csv", ".mlmodel"], [".yml"]),
+        # Every folder has a file which is not allowed
+        ([".yml"], [".yml"]),
+        ([".csv"], [".yml"]),
+    ],
+)
+def test_security_content_files_agree_with_globbing(repo_path, allowed, to_return):
+    index = RepoFileIndex.build(repo_path, Director.content_types)
+    for folder in FOLDERS:
+        folder = repo_path / folder
+        assert security_content_files(
+            index.get_security_content_files, folder, allowed, to_return
+        ) == security_content_files(
+            Utils.get_security_content_files_from_directory, folder, allowed, to_return
+        )
+
+
+def test_missing_folders(tmp_path):
+    index = RepoFileIndex.build(tmp_path, Director.content_types)
+    folder = tmp_path / RemovedSecurityContentObject.containing_folder()
+    with pytest.raises(FileNotFoundError) as error:
+        index.get_files(folder, "*.yml")
+    with pytest.raises(FileNotFoundError) as expected:
+        Utils.get_all_yml_files_from_directory(folder)
+    assert str(error.value) == str(expected.value)
+    assert index.signature() == {}
+
+
+def test_symlinks(repo_path, tmp_path):
+    folder = repo_path / "detections"
+    os.symlink(folder, folder / "sub" / "loop")
+    os.symlink(tmp_path / "outside" / "linked.yml", folder / "linked_file.yml")
+    os.symlink(tmp_path / "missing.yml", folder / "broken.yml")
+    index = RepoFileIndex.build(repo_path, Director.content_types)
+
+    # Symlinks to files are indexed, but folders which are symlinked are not searched
+    assert index.get_files(folder, "*.yml") == [
+        path for path in globbed_files(folder.glob("**/*.yml")) if path.exists()
+    ]
+    assert folder / "linked_file.yml" in index.get_files(folder)
+    assert index.get_files(folder, "a.yml") == [folder / "a.yml"]
+
+
+def test_rebuilt_index_notices_changes(repo_path):
+    folder = repo_path / "detections"
+    index = RepoFileIndex.build(repo_path, Director.content_types)
+    files = index.get_files(folder, "*.yml")
+    signature = index.signature()
+    assert RepoFileIndex.build(repo_path, Director.content_types).signature() == (
+        signature
+    )
+
+    # An index does not change once it is built
+    (folder / "sub" / "added.yml").write_text("added")
+    (folder / "a.yml").unlink()
+    assert index.get_files(folder, "*.yml") == files
+    assert index.get(folder / "sub" / "added.yml") is None
+
+    index = RepoFileIndex.build(repo_path, Director.content_types)
+    assert index.get_files(folder, "*.yml") == globbed_files(folder.glob("**/*.yml"))
+    assert folder / "sub" / "added.yml" in index.get_files(folder, "*.yml")
+    assert folder / "a.yml" not in index.get_files(folder, "*.yml")
+    assert index.get(folder / "a.yml") is None
+    new_signature = index.signature()
+    assert new_signature.keys() == (
+        signature.keys() - {str(folder / "a.yml")} | {str(folder / "sub" / "added.yml")}
+    )
+
+    # Modifying a file changes the signature, even when its size is the same
+    path = folder / "b.yml"
+    stat = path.stat()
+    path.write_text("B.yml")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    modified_signature = RepoFileIndex.build(
+        repo_path, Director.content_types
+    ).signature()
+    assert modified_signature != new_signature
+    assert modified_signature[str(path)][0] == new_signature[str(path)][0]
@@ -0,0 +1,122 @@
+import pathlib
+import shutil
+
+import pytest
+from pydantic import computed_field
+
+from contentctl.objects.sealable import Sealable, sealed_property
+from tests.test_incremental_validation import run_validate
+
+
+class Totals(Sealable):
+    values: list[int]
+    offset: int = 0
+    # The number of times that each sealed property has been computed
+    computed: dict[str, int] = {}
+
+    @computed_field
+    @sealed_property
+    def total(self) -> int:
+        self.computed["total"] = self.computed.get("total", 0) + 1
+        return sum(self.values) + self.offset
+
+    @sealed_property
+    def largest(self) -> int:
+        self.computed["largest"] = self.computed.get("largest", 0) + 1
+        return max(self.values)
+
+
+def test_values_are_only_memoized_once_sealed():
+    totals = Totals(values=[1, 2, 3])
+    assert (totals.total, totals.total, totals.largest) == (6, 6, 3)
+    assert totals.computed == {"total": 2, "largest": 1}
+    assert "total" not in totals.__dict__
+
+    totals.seal()
+    assert totals.sealed
+    assert (totals.total, totals.total, totals.largest, totals.largest) == (6, 6, 3, 3)
+    assert totals.computed == {"total": 3, "largest": 2}
+    # Memoized values are not serialized or compared as fields
+    assert totals.model_dump() == {
+        "values": [1, 2, 3],
+        "offset": 0,
+        "computed": {"total": 3, "largest": 2},
+        "total": 6,
+    }
+    assert totals == Totals(values=[1, 2, 3], computed={"total": 3, "largest": 2})
+
+
+def test_assigning_a_field_discards_memoized_values():
+    totals = Totals(values=[1, 2, 3])
+    totals.seal()
+    assert totals.total == 6
+    totals.offset = 10
+    assert "total" not in totals.__dict__
+    assert totals.total == 16
+    totals.values = [5]
+    assert (totals.total, totals.largest) == (15, 5)
+    assert totals.sealed
+
+    totals.unseal()
+    assert not totals.sealed
+    assert "total" not in totals.__dict__
+    totals.offset = 0
+    assert totals.total == 5
+
+
+def test_changes_in_place_need_invalidate():
+    totals = Totals(values=[1, 2, 3])
+    totals.seal()
+    assert (totals.total, totals.largest) == (6, 3)
+
+    # Not an assignment, so the memoized values are out of date
+    totals.values.append(10)
+    assert (totals.total, totals.largest) == (6, 3)
+    totals.invalidate()
+    assert (totals.total, totals.largest) == (16, 10)
+
+    # The same goes for writing to __dict__ directly
+    totals.__dict__["offset"] = 100
+    assert totals.total == 16
+    totals.invalidate()
+    assert totals.total == 116
+
+
+@pytest.fixture
+def app_path(example_app, tmp_path) -> pathlib.Path:
+    return shutil.copytree(example_app, tmp_path / "app")
+
+
+def test_content_is_sealed_by_the_director(app_path, capsys):
+    director_output_dto, _ = run_validate(app_path, capsys)
+    assert director_output_dto is not None
+    assert all(
+        content.sealed for content in director_output_dto.name_to_content_map.values()
+    )
+    detections = {
+        detection.name: detection for detection in director_output_dto.detections
+    }
+    detection = detections["Anomalous usage of 7zip 1"]
+    assert detection.tags.sealed
+
+    # Assigning to a field of the tags only invalidates the tags, and not the
+    # values of the detection which are derived from them
+    annotations = detection.annotations
+    assert "nist" in annotations
+    detection.tags.nist = []
+    assert detection.annotations is annotations
+    detection.invalidate()
+    assert "nist" not in detection.annotations
+
+    # The data sources of a story are derived from its detections, and are not
+    # invalidated when one of them changes
+    story = next(
+        story for story in director_output_dto.stories if story.name == "Story B"
+    )
+    assert [detection.name for detection in story.detections] == [detection.name]
+    data_sources = story.data_sources
+    assert len(data_sources) > 0
+    detection.data_source_objects = []
+    assert story.data_sources == data_sources
+    story.invalidate()
+    assert story.data_sources == []
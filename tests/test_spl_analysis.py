@@ -0,0 +1,167 @@
+import pathlib
+import re
+
+import pytest
+
+import contentctl
+from contentctl.input.yml_reader import YmlReader
+from contentctl.objects.enums import DataModel
+from contentctl.objects.spl_analysis import SplAnalysis
+
+TEMPLATE_DETECTION = (
+    pathlib.Path(contentctl.__file__).parent
+    / "templates"
+    / "detections"
+    / "endpoint"
+    / "anomalous_usage_of_7zip.yml"
+)
+
+# Searches from Splunk's security content, and a few which exercise the edge cases of the
+# patterns (macros in comments, lookup options, names inside of longer identifiers)
+SEARCHES = [
+    YmlReader.load_file(TEMPLATE_DETECTION)["search"],
+    "| tstats `security_content_summariesonly` count min(_time) as firstTime "
+    "max(_time) as lastTime from datamodel=Endpoint.Registry where "
+    'Registry.registry_path="*\\\\Control\\\\Lsa\\\\DisableRestrictedAdmin" '
+    "by Registry.dest Registry.user Registry.registry_path | `drop_dm_object_name(Registry)` "
+    "| `security_content_ctime(firstTime)` | `security_content_ctime(lastTime)` "
+    "| `disabling_restricted_admin_filter`",
+    "`cloudtrail` eventName = ConsoleLogin | stats earliest(_time) as firstTime by "
+    "user_arn | inputlookup append=t previously_seen_aws_regions "
+    "| stats min(firstTime) as firstTime by user_arn "
+    "| outputlookup append=true key_field=user_arn previously_seen_aws_regions "
+    "| `aws_detect_users_creating_keys_filter`",
+    "`sysmon` EventCode=1 | lookup update=true is_suspicious_file_extension_lookup "
+    "file_name OUTPUT suspicious | lookup local=t ut_shannon_lookup word as process "
+    "| search suspicious=1 | `suspicious_file_filter`",
+    "| inputlookup strict=true max=10 start=1 ransomware_extensions_lookup | table "
+    "Extensions | `ransomware_extensions_filter`",
+    "```this comment mentions `not_a_macro` and datamodel=Web``` `wineventlog_security` "
+    "EventCode=4624 ```a second comment``` | `security_content_ctime(firstTime)` "
+    "| `windows_logon_filter`",
+    "`powershell` EventCode=4104 ScriptBlockText=*inputlookup_bypass* | rex "
+    'field=ScriptBlockText "(?<lookup>lookup\\s+\\w+)" | stats count by dest '
+    "| `powershell_filter`",
+    "| from datamodel:Network_Traffic.All_Traffic | search dest_port=3389 | join "
+    "dest [| tstats count from datamodel=Authentication by Authentication.dest] "
+    "| `rdp_filter`",
+    "`sysmon` ```a comment which ends in a macro `macro_here```` | `four_backticks_filter`",
+]
+
+
+def old_get_macros(text_field: str) -> set[str]:
+    """Macro.get_macros before the analysis, without resolving the names to macros"""
+    if re.findall(r"\`\`\`\`", text_field):
+        raise ValueError("Search contained four or more '`' characters in a row")
+    text_field = re.sub(r"\`\`\`[\s\S]*?\`\`\`", " ", text_field)
+    macros_to_get = re.findall(r"`([^\s]+)`", text_field)
+    return set(
+        [
+            macro[: macro.find("(")] if macro.find("(") != -1 else macro
+            for macro in macros_to_get
+        ]
+    )
+
+
+def old_get_lookups(text_field: str) -> tuple[set[str], set[str], set[str]]:
+    """Lookup.get_lookups before the analysis, without resolving the names to lookups"""
+    inputLookupsToGet = set(
+        re.findall(
+            r"[^\w]inputlookup(?:\s*(?:(?:append|strict|start|max)\s*=\s*(?:true|t|false|f))){0,4}\s+([\w]+)",
+            text_field,
+            re.IGNORECASE,
+        )
+    )
+    outputLookupsToGet = set(
+        re.findall(
+            r"[^\w]outputlookup(?:\s*(?:(?:append|create_empty|override_if_empty|max|key_field|allow_updates|createinapp|create_context|output_format)\s*=\s*[^\s]*))*\s+([\w]+)",
+            text_field,
+            re.IGNORECASE,
+        )
+    )
+    lookupsToGet = set(
+        re.findall(
+            r"[^\w](?:(?<!output)(?<!input))lookup(?:\s*(?:(?:local|update)\s*=\s*(?:true|t|false|f))){0,2}\s+([\w]+)",
+            text_field,
+            re.IGNORECASE,
+        )
+    )
+    return inputLookupsToGet, outputLookupsToGet, lookupsToGet
+
+
+@pytest.mark.parametrize("search", SEARCHES)
+def test_analysis_matches_the_previous_helpers(search):
+    analysis = SplAnalysis.analyze(search)
+
+    try:
+        macros = old_get_macros(search)
+    except ValueError:
+        assert analysis.invalid_backticks
+    else:
+        assert not analysis.invalid_backticks
+        assert analysis.macros == macros
+
+    assert (
+        analysis.input_lookups,
+        analysis.output_lookups,
+        analysis.lookups,
+    ) == old_get_lookups(search)
+    assert list(analysis.datamodels) == [dm for dm in DataModel if dm in search]
+
+
+def test_analysis_of_each_search():
+    analysis = SplAnalysis.analyze(SEARCHES[2])
+    assert analysis.macros == {"cloudtrail", "aws_detect_users_creating_keys_filter"}
+    assert analysis.input_lookups == {"previously_seen_aws_regions"}
+    assert analysis.output_lookups == {"previously_seen_aws_regions"}
+    assert analysis.lookups == frozenset()
+
+    # Macros in comments are ignored, datamodels in comments are not
+    analysis = SplAnalysis.analyze(SEARCHES[5])
+    assert analysis.macros == {
+        "wineventlog_security",
+        "security_content_ctime",
+        "windows_logon_filter",
+    }
+    assert analysis.datamodels == (DataModel.WEB,)
+    assert SplAnalysis.analyze(SEARCHES[8]).invalid_backticks
+
+    # The same search is only analyzed once
+    search = SEARCHES[3][:10] + SEARCHES[3][10:]
+    assert search is not SEARCHES[3]
+    assert SplAnalysis.analyze(search) is SplAnalysis.analyze(SEARCHES[3])
+
+
+@pytest.mark.parametrize("search", SEARCHES)
+def test_references_match_substring_checks(search):
+    analysis = SplAnalysis.analyze(search)
+    candidates = [
+        "`windows_logon_filter`",
+        "`not_a_macro`",
+        "`rdp_filter`",
+        "dest",
+        "user",
+        "suspicious",
+        "EventCode",
+        "process_name",
+        "ScriptBlockText",
+        "Missing_Field",
+    ]
+    for candidate in candidates:
+        assert analysis.references(candidate) == (candidate in search)
+    assert analysis.referenced_fields(candidates) == [
+        candidate for candidate in candidates if candidate in search
+    ]
+
+
+def test_references_include_comments_and_longer_identifiers():
+    analysis = SplAnalysis.analyze(SEARCHES[5])
+    # A macro which is commented out still counts as the filter macro
+    assert analysis.references("`not_a_macro`")
+    assert "not_a_macro" not in analysis.macros
+    # As does a field which is only part of a longer one
+    assert analysis.referenced_fields(["Event", "Code", "4624", "Image"]) == [
+        "Event",
+        "Code",
+        "4624",
+    ]
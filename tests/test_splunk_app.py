@@ -0,0 +1,156 @@
+import json
+import threading
+from typing import Any
+
+import pytest
+import requests
+
+from contentctl.helper import splunk_app
+from contentctl.helper.splunk_app import (
+    LATEST_VERSION_CACHE_VERSION,
+    APIEndPoint,
+    SplunkApp,
+)
+from contentctl.helper.utils import Utils
+
+TTL_SECONDS = 60 * 60
+
+
+class StubSession:
+    """
+    Answers the requests made for the latest version of an app like Splunkbase does, for
+    the apps in latest_versions. Any other app is not found.
+    """
+
+    def __init__(self, latest_versions: dict[int, str]):
+        self.latest_versions = latest_versions
+        self.requested: list[int] = []
+        self.lock = threading.Lock()
+
+    def response(self, url: str, status_code: int, content: str) -> requests.Response:
+        response = requests.Response()
+        response.url = url
+        response.status_code = status_code
+        response._content = content.encode("utf-8")
+        return response
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        for app_uid, latest_version in self.latest_versions.items():
+            if url == APIEndPoint.SPLUNK_BASE_APP_INFO.format(app_uid=app_uid):
+                with self.lock:
+                    self.requested.append(app_uid)
+                return self.response(url, 200, json.dumps({"appid": f"App_{app_uid}"}))
+            if url == APIEndPoint.SPLUNK_BASE_FETCH_APP_BY_ENTRY_ID.format(
+                app_name_id=f"App_{app_uid}"
+            ):
+                return self.response(url, 200, self.feed(app_uid, latest_version))
+        with self.lock:
+            self.requested.append(int(url.rstrip("/").split("/")[-1]))
+        return self.response(url, 404, "Not Found")
+
+    def feed(self, app_uid: int, latest_version: str) -> str:
+        entries = [("0.0.1", "False"), (latest_version, "True")]
+        return (
+            '<feed xmlns:s="http://dev.splunk.com/ns/rest">'
+            + "".join(
+                f'<entry><link href="https://apps.splunk.com/apps/{app_uid}/{version}"/>'
+                f'<content><s:dict><s:key name="version">{version}</s:key>'
+                f'<s:key name="islatest">{is_latest}</s:key></s:dict></content></entry>'
+                for version, is_latest in entries
+            )
+            + "</feed>"
+        )
+
+
+@pytest.fixture
+def now(monkeypatch) -> list[float]:
+    """The time which get_latest_versions sees, which can be moved forward"""
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(splunk_app.time, "time", lambda: now[0])
+    return now
+
+
+def test_latest_versions(now):
+    session = StubSession({742: "1.2.3", 833: "9.0.0"})
+    latest_versions = SplunkApp.get_latest_versions([833, 742, 1, 742], session=session)
+    assert list(latest_versions) == [1, 742, 833]
+    assert latest_versions[742] == "1.2.3"
+    assert latest_versions[833] == "9.0.0"
+    assert isinstance(latest_versions[1], splunk_app.SplunkBaseError)
+    assert sorted(session.requested) == [1, 742, 833]
+
+    # Without a cache file, every app is fetched every time
+    assert SplunkApp.get_latest_versions([742, 833], session=session) == {
+        742: "1.2.3",
+        833: "9.0.0",
+    }
+    assert sorted(session.requested) == [1, 742, 742, 833, 833]
+
+
+def test_latest_versions_are_cached_until_they_expire(tmp_path, now):
+    cache_file = tmp_path / "splunkbase.pickle"
+    session = StubSession({742: "1.2.3", 833: "9.0.0"})
+
+    def get_latest_versions(*app_uids: int) -> dict[int, Any]:
+        session.requested = []
+        return SplunkApp.get_latest_versions(
+            app_uids, cache_file=cache_file, ttl_seconds=TTL_SECONDS, session=session
+        )
+
+    assert get_latest_versions(742, 833) == {742: "1.2.3", 833: "9.0.0"}
+    assert sorted(session.requested) == [742, 833]
+
+    # Until they expire, cached versions are used even though there are newer ones
+    session.latest_versions[742] = "1.2.4"
+    now[0] += TTL_SECONDS - 1
+    assert get_latest_versions(742, 833) == {742: "1.2.3", 833: "9.0.0"}
+    assert session.requested == []
+
+    # Only the apps which are not cached yet are fetched
+    session.latest_versions[900] = "2.0.0"
+    assert get_latest_versions(742, 900) == {742: "1.2.3", 900: "2.0.0"}
+    assert session.requested == [900]
+
+    # Each app expires TTL_SECONDS after it was fetched
+    now[0] += 1
+    assert get_latest_versions(742, 833, 900) == {
+        742: "1.2.4",
+        833: "9.0.0",
+        900: "2.0.0",
+    }
+    assert sorted(session.requested) == [742, 833]
+    cache = Utils.load_versioned_cache(cache_file, LATEST_VERSION_CACHE_VERSION)
+    assert cache == {
+        "apps": {
+            742: (now[0], "1.2.4"),
+            833: (now[0], "9.0.0"),
+            900: (now[0] - 1, "2.0.0"),
+        }
+    }
+
+
+def test_failed_lookups_are_never_cached(tmp_path, now):
+    cache_file = tmp_path / "splunkbase.pickle"
+    session = StubSession({742: "1.2.3"})
+
+    for _ in range(2):
+        session.requested = []
+        latest_versions = SplunkApp.get_latest_versions(
+            [1, 742], cache_file=cache_file, ttl_seconds=TTL_SECONDS, session=session
+        )
+        assert isinstance(latest_versions[1], splunk_app.SplunkBaseError)
+        assert latest_versions[742] == "1.2.3"
+    # The app which could not be found is looked for again, unlike the cached one
+    assert session.requested == [1]
+    cache = Utils.load_versioned_cache(cache_file, LATEST_VERSION_CACHE_VERSION)
+    assert cache == {"apps": {742: (now[0], "1.2.3")}}
+
+    # Once an app expires, failing to fetch it again does not replace its cached version
+    del session.latest_versions[742]
+    now[0] += TTL_SECONDS
+    latest_versions = SplunkApp.get_latest_versions(
+        [742], cache_file=cache_file, ttl_seconds=TTL_SECONDS, session=session
+    )
+    assert isinstance(latest_versions[742], splunk_app.SplunkBaseError)
+    cache = Utils.load_versioned_cache(cache_file, LATEST_VERSION_CACHE_VERSION)
+    assert cache == {"apps": {742: (now[0] - TTL_SECONDS, "1.2.3")}}
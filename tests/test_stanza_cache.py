@@ -0,0 +1,45 @@
+from contentctl.objects.config import build
+from contentctl.objects.macro import Macro
+from contentctl.output.conf_writer import ConfWriter
+from contentctl.output.stanza_cache import StanzaCache
+
+
+def render_macros(config: build, macros: list[Macro]) -> tuple[str, StanzaCache]:
+    stanza_cache = StanzaCache.load(config)
+    assert stanza_cache is not None
+    text = ConfWriter.renderCachedConfFile("macros.j2", config, macros, stanza_cache)
+    stanza_cache.save()
+    return text, stanza_cache
+
+
+def test_only_changed_stanzas_are_rendered(tmp_path):
+    config = build(path=tmp_path, incremental=True)
+    macros = [
+        Macro(name=f"macro_{i}", definition=f"index={i}", description="A macro")
+        for i in range(40)
+    ]
+    full_text = (
+        ConfWriter.getJ2Environment(config)
+        .get_template("macros.j2")
+        .render(objects=macros, app=config.app)
+    )
+
+    text, stanza_cache = render_macros(config, macros)
+    assert text == full_text
+    assert (stanza_cache.hits, stanza_cache.misses) == (0, 40)
+
+    macros[3].definition = "index=changed"
+    full_text = (
+        ConfWriter.getJ2Environment(config)
+        .get_template("macros.j2")
+        .render(objects=macros, app=config.app)
+    )
+    text, stanza_cache = render_macros(config, macros)
+    assert text == full_text
+    assert (stanza_cache.hits, stanza_cache.misses) == (39, 1)
+
+    text, stanza_cache = render_macros(
+        build(path=tmp_path, incremental=True, rebuild=True), macros
+    )
+    assert text == full_text
+    assert (stanza_cache.hits, stanza_cache.misses) == (0, 40)
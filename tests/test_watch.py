@@ -0,0 +1,140 @@
+import errno
+import os
+import pathlib
+import queue
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+import contentctl
+from contentctl.actions import watch as watch_action
+from contentctl.actions.watch import Watch
+from contentctl.objects.config import watch
+
+REPO_ROOT = pathlib.Path(contentctl.__file__).parent.parent
+DETECTION = pathlib.Path("detections/endpoint/anomalous_usage_of_7zip.yml")
+
+
+def contentctl_command(app_path: pathlib.Path, *args: str) -> list[str]:
+    return [
+        sys.executable,
+        "-m",
+        "contentctl.contentctl",
+        *args,
+        "--path",
+        str(app_path),
+    ]
+
+
+def run_contentctl(
+    app_path: pathlib.Path, *args: str
+) -> subprocess.CompletedProcess[str]:
+    return subprocess.run(
+        contentctl_command(app_path, *args),
+        cwd=app_path,
+        env=os.environ | {"PYTHONPATH": str(REPO_ROOT)},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+
+@pytest.fixture
+def app_path(tmp_path):
+    app_path = tmp_path / "app"
+    app_path.mkdir()
+    assert run_contentctl(app_path, "init").returncode == 0
+    return app_path
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses a Unix socket")
+def test_query(app_path, tmp_path):
+    address = pathlib.Path(Watch.address(watch(path=app_path)))
+    with open(tmp_path / "watch.log", "w") as watch_log:
+        watcher = subprocess.Popen(
+            contentctl_command(app_path, "watch"),
+            cwd=app_path,
+            env=os.environ | {"PYTHONPATH": str(REPO_ROOT)},
+            stdout=watch_log,
+            stderr=subprocess.STDOUT,
+        )
+    try:
+        deadline = time.time() + 120
+        while not address.exists():
+            assert watcher.poll() is None, (tmp_path / "watch.log").read_text()
+            assert time.time() < deadline
+            time.sleep(0.1)
+
+        # A client which connects but never sends anything does not hold up other clients
+        with socket.socket(socket.AF_UNIX) as silent_client:
+            silent_client.connect(str(address))
+
+            result = run_contentctl(app_path, "watch", "--query")
+            assert result.returncode == 0, result.stdout
+            assert "is not running" not in result.stdout
+            assert "content successfully" in result.stdout
+
+            # Changes are validated before the result is sent
+            detection = app_path / DETECTION
+            detection.write_text(
+                detection.read_text().replace("type: Anomaly", "type: Unknown")
+            )
+            result = run_contentctl(app_path, "watch", "--query")
+            assert result.returncode == 1, result.stdout
+            assert "Validation FAILED" in result.stdout
+
+            detection.write_text(
+                detection.read_text().replace("type: Unknown", "type: Anomaly")
+            )
+            result = run_contentctl(app_path, "watch", "--query")
+            assert result.returncode == 0, result.stdout
+            assert "Incremental validation: restoring" in result.stdout
+    finally:
+        watcher.send_signal(signal.SIGINT)
+        assert watcher.wait(timeout=30) == 0
+    assert not (watch(path=app_path).cache_path / "watch.key").exists()
+
+    # Without a watcher, the content is validated directly
+    result = run_contentctl(app_path, "watch", "--query")
+    assert result.returncode == 0
+    assert "is not running" in result.stdout
+
+
+def test_failing_to_accept_connections(tmp_path, monkeypatch, capsys):
+    accepted: list[float] = []
+
+    class FailingListener(watch_action.Listener):
+        def accept(self):
+            accepted.append(time.monotonic())
+            raise OSError(errno.EMFILE, "Too many open files")
+
+    monkeypatch.setattr(watch_action, "Listener", FailingListener)
+    monkeypatch.setattr(watch_action, "ACCEPT_RETRY_INTERVAL", 0.1)
+    watcher = Watch()
+    listener = watcher.listen(watch(path=tmp_path), queue.Queue())
+    (thread,) = [
+        thread
+        for thread in threading.enumerate()
+        if thread.name == watch_action.ACCEPT_THREAD_NAME
+    ]
+    try:
+        # Each failure is reported, and then the watcher waits before trying again
+        time.sleep(0.5)
+        assert 3 <= len(accepted) <= 7
+        assert all(
+            later - earlier >= 0.09 for earlier, later in zip(accepted, accepted[1:])
+        )
+        assert "Too many open files" in capsys.readouterr().err
+    finally:
+        watcher.stopped.set()
+        listener.close()
+
+    # Once the watcher has stopped, so does accepting connections
+    thread.join(timeout=5)
+    assert not thread.is_alive()
+    assert capsys.readouterr().err.count("Too many open files") <= 1
@@ -0,0 +1,107 @@
+import pathlib
+from typing import Any, Union
+
+import pytest
+
+from contentctl.input import yml_reader
+from contentctl.input.yml_reader import MIN_FILES_FOR_PARALLEL_PARSE, YmlReader
+
+
+@pytest.fixture
+def file_paths(tmp_path) -> list[pathlib.Path]:
+    """
+    Enough YML files to be parsed by a pool of worker processes, including every kind
+    of file which cannot be parsed, in no particular order
+    """
+    yml_path = tmp_path / "yml"
+    yml_path.mkdir()
+    file_paths: list[pathlib.Path] = []
+    for i in range(MIN_FILES_FOR_PARALLEL_PARSE + 50):
+        file_path = yml_path / f"{(i * 7919) % 1000:03}_{i}.yml"
+        file_path.write_text(
+            f"name: Content {i}\nid: {i}\nauthor: Author {i % 3}\n"
+            f"tags:\n  product:\n  - Splunk Enterprise\n  nested:\n    value: {i / 2}\n"
+        )
+        file_paths.append(file_path)
+
+    unparseable = {
+        "update.yml": "name: __UPDATE__ the name\n",
+        "invalid.yml": "name: [unterminated\n",
+        "empty.yml": "# Nothing but a comment\n",
+    }
+    for position, (name, text) in zip((0, 100, 249), unparseable.items()):
+        (yml_path / name).write_text(text)
+        file_paths.insert(position, yml_path / name)
+    file_paths.insert(150, yml_path / "missing.yml")
+    return file_paths
+
+
+def comparable(result: Union[dict[str, Any], Exception]) -> Any:
+    if isinstance(result, Exception):
+        return (type(result), str(result))
+    return result
+
+
+@pytest.mark.parametrize("cache", [False, True])
+def test_worker_processes_parse_files_like_the_main_process(
+    file_paths, tmp_path, monkeypatch, cache
+):
+    pools: list[int] = []
+
+    class ProcessPoolExecutor(yml_reader.ProcessPoolExecutor):
+        def __init__(self, max_workers: int):
+            pools.append(max_workers)
+            super().__init__(max_workers=max_workers)
+
+    monkeypatch.setattr(yml_reader, "ProcessPoolExecutor", ProcessPoolExecutor)
+    cache_path = tmp_path / "cache" if cache else None
+
+    serial = YmlReader.parse_files(file_paths, max_workers=1, cache_path=cache_path)
+    assert pools == []
+    parallel = YmlReader.parse_files(file_paths, max_workers=2, cache_path=cache_path)
+    assert pools == [2]
+
+    # Every file, in the same order, with the same object or the same error
+    assert list(serial) == list(parallel) == file_paths
+    assert [comparable(result) for result in parallel.values()] == [
+        comparable(result) for result in serial.values()
+    ]
+    for file_path in file_paths[:10]:
+        try:
+            expected = YmlReader.parse_file(file_path)
+        except Exception as e:
+            expected = e
+        assert comparable(parallel[file_path]) == comparable(expected)
+
+
+def loaded(file_path: pathlib.Path, **kwargs: Any) -> Any:
+    """The object loaded from file_path, or the type of error which loading it raises"""
+    try:
+        return YmlReader.load_file(file_path, **kwargs)
+    except (Exception, SystemExit) as e:
+        return type(e)
+
+
+def test_results_of_worker_processes_are_loaded_like_files(file_paths, capsys):
+    parsed = YmlReader.parse_files(file_paths, max_workers=2)
+
+    for file_path in file_paths:
+        result = parsed[file_path]
+        if not isinstance(result, Exception):
+            # The file_path is added in the main process, and not by the worker
+            assert "file_path" not in result
+        expected = loaded(file_path)
+        assert loaded(file_path, parse_result=result) == expected
+        if isinstance(expected, dict):
+            assert expected["file_path"] == str(file_path)
+    capsys.readouterr()
+
+    # A file which has not been filled out is reported by raising the error from the
+    # worker, and YAML errors are printed before exiting
+    paths = {file_path.name: file_path for file_path in file_paths}
+    update_path, invalid_path = paths["update.yml"], paths["invalid.yml"]
+    with pytest.raises(Exception, match="contains the value '__UPDATE__'"):
+        YmlReader.load_file(update_path, parse_result=parsed[update_path])
+    with pytest.raises(SystemExit):
+        YmlReader.load_file(invalid_path, parse_result=parsed[invalid_path])
+    assert invalid_path.name in capsys.readouterr().out